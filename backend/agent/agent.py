@@ -1,5 +1,6 @@
-from typing import List
+from typing import Optional
 from schemas import TrainingMetric
+from streaming_stats import RollingWindow
 import time
 
 class TrainingAgent:
@@ -8,32 +9,33 @@ class TrainingAgent:
 
     def __init__(self):
         self.last_action: str = ""
-        self.metrics: List[TrainingMetric] = []
         self.start_time: float = time.time()
+        self._clear()
 
     def observe(self, metric: TrainingMetric):
-        """Store new metric and perform reasoning."""
-        self.metrics.append(metric)
+        """Fold a new metric into the rolling windows (O(1))."""
+        self.latest = metric
+        self.count += 1
+        self.losses.push(metric.loss)
+        self.accuracies.push(metric.accuracy)
 
     def analyze(self) -> str:
         """Perform basic rule-based analysis on recent metrics."""
-        if len(self.metrics) < 5:
+        if not self.losses.full:
             return "Not enough data to evaluate training yet."
 
-        recent = self.metrics[-5:]
-        losses = [m.loss for m in recent]
-        accuracies = [m.accuracy for m in recent]
+        losses, accuracies = self.losses, self.accuracies
 
         # Check for loss plateau
-        if max(losses) - min(losses) < 0.01:
+        if losses.max - losses.min < 0.01:
             return "⚠️ Loss has plateaued. You may want to restart training or lower learning rate."
 
         # Check for accuracy stagnation
-        if max(accuracies) - min(accuracies) < 0.01:
+        if accuracies.max - accuracies.min < 0.01:
             return "⚠️ Accuracy hasn't improved recently. Consider reviewing your data or model."
 
         # Check for high final loss
-        if losses[-1] > 0.4:
+        if losses.last() > 0.4:
             return "⚠️ Final loss is still high. Try more training epochs or a smaller learning rate."
 
         return "✅ Training progressing normally."
@@ -41,16 +43,23 @@ class TrainingAgent:
     def get_summary(self) -> dict:
         """Returns the latest metrics and status."""
         status = self.analyze()
-        latest = self.metrics[-1] if self.metrics else None
+        latest = self.latest
         return {
             "latest": latest.model_dump() if latest else None,
             "status": status,
-            "total_epochs": len(self.metrics)
+            "total_epochs": self.count
         }
 
+    def _clear(self):
+        self.latest: Optional[TrainingMetric] = None
+        self.count = 0
+        # Only the last 5 metrics are analyzed
+        self.losses = RollingWindow(5)
+        self.accuracies = RollingWindow(5)
+
     def reset(self):
         """Clear all stored training metrics."""
-        self.metrics.clear()
+        self._clear()
         print("Training metrics reset.")
 
     def handle_query(self, message: str) -> str:
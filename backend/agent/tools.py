@@ -1,4 +1,4 @@
-from trainer import train_model
+from trainer import TrainingWorker, train_model
 from websocket_manager import WebSocketManager
 from agent import TrainingAgent
 
@@ -7,10 +7,10 @@ import asyncio
 # Singleton agent instance (or inject via FastAPI DI in future)
 agent = TrainingAgent()
 
-async def restart_training(ws_manager: WebSocketManager):
+async def restart_training(ws_manager: WebSocketManager, config: dict):
     """Restart the training process and clear old metrics."""
     agent.reset()
-    await train_model(ws_manager, agent)
+    await train_model(ws_manager, TrainingWorker(config))
 
 def update_config(config: dict, key: str, value):
     """Update training configuration (dummy placeholder)."""
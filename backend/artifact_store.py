@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+from metric_store import RUNS_DIR
+
+# Exported model files are stored once per content hash and referenced from each run's manifest
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+MANIFEST_FILE = "artifacts.json"
+READ_CHUNK = 1024 * 1024
+
+_manifest_lock = threading.Lock()
+
+def object_path(digest: str, root: str = ARTIFACTS_DIR) -> str:
+    return os.path.join(root, "objects", digest[:2], digest)
+
+def put_bytes(data: bytes, root: str = ARTIFACTS_DIR) -> Tuple[str, int]:
+    """Store ``data`` under its SHA-256 (a no-op if it is already stored); returns (digest, size)."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = object_path(digest, root)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    return digest, len(data)
+
+def gzip_path(digest: str, root: str = ARTIFACTS_DIR) -> str:
+    """A gzip-compressed copy of an object, created on first use."""
+    path = object_path(digest, root) + ".gz"
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(object_path(digest, root), "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, READ_CHUNK)
+        os.replace(tmp, path)
+    return path
+
+def _manifest_path(run_id: str, runs_root: str = RUNS_DIR) -> str:
+    return os.path.join(runs_root, run_id, MANIFEST_FILE)
+
+def read_manifest(run_id: str, runs_root: str = RUNS_DIR) -> dict:
+    """``{format: {"sha256", "size", "filename", "source", "createdAt"} or {"error", ...}}`` for a run."""
+    path = _manifest_path(run_id, runs_root)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def record(run_id: str, fmt: str, entry: dict, runs_root: str = RUNS_DIR):
+    with _manifest_lock:
+        manifest = read_manifest(run_id, runs_root)
+        manifest[fmt] = {**entry, "createdAt": time.time()}
+        path = _manifest_path(run_id, runs_root)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` range; None for no/unsupported ranges.
+
+    Raises ValueError for a range that can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    if not start_text:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length <= 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Read ``path`` from ``start`` to ``end`` (inclusive) in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (os.path.getsize(path) - 1 if end is None else end) - start + 1
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
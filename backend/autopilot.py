@@ -0,0 +1,86 @@
+import math
+from typing import Optional, Union
+from streaming_stats import MetricMonitor
+
+# What the training loop should do after an update
+REDUCE_LR, EARLY_STOP, ABORT = "reduce_lr", "early_stop", "abort"
+
+DEFAULTS = {
+    "patience": 5,        # epochs without improvement before stopping early
+    "minDelta": 1e-3,     # relative loss improvement that counts as progress
+    "lrPatience": 2,      # epochs without improvement before cutting the learning rate
+    "lrFactor": 0.5,
+    "minLr": 1e-6,
+    "restoreBest": True,  # put the best epoch's weights back when stopping
+    "divergenceWindow": 50,  # steps of history needed before divergence can abort a run
+}
+
+def autopilot_options(setting: Union[bool, dict, None]) -> Optional[dict]:
+    """Options from the ``autopilot`` config value (``true`` or a dict of overrides); None when off."""
+    if not setting:
+        return None
+    if setting is True:
+        return dict(DEFAULTS)
+    if isinstance(setting, dict):
+        if not setting.get("enabled", True):
+            return None
+        unknown = set(setting) - set(DEFAULTS) - {"enabled"}
+        if unknown:
+            raise ValueError(f"Unknown autopilot options: {', '.join(sorted(unknown))}")
+        return {**DEFAULTS, **{k: v for k, v in setting.items() if k != "enabled"}}
+    raise ValueError("autopilot must be true/false or an object of options")
+
+class Action:
+    def __init__(self, kind: str, message: str, learning_rate: Optional[float] = None):
+        self.kind = kind
+        self.message = message
+        self.learning_rate = learning_rate
+
+class Autopilot:
+    """Turns the agent's detectors into actions on the running job.
+
+    Epoch losses drive reduce-LR-on-plateau and early stopping; step losses
+    feed a MetricMonitor whose NaN and divergence guards abort the run. The
+    caller applies the returned actions and keeps the best weights via
+    ``improved``.
+    """
+
+    def __init__(self, options: dict, learning_rate: float):
+        self.options = options
+        self.learning_rate = learning_rate
+        self.steps = MetricMonitor(window=int(options["divergenceWindow"]))
+        self.best_loss = math.inf
+        self.best_epoch = 0
+        self.since_best = 0
+        self.since_lr_change = 0
+        self.improved = False
+
+    def on_step(self, loss: float) -> Optional[Action]:
+        steps = self.steps
+        steps.update(loss)
+        if steps.last_non_finite:
+            return Action(ABORT, f"Autopilot: loss became {loss}; aborting the run.")
+        if steps.loss.full and steps.diverging:
+            return Action(ABORT, f"Autopilot: loss is diverging (smoothed {steps.ewma_loss:.4g}, "
+                                 f"best {steps.best_ewma_loss:.4g}); aborting the run.")
+        return None
+
+    def on_epoch(self, epoch: int, loss: float) -> Optional[Action]:
+        options = self.options
+        self.improved = loss < self.best_loss * (1 - float(options["minDelta"]))
+        if self.improved:
+            self.best_loss, self.best_epoch = loss, epoch
+            self.since_best = self.since_lr_change = 0
+            return None
+        self.since_best += 1
+        self.since_lr_change += 1
+        if self.since_best >= int(options["patience"]):
+            return Action(EARLY_STOP, f"Autopilot: no improvement for {self.since_best} epochs; "
+                                      f"stopping early with the weights of epoch {self.best_epoch}.")
+        if self.since_lr_change >= int(options["lrPatience"]) and self.learning_rate > float(options["minLr"]):
+            old = self.learning_rate
+            self.learning_rate = max(float(options["minLr"]), old * float(options["lrFactor"]))
+            self.since_lr_change = 0
+            return Action(REDUCE_LR, f"Autopilot: loss plateaued; learning rate {old:.3g} -> {self.learning_rate:.3g}.",
+                          learning_rate=self.learning_rate)
+        return None
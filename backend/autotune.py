@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import torch
+
+DEFAULTS = {
+    "batchSizes": [16, 32, 64, 128, 256, 512, 1024, 2048],  # rows per forward pass tried
+    "workers": [0, 2, 4],      # DataLoader worker processes tried
+    "prefetch": [2, 4],        # batches each worker keeps ready (with workers only)
+    "pinMemory": True,         # also try pinned host memory (only with a GPU)
+    "preserveBatch": True,     # keep batchSize rows per optimizer step, accumulating smaller batches
+    "memoryLimitMb": None,     # resident memory ceiling while tuning; None: half the machine's memory
+    "sampleRows": 20_000,      # shuffle buffer of the trial loaders, so trials start quickly
+    "steps": 10,               # timed batches per trial (at least 4x what the workers keep queued)
+    "minSpeedup": 1.05,        # the tuned settings are kept only if this much faster than the config's
+}
+WARMUP_BATCHES = 2
+
+def autotune_options(setting: Union[bool, dict, None]) -> Optional[dict]:
+    """Options from the ``autotune`` config value (``true`` or a dict of overrides); None when off."""
+    if not setting:
+        return None
+    if setting is True:
+        return dict(DEFAULTS)
+    if isinstance(setting, dict):
+        if not setting.get("enabled", True):
+            return None
+        unknown = set(setting) - set(DEFAULTS) - {"enabled"}
+        if unknown:
+            raise ValueError(f"Unknown autotune options: {', '.join(sorted(unknown))}")
+        options = {**DEFAULTS, **{k: v for k, v in setting.items() if k != "enabled"}}
+        if not options["batchSizes"] or any(int(size) < 1 for size in options["batchSizes"]):
+            raise ValueError("autotune batchSizes must be a list of positive sizes")
+        if any(int(count) < 0 for count in options["workers"]) or any(int(p) < 1 for p in options["prefetch"]):
+            raise ValueError("autotune workers must be 0 or more and prefetch at least 1")
+        return options
+    raise ValueError("autotune must be true/false or an object of options")
+
+def uses_workers(options: Optional[dict]) -> bool:
+    """Whether tuning may start DataLoader workers, which a daemonic process can't."""
+    return bool(options) and any(int(count) > 0 for count in options["workers"])
+
+def _rss_mb(pid: str = "self") -> float:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return 0.0
+
+def _peak_rss_mb() -> float:
+    """Highest resident memory of this process so far; the current size where that can't be read."""
+    try:
+        import resource
+    except ImportError:
+        return _rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10  # bytes on macOS, KB elsewhere
+
+def memory_limit_mb(options: dict) -> Optional[float]:
+    if options["memoryLimitMb"]:
+        return float(options["memoryLimitMb"])
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2 ** 21
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _trial(loader, step: Callable[[torch.Tensor, torch.Tensor], None], steps: int) -> Tuple[float, float]:
+    """(samples/s, resident MB incl. loader workers) over ``steps`` batches after a warmup."""
+    before = {child.pid for child in multiprocessing.active_children()}
+    batches = iter(loader)
+    try:
+        for _ in range(WARMUP_BATCHES):
+            step(*next(batches))
+        rows, started = 0, time.perf_counter()
+        for _ in range(steps):
+            inputs, targets = next(batches)
+            step(inputs, targets)
+            rows += targets.size(0)
+        seconds = time.perf_counter() - started
+        workers = [child.pid for child in multiprocessing.active_children() if child.pid not in before]
+        memory = _peak_rss_mb() + sum(_rss_mb(str(pid)) for pid in workers)
+    finally:
+        # Shut the trial's workers down now rather than whenever the iterator is collected
+        shutdown = getattr(batches, "_shutdown_workers", None)
+        if shutdown is not None:
+            shutdown()
+    return rows / seconds, memory
+
+def tune_loader(options: dict, batch_size: int, loader_for: Callable[..., object],
+                step: Callable[[torch.Tensor, torch.Tensor], None]) -> dict:
+    """Find the batch size and DataLoader settings with the most samples/s under the memory limit.
+
+    ``loader_for(batch_size, workers, prefetch, pin_memory)`` makes a loader
+    over the run's data; ``step(inputs, targets)`` takes one training step on
+    a throwaway copy of the model. Batch sizes are tried from small to large
+    without workers; a size whose memory, extrapolated from the ones before
+    it, would cross the limit isn't tried. Worker counts, prefetch depth and
+    pinning are then tried at the best size. With ``preserveBatch`` only sizes
+    dividing ``batch_size`` are tried and the rest is made up by gradient
+    accumulation. Returns the settings and the report for the dashboard.
+    """
+    started = time.perf_counter()
+    limit = memory_limit_mb(options)
+    sizes = sorted({int(size) for size in options["batchSizes"]} | {batch_size})
+    if options["preserveBatch"]:
+        sizes = [size for size in sizes if batch_size % size == 0]
+    trials: List[dict] = []
+    fallbacks: Dict[str, str] = {}
+
+    def run(size: int, workers: int = 0, prefetch: int = 2, pin_memory: bool = False) -> Optional[dict]:
+        queued = workers * prefetch
+        trial = {"batchSize": size, "workers": workers, "prefetch": prefetch if workers else None,
+                 "pinMemory": pin_memory}
+        try:
+            rate, memory = _trial(loader_for(size, workers, prefetch, pin_memory), step,
+                                  max(int(options["steps"]), 4 * queued))
+        except (StopIteration, RuntimeError, OSError) as e:
+            # RuntimeError covers running out of memory
+            trial["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            trials.append(trial)
+            return None
+        trial.update(samplesPerSec=rate, memoryMb=memory)
+        if limit is not None and memory > limit:
+            trial["error"] = f"over the memory limit ({memory:.0f} MB)"
+        trials.append(trial)
+        return None if "error" in trial else trial
+
+    measured: List[dict] = []
+    for size in sizes:
+        if limit is not None and len(measured) >= 2:
+            # Memory grows about linearly with the batch size
+            smaller, larger = measured[-2], measured[-1]
+            per_row = (larger["memoryMb"] - smaller["memoryMb"]) / (larger["batchSize"] - smaller["batchSize"])
+            if larger["memoryMb"] + per_row * (size - larger["batchSize"]) > limit:
+                fallbacks["batchSize"] = f"{size} and up would exceed {limit:.0f} MB"
+                break
+        trial = run(size)
+        if trial is None:
+            break  # Larger sizes would fail too
+        measured.append(trial)
+    if not measured:
+        raise RuntimeError(f"no batch size could be trained: {trials[-1].get('error')}")
+    best = max(measured, key=lambda trial: trial["samplesPerSec"])
+    baseline = next((t for t in trials if t["batchSize"] == batch_size and not t["workers"] and "error" not in t), None)
+    chosen = best
+    pin_options = [False, True] if options["pinMemory"] and torch.cuda.is_available() else [False]
+    if options["pinMemory"] and len(pin_options) == 1:
+        fallbacks["pinMemory"] = "only helps copies to a GPU"
+    if multiprocessing.current_process().daemon and uses_workers(options):
+        fallbacks["workers"] = "not possible in a daemonic process"
+    else:
+        for workers in sorted({int(count) for count in options["workers"]}):
+            for prefetch in (sorted({int(p) for p in options["prefetch"]}) if workers else [2]):
+                for pin_memory in pin_options:
+                    if not workers and not pin_memory:
+                        continue  # Measured in the batch size sweep
+                    trial = run(best["batchSize"], workers, prefetch, pin_memory)
+                    if trial is not None and trial["samplesPerSec"] > chosen["samplesPerSec"]:
+                        chosen = trial
+    if baseline is not None and chosen["samplesPerSec"] / baseline["samplesPerSec"] < float(options["minSpeedup"]):
+        chosen = baseline
+        fallbacks["tuned"] = f"under {options['minSpeedup']}x faster than the configured batch size"
+    accumulate = batch_size // chosen["batchSize"] if options["preserveBatch"] else 1
+    return {
+        "batchSize": chosen["batchSize"],
+        "accumulate": accumulate,
+        "effectiveBatchSize": chosen["batchSize"] * accumulate,
+        "workers": chosen["workers"],
+        "prefetch": chosen["prefetch"],
+        "pinMemory": chosen["pinMemory"],
+        "samplesPerSec": chosen["samplesPerSec"],
+        "baselineSamplesPerSec": baseline["samplesPerSec"] if baseline else None,
+        "speedup": chosen["samplesPerSec"] / baseline["samplesPerSec"] if baseline else None,
+        "memoryMb": chosen["memoryMb"],
+        "memoryLimitMb": limit,
+        "trials": trials,
+        "fallbacks": fallbacks,
+        "seconds": time.perf_counter() - started,
+    }
+
+def describe(report: dict) -> str:
+    """One line for the log and the dashboard."""
+    loading = f"{report['workers']} loader workers" if report["workers"] else "no loader workers"
+    if report["prefetch"]:
+        loading += f", prefetch {report['prefetch']}"
+    if report["pinMemory"]:
+        loading += ", pinned memory"
+    batch = f"batch {report['batchSize']}"
+    if report["accumulate"] > 1:
+        batch += f" x {report['accumulate']} accumulated"
+    speedup = f", {report['speedup']:.2f}x the configured batch size" if report["speedup"] else ""
+    line = (f"Autotune: {batch}, {loading}: {report['samplesPerSec']:.0f} samples/s{speedup} "
+            f"({len(report['trials'])} trials, {report['seconds']:.1f}s)")
+    skipped = "; ".join(f"{name}: {reason}" for name, reason in report["fallbacks"].items())
+    return f"{line}; {skipped}" if skipped else line
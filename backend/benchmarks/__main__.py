@@ -0,0 +1,145 @@
+"""Benchmark suite: training throughput and WebSocket fan-out.
+
+Run from backend/:
+
+    python -m benchmarks                       # both suites, defaults
+    python -m benchmarks training --models mlp logreg --rows 50000
+    python -m benchmarks fanout --clients 500 --slow-clients 50 --rate 500
+    python -m benchmarks --baseline benchmarks/results/<earlier>.json
+
+Everything runs offline on CPU. Results are written as JSON (with the git
+commit and machine details) so runs on different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SUITES = ("training", "fanout")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def environment() -> dict:
+    import torch
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "torchThreads": torch.get_num_threads(),
+    }
+
+def headline(results: dict) -> dict:
+    """The numbers worth comparing across commits: {name: (value, higher is better)}."""
+    numbers = {}
+    for model, run in results.get("training", {}).get("models", {}).items():
+        if run.get("stepsPerSec"):
+            numbers[f"training.{model}.stepsPerSec"] = (run["stepsPerSec"], True)
+    fanout = results.get("fanout")
+    if fanout:
+        for group in ("fast", "slow"):
+            p99 = fanout[group]["latencyMs"]["p99"]
+            if p99 is not None:
+                numbers[f"fanout.{group}.p99Ms"] = (p99, False)
+        numbers["fanout.slow.lossRate"] = (fanout["slow"]["lossRate"], False)
+        if fanout["memory"]["rssPeakBytes"]:
+            numbers["fanout.rssPeakBytes"] = (fanout["memory"]["rssPeakBytes"], False)
+    return numbers
+
+def compare(results: dict, baseline: dict):
+    before, after = headline(baseline), headline(results)
+    print(f"\nCompared to {baseline['environment']['commit']}:")
+    for name, (value, higher_is_better) in after.items():
+        if name not in before or not before[name][0]:
+            continue
+        change = (value - before[name][0]) / before[name][0]
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {name:<40} {before[name][0]:>12.4g} -> {value:<12.4g} {change:+.1%}{'' if better else ' (worse)'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("suites", nargs="*", metavar="suite", help="training and/or fanout (default: both)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    training = parser.add_argument_group("training")
+    training.add_argument("--models", nargs="+", default=None, help="Model types (default: all tabular ones)")
+    training.add_argument("--rows", type=int, default=20_000)
+    training.add_argument("--features", type=int, default=32)
+    training.add_argument("--classes", type=int, default=4)
+    training.add_argument("--epochs", type=int, default=2)
+    training.add_argument("--batch-size", type=int, default=64)
+    training.add_argument("--metrics-every", type=int, default=1)
+    training.add_argument("--backend", choices=["thread", "process"], default="thread")
+    training.add_argument("--threads", type=int, default=None, help="torch threads per run")
+    training.add_argument("--seed", type=int, default=0)
+    training.add_argument("--performance", action="store_true", help="Enable performance tuning in the runs")
+    training.add_argument("--processes", type=int, default=1, help="Data-parallel processes per run")
+    fanout = parser.add_argument_group("fanout")
+    fanout.add_argument("--clients", type=int, default=100)
+    fanout.add_argument("--slow-clients", type=int, default=10)
+    fanout.add_argument("--slow-delay-ms", type=float, default=50.0, help="Time a slow client takes per frame")
+    fanout.add_argument("--rate", type=float, default=200.0, help="Metrics broadcast per second")
+    fanout.add_argument("--duration", type=float, default=5.0)
+    fanout.add_argument("--mode", choices=["stream", "batch"], default="stream")
+    fanout.add_argument("--encoding", choices=["json", "binary"], default="json")
+    fanout.add_argument("--max-queue", type=int, default=256)
+    fanout.add_argument("--overflow", choices=["drop_oldest", "coalesce", "disconnect"], default="drop_oldest")
+    fanout.add_argument("--tick-hz", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    args.suites = args.suites or list(SUITES)
+    unknown = [suite for suite in args.suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s) {', '.join(unknown)}; choose from {', '.join(SUITES)}")
+
+    scratch = tempfile.mkdtemp(prefix="dashboard-bench-")
+    # Benchmark runs must not show up among (or overwrite) real runs; set before the backend modules load
+    os.environ.setdefault("RUNS_DIR", os.path.join(scratch, "runs"))
+    os.environ.setdefault("ARTIFACTS_DIR", os.path.join(scratch, "artifacts"))
+    # Training only reads datasets from the upload directory, so the synthetic ones are written there
+    os.environ.setdefault("DATASET_DIR", os.path.join(scratch, "datasets"))
+
+    results = {"environment": environment(), "startedAt": time.time()}
+    try:
+        if "training" in args.suites:
+            from benchmarks.training import DEFAULT_MODELS, run_training
+            results["training"] = run_training(
+                os.environ["DATASET_DIR"], args.models or DEFAULT_MODELS, rows=args.rows, features=args.features,
+                classes=args.classes, epochs=args.epochs, batch_size=args.batch_size,
+                metrics_every=args.metrics_every, use_process=args.backend == "process",
+                num_threads=args.threads, seed=args.seed, performance=args.performance,
+                processes=args.processes,
+            )
+        if "fanout" in args.suites:
+            from benchmarks.fanout import run_fanout
+            results["fanout"] = run_fanout(
+                clients=args.clients, slow_clients=args.slow_clients, slow_delay_ms=args.slow_delay_ms,
+                rate=args.rate, duration=args.duration, mode=args.mode, encoding=args.encoding,
+                max_queue=args.max_queue, overflow=args.overflow, tick_hz=args.tick_hz,
+            )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{results['environment']['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import struct
+import time
+from typing import Dict, List, Optional
+from metric_frames import BINARY_MAGIC
+from schemas import TrainingMetric
+from websocket_manager import WebSocketManager
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def frame_seqs(frame) -> List[int]:
+    """Sequence numbers of the metrics in a frame sent by WebSocketManager."""
+    if isinstance(frame, bytes):
+        if frame[:4] != BINARY_MAGIC:
+            return []
+        count = struct.unpack_from("<I", frame, 4)[0]
+        offset = 8 + count * 8  # seq follows the float64 timestamps
+        return list(struct.unpack_from(f"<{count}I", frame, offset))
+    message = json.loads(frame)
+    if message.get("type") == "metrics":
+        return [message["seq"]]
+    if message.get("type") == "metrics_batch":
+        return message["payload"]["seq"]
+    return []
+
+class SimulatedClient:
+    """Stands in for a WebSocket: takes ``delay`` seconds per frame and records metric latencies."""
+
+    def __init__(self, name: str, delay: float, sent_at: Dict[int, float]):
+        self.client = name
+        self.delay = delay
+        self.sent_at = sent_at
+        self.latencies: List[float] = []
+        self.frames = 0
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def _receive(self, frame):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        now = time.perf_counter()
+        self.frames += 1
+        for seq in frame_seqs(frame):
+            sent = self.sent_at.get(seq)
+            if sent is not None:
+                self.latencies.append(now - sent)
+
+    async def send_text(self, frame: str):
+        await self._receive(frame)
+
+    async def send_bytes(self, frame: bytes):
+        await self._receive(frame)
+
+    async def close(self):
+        self.closed = True
+
+def percentiles(values: List[float]) -> dict:
+    ordered = sorted(values)
+
+    def at(p: float) -> Optional[float]:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else None
+
+    return {"p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": ordered[-1] * 1000 if ordered else None}
+
+def _summarize(clients: List[SimulatedClient], connections: list, sent: int) -> dict:
+    latencies = [latency for client in clients for latency in client.latencies]
+    received = [len(client.latencies) for client in clients]
+    return {
+        "clients": len(clients),
+        "latencyMs": percentiles(latencies),
+        "metricsReceived": sum(received),
+        "minReceivedPerClient": min(received, default=0),
+        # Counted by the overflow policy; frames never sent to disconnected clients aren't included
+        "droppedFrames": sum(connection.dropped for connection in connections),
+        "lossRate": 1 - sum(received) / (sent * len(clients)) if clients and sent else 0.0,
+        "disconnected": sum(1 for client in clients if client.closed),
+    }
+
+async def _fanout(clients: int, slow_clients: int, slow_delay: float, rate: float, duration: float,
+                  mode: str, encoding: str, max_queue: int, overflow: str, tick_hz: float) -> dict:
+    manager = WebSocketManager(max_queue=max_queue, overflow=overflow, tick_hz=tick_hz)
+    sent_at: Dict[int, float] = {}
+    fast = [SimulatedClient(f"fast-{i}", 0.0, sent_at) for i in range(clients - slow_clients)]
+    slow = [SimulatedClient(f"slow-{i}", slow_delay, sent_at) for i in range(slow_clients)]
+    connections = {}
+    for client in fast + slow:
+        await manager.connect(client, mode=mode, encoding=encoding)
+        connections[client] = manager.clients[client]
+    rss_before = rss_bytes()
+    rss_peak = rss_before or 0
+    sent = 0
+    started = time.perf_counter()
+    next_sample = started
+    while True:
+        now = time.perf_counter()
+        if now - started >= duration:
+            break
+        # Send whatever is due by now, so the rate holds even when one tick overruns
+        due = int((now - started) * rate) - sent
+        for _ in range(due):
+            sent += 1
+            metric = TrainingMetric(epoch=1, loss=1.0 / sent, accuracy=0.5, step=sent, status="Ongoing")
+            sent_at[manager.seq + 1] = time.perf_counter()
+            await manager.send_metric(metric)
+        if now >= next_sample:
+            rss_peak = max(rss_peak, rss_bytes() or 0)
+            next_sample = now + 0.1
+        await asyncio.sleep(0.001)
+    send_seconds = time.perf_counter() - started
+    manager.flush()
+    # Let fast clients drain; slow ones get a bounded grace period
+    deadline = time.perf_counter() + max(1.0, min(5.0, slow_delay * max_queue))
+    while time.perf_counter() < deadline and any(c.pending for c in manager.clients.values()):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(slow_delay + 0.01)  # frames already taken off the queues are still in flight
+    rss_peak = max(rss_peak, rss_bytes() or 0)
+    for client in list(manager.clients):
+        await manager.disconnect(client)
+    return {
+        "sent": sent,
+        "sendSeconds": send_seconds,
+        "achievedRate": sent / send_seconds if send_seconds else None,
+        "fast": _summarize(fast, [connections[c] for c in fast], sent),
+        "slow": _summarize(slow, [connections[c] for c in slow], sent),
+        "memory": {"rssBeforeBytes": rss_before, "rssPeakBytes": rss_peak or None},
+    }
+
+def run_fanout(clients: int = 100, slow_clients: int = 10, slow_delay_ms: float = 50.0, rate: float = 200.0,
+               duration: float = 5.0, mode: str = "stream", encoding: str = "json", max_queue: int = 256,
+               overflow: str = "drop_oldest", tick_hz: float = 10.0) -> dict:
+    """Broadcast metrics at ``rate`` per second to simulated clients, some slow, and measure delivery."""
+    slow_clients = min(slow_clients, clients)
+    print(f"Fan-out: {clients} clients ({slow_clients} slow at {slow_delay_ms} ms/frame), "
+          f"{rate} metrics/s for {duration}s, {mode}/{encoding}, {overflow}")
+    result = asyncio.run(_fanout(clients, slow_clients, slow_delay_ms / 1000, rate, duration,
+                                 mode, encoding, max_queue, overflow, tick_hz))
+    print(f"Fan-out: fast p99 {result['fast']['latencyMs']['p99']} ms, "
+          f"slow dropped {result['slow']['droppedFrames']}, disconnected {result['slow']['disconnected']}")
+    return {
+        "params": {"clients": clients, "slowClients": slow_clients, "slowDelayMs": slow_delay_ms, "rate": rate,
+                   "duration": duration, "mode": mode, "encoding": encoding, "maxQueue": max_queue,
+                   "overflow": overflow, "tickHz": tick_hz},
+        **result,
+    }
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import torch
+from trainer import TrainingWorker, train_model
+from websocket_manager import WebSocketManager
+
+DEFAULT_MODELS = ("logreg", "mlp", "tiny-resnet", "simple-cnn")
+IMAGE_FEATURES = 28 * 28  # simple-cnn only takes 28x28 images
+
+def make_dataset(directory: str, rows: int, features: int, classes: int, seed: int = 0) -> str:
+    """Write a learnable synthetic CSV (labels from a fixed random projection); returns its path.
+
+    The same arguments always give the same file, so runs on different commits see identical data.
+    """
+    path = os.path.join(directory, f"synthetic-{rows}x{features}-{classes}c-s{seed}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((rows, features), dtype=np.float32)
+    projection = rng.standard_normal((features, classes), dtype=np.float32)
+    labels = (x @ projection).argmax(axis=1)
+    frame = pd.DataFrame(x, columns=[f"f{i}" for i in range(features)])
+    frame["label"] = [f"class{label}" for label in labels]
+    frame.to_csv(path, index=False)
+    return path
+
+class RecordingChannel(WebSocketManager):
+    """A channel without clients that keeps the profile summaries the relay broadcasts."""
+
+    def __init__(self):
+        super().__init__()
+        self.profiles: List[dict] = []
+        self.metrics = 0
+
+    async def broadcast(self, message: dict):
+        if message.get("type") == "profile":
+            self.profiles.append(message["payload"])
+        await super().broadcast(message)
+
+    async def send_metric(self, metric):
+        self.metrics += 1
+        await super().send_metric(metric)
+
+async def _run(config: dict, use_process: bool, num_threads: Optional[int]) -> dict:
+    channel = RecordingChannel()
+    worker = TrainingWorker(config, use_process=use_process, num_threads=num_threads)
+    started = time.perf_counter()
+    await train_model(channel, worker)
+    wall = time.perf_counter() - started
+    if worker.error:
+        raise RuntimeError(worker.error)
+    steps = sum(profile["steps"] for profile in channel.profiles)
+    # Time spent inside training steps, leaving out dataset loading and model construction
+    seconds = sum(profile["steps"] / profile["stepsPerSec"] for profile in channel.profiles if profile["stepsPerSec"])
+    phases = {}
+    for profile in channel.profiles:
+        for phase, ms in profile["phasesMs"].items():
+            phases[phase] = phases.get(phase, 0.0) + ms * profile["steps"]
+    return {
+        "runId": worker.run_id,
+        "steps": steps,
+        "stepSeconds": seconds,
+        "wallSeconds": wall,
+        "metricsRelayed": channel.metrics,
+        "performance": worker.performance,
+        "phasesMs": {phase: total / steps for phase, total in phases.items()} if steps else {},
+    }
+
+def run_training(data_dir: str, models=DEFAULT_MODELS, rows: int = 20_000, features: int = 32, classes: int = 4,
+                 epochs: int = 2, batch_size: int = 64, metrics_every: int = 1, use_process: bool = False,
+                 num_threads: Optional[int] = None, seed: int = 0, performance: bool = False,
+                 processes: int = 1) -> dict:
+    """Train each model type on a synthetic dataset and report step and sample throughput.
+
+    With ``processes`` > 1 runs are data-parallel; steps/s is then per rank and samples/s is for all ranks.
+    """
+    results = {}
+    for model_type in models:
+        width = IMAGE_FEATURES if model_type == "simple-cnn" else features
+        path = make_dataset(data_dir, rows, width, classes, seed)
+        config = {
+            "learningRate": 0.001,
+            "batchSize": batch_size,
+            "epochs": epochs,
+            "optimizer": "adam",
+            "modelType": model_type,
+            "modelName": "benchmark",
+            "metricsEvery": metrics_every,
+            "performance": performance,
+            "distributed": processes,
+            "dataset": {"name": os.path.basename(path), "path": os.path.abspath(path)},
+        }
+        torch.manual_seed(seed)
+        print(f"Benchmarking {model_type}: {rows} rows x {width} features, {epochs} epochs, batch {batch_size}")
+        try:
+            run = asyncio.run(_run(config, use_process, num_threads))
+        except Exception as e:
+            print(f"{model_type} failed: {e}")
+            results[model_type] = {"error": str(e)}
+            continue
+        seconds = run["stepSeconds"]
+        results[model_type] = {
+            **run,
+            "features": width,
+            "stepsPerSec": run["steps"] / seconds if seconds else None,
+            "samplesPerSec": rows * epochs / seconds if seconds else None,
+        }
+        if seconds:
+            print(f"{model_type}: {run['steps'] / seconds:.1f} steps/s, {rows * epochs / seconds:.0f} samples/s")
+    return {
+        "params": {"rows": rows, "features": features, "classes": classes, "epochs": epochs,
+                   "batchSize": batch_size, "metricsEvery": metrics_every,
+                   "backend": "process" if use_process else "thread", "numThreads": num_threads, "seed": seed,
+                   "performance": performance, "processes": processes},
+        "models": results,
+    }
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+import torch
+
+CHECKPOINT_DIR = "checkpoints"  # Inside each run's directory
+INDEX_FILE = "index.json"
+
+def _to_cpu(value):
+    """Detached CPU copy of every tensor in a (nested) state dict."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {k: _to_cpu(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_cpu(v) for v in value)
+    return value
+
+def snapshot(model: torch.nn.Module, optimizer: torch.optim.Optimizer, **meta) -> dict:
+    """Copy model and optimizer state to CPU memory; the only part of a checkpoint the training step waits for."""
+    return {"model": _to_cpu(model.state_dict()), "optimizer": _to_cpu(optimizer.state_dict()), **meta}
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories can't be opened
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _atomic_write(path: str, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+def read_index(directory: str) -> List[dict]:
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def latest_checkpoint(directory: str) -> Optional[dict]:
+    entries = read_index(directory)
+    return max(entries, key=lambda e: e["step"], default=None)
+
+def load_checkpoint(directory: str, entry: dict) -> dict:
+    return torch.load(os.path.join(directory, entry["file"]), map_location="cpu")
+
+class CheckpointWriter:
+    """Serializes snapshots to disk on a background thread.
+
+    Each checkpoint is written to a temporary file, fsynced and atomically
+    renamed, then recorded in ``index.json``. Retention keeps the newest
+    ``keep_last`` checkpoints plus the one with the lowest loss. If the writer
+    falls behind, a pending snapshot is replaced by the newer one rather than
+    queueing, so memory holds at most one unwritten snapshot.
+    """
+
+    def __init__(self, directory: str, keep_last: int = 3, keep_best: bool = True):
+        self.directory = directory
+        self.keep_last = max(1, keep_last)
+        self.keep_best = keep_best
+        os.makedirs(directory, exist_ok=True)
+        self.entries = read_index(directory)
+        self._pending: Optional[dict] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, state: dict):
+        """Hand over a snapshot (see ``snapshot``); returns immediately."""
+        with self._cond:
+            if self._pending is not None:
+                print(f"Checkpoint writer busy; skipping step {self._pending['step']}")
+            self._pending = state
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+            try:
+                self._write(state)
+            except Exception as e:
+                print(f"Failed to write checkpoint at step {state.get('step')}: {e}")
+
+    def _write(self, state: dict):
+        filename = f"ckpt-{state['step']:08d}.pt"
+        _atomic_write(os.path.join(self.directory, filename), lambda f: torch.save(state, f))
+        entry = {"file": filename, "step": state["step"], "epoch": state["epoch"],
+                 "epochComplete": state.get("epochComplete", True), "loss": state.get("loss"), "time": time.time()}
+        self.entries = [e for e in self.entries if e["file"] != filename] + [entry]
+        self._apply_retention()
+        payload = json.dumps(self.entries, indent=2).encode()
+        _atomic_write(os.path.join(self.directory, INDEX_FILE), lambda f: f.write(payload))
+
+    def _apply_retention(self):
+        keep = {e["file"] for e in sorted(self.entries, key=lambda e: e["step"])[-self.keep_last:]}
+        scored = [e for e in self.entries if e.get("loss") is not None]
+        if self.keep_best and scored:
+            keep.add(min(scored, key=lambda e: e["loss"])["file"])
+        for entry in self.entries:
+            if entry["file"] not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except FileNotFoundError:
+                    pass
+        self.entries = [e for e in self.entries if e["file"] in keep]
+
+    def close(self):
+        """Write any pending snapshot and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from config_store import ConfigError
+from scheduler import COMPLETED, FAILED, QUEUED, RUNNING, Job, JobScheduler
+from schemas import TrainingMetric
+from shared_state import SharedState, Subscription
+from websocket_manager import WebSocketManager
+
+# This server process; runs, their metric streams and RPCs are addressed by it
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+HEARTBEAT_SECONDS = 2.0
+RPC_TIMEOUT = 5.0
+# Messages waiting to be published before the oldest are dropped (the broker or Redis is too slow)
+MAX_OUTBOX = 10_000
+
+class WorkerUnavailable(RuntimeError):
+    pass
+
+def is_active(record: Optional[dict]) -> bool:
+    """Whether a job record (see Cluster.job) is queued or running."""
+    return record is not None and record["status"] in (QUEUED, RUNNING)
+
+class Cluster:
+    """Shares runs and their metric streams between the server's worker processes.
+
+    Runs execute in the worker that accepted them. Everything a run sends to
+    its channels is also published (``run:<id>``, and ``primary`` while it is
+    the primary run), and other workers replay it into their own channels, so
+    a client can connect to any worker. Jobs are recorded under ``job:<id>``
+    with the worker that owns them; stopping or reconfiguring a run on another
+    worker is forwarded to it over ``worker:<id>``. Sequence numbers stay per
+    worker: a client that reconnects to another worker is resynced from a snapshot.
+    """
+
+    def __init__(self, state: SharedState, scheduler: JobScheduler, default_channel: WebSocketManager,
+                 channel_factory: Callable[[str], WebSocketManager],
+                 on_remote_completed: Optional[Callable[[str], None]] = None):
+        self.state = state
+        self.scheduler = scheduler
+        self.default_channel = default_channel
+        self.channel_factory = channel_factory
+        self.on_remote_completed = on_remote_completed
+        self.mirrors: Dict[str, WebSocketManager] = {}
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._writes: asyncio.Queue = asyncio.Queue()  # (method, args) of shared state writes, in order
+        self._tasks: List[asyncio.Task] = []
+        self._mirror_tasks: Dict[str, asyncio.Task] = {}
+        # Concurrent first clients of a run wait for one mirror instead of each subscribing
+        self._mirror_locks: Dict[str, asyncio.Lock] = {}
+        scheduler.on_change = self.job_changed
+        if state.shared:
+            scheduler.mirror = self.mirror
+
+    async def start(self):
+        # The key/value methods of the shared state block (e.g. on another worker's SQLite write lock),
+        # so the event loop only ever calls them through a thread
+        await asyncio.to_thread(self._heartbeat)
+        await asyncio.to_thread(self._forget_dead_workers)
+        for channel, handle in (("primary", self._replay_primary), ("control", self._handle_control),
+                                (f"worker:{WORKER_ID}", self._handle_request)):
+            subscription = await self.state.subscribe(channel)
+            self._tasks.append(asyncio.create_task(self._consume(subscription, handle)))
+        self._tasks.append(asyncio.create_task(self._publish_loop()))
+        self._tasks.append(asyncio.create_task(self._write_loop()))
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+
+    async def close(self):
+        for task in self._tasks + list(self._mirror_tasks.values()):
+            task.cancel()
+        await asyncio.to_thread(self.state.delete, f"worker:{WORKER_ID}")
+        await self.state.close()
+
+    # Worker liveness
+
+    def _heartbeat(self):
+        self.state.set(f"worker:{WORKER_ID}", str(time.time()))
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            await asyncio.to_thread(self._heartbeat)
+
+    def _forget_dead_workers(self):
+        """Drop the records left by workers that are gone, e.g. from before a restart."""
+        for key in self.state.scan("worker:"):
+            if not self.worker_alive(key[len("worker:"):]):
+                self.state.delete(key)
+        for key, raw in self.state.scan("job:").items():
+            if not self.worker_alive(json.loads(raw)["worker"]):
+                self.state.delete(key)
+
+    def worker_alive(self, worker: str) -> bool:
+        if worker == WORKER_ID:
+            return True
+        seen = self.state.get(f"worker:{worker}")
+        return seen is not None and time.time() - float(seen) < 3 * HEARTBEAT_SECONDS
+
+    # Job records
+
+    def job_changed(self, job: Job, removed: bool = False):
+        """Record a local job's state for the other workers (the scheduler's ``on_change``)."""
+        if removed:
+            self._write(self.state.delete, f"job:{job.run_id}")
+            return
+        self._write(self.state.set, f"job:{job.run_id}", json.dumps({**job.to_dict(), "worker": WORKER_ID}, default=str))
+        if job.status == RUNNING and job.primary and self.scheduler.primary_run_id == job.run_id:
+            self._write(self.state.set, "primary", job.run_id)
+            self._send("control", {"op": "primary", "runId": job.run_id, "origin": WORKER_ID})
+        elif job.status == COMPLETED:
+            self._send("control", {"op": "finished", "runId": job.run_id, "origin": WORKER_ID})
+
+    def _record(self, raw: Optional[str]) -> Optional[dict]:
+        if raw is None:
+            return None
+        record = json.loads(raw)
+        if record["status"] in (QUEUED, RUNNING) and not self.worker_alive(record["worker"]):
+            record.update(status=FAILED, error=f"Server worker {record['worker']} exited.")
+        return record
+
+    async def job(self, run_id: str) -> Optional[dict]:
+        """A run's state, from this worker if it owns the run, else from its record."""
+        local = self.scheduler.get(run_id)
+        if local is not None:
+            return {**local.to_dict(), "worker": WORKER_ID}
+        return await asyncio.to_thread(self._stored_job, run_id)
+
+    def _stored_job(self, run_id: str) -> Optional[dict]:
+        return self._record(self.state.get(f"job:{run_id}"))
+
+    def _stored_jobs(self) -> Dict[str, Optional[dict]]:
+        return {key[len("job:"):]: self._record(raw) for key, raw in self.state.scan("job:").items()}
+
+    async def jobs(self) -> List[dict]:
+        records = await asyncio.to_thread(self._stored_jobs)
+        for job in self.scheduler.jobs.values():
+            records[job.run_id] = {**job.to_dict(), "worker": WORKER_ID}
+        return sorted(records.values(), key=lambda record: record["submittedAt"])
+
+    def primary_run_id(self) -> Optional[str]:
+        """Blocks on the shared state when no local run is primary; use primary_run from the event loop."""
+        return self.scheduler.primary_run_id or self.state.get("primary")
+
+    async def primary_run(self) -> Optional[str]:
+        return self.scheduler.primary_run_id or await asyncio.to_thread(self.state.get, "primary")
+
+    async def primary_job(self) -> Optional[dict]:
+        run_id = await self.primary_run()
+        return await self.job(run_id) if run_id else None
+
+    # Controlling runs on other workers
+
+    async def call(self, worker: str, op: str, **args):
+        """Run ``op`` on the worker owning a run and return its result."""
+        if not await asyncio.to_thread(self.worker_alive, worker):
+            raise WorkerUnavailable(f"Server worker {worker} is gone.")
+        reply = f"reply:{uuid.uuid4().hex}"
+        subscription = await self.state.subscribe(reply)
+        try:
+            await self.state.publish(f"worker:{worker}", json.dumps({"op": op, "reply": reply, **args}))
+            answer = json.loads(await asyncio.wait_for(subscription.get(), RPC_TIMEOUT))
+        except asyncio.TimeoutError:
+            raise WorkerUnavailable(f"Server worker {worker} did not answer.") from None
+        finally:
+            await subscription.close()
+        if "error" in answer:
+            raise ConfigError(answer["error"])
+        return answer["result"]
+
+    async def _handle_request(self, request: dict):
+        try:
+            if request["op"] == "stop":
+                job = self.scheduler.stop(request["runId"])
+                answer = {"result": job.to_dict() if job else None}
+            elif request["op"] == "update_config":
+                answer = {"result": self.scheduler.update_config(request["runId"], request["changes"])}
+            else:
+                answer = {"error": f"Unknown request '{request['op']}'."}
+        except ConfigError as e:
+            answer = {"error": str(e)}
+        await self.state.publish(request["reply"], json.dumps(answer, default=str))
+
+    async def stop(self, run_id: str) -> Optional[dict]:
+        if self.scheduler.get(run_id) is not None:
+            return {**self.scheduler.stop(run_id).to_dict(), "worker": WORKER_ID}
+        record = await self.job(run_id)
+        if not is_active(record):
+            return record
+        return await self.call(record["worker"], "stop", runId=run_id)
+
+    async def update_config(self, run_id: str, changes: dict) -> Optional[int]:
+        """Like JobScheduler.update_config, for a run on any worker."""
+        if self.scheduler.get(run_id) is not None:
+            return self.scheduler.update_config(run_id, changes)
+        record = await self.job(run_id)
+        if record is None:
+            return None
+        if not is_active(record):
+            raise ConfigError(f"Run '{run_id}' is {record['status']}; its config can no longer change.")
+        return await self.call(record["worker"], "update_config", runId=run_id, changes=changes)
+
+    async def wait(self, run_id: str):
+        if self.scheduler.get(run_id) is not None:
+            await self.scheduler.wait(run_id)
+            return
+        while True:
+            if not is_active(await self.job(run_id)):
+                return
+            await asyncio.sleep(0.2)
+
+    def _handle_control(self, message: dict):
+        if message["origin"] == WORKER_ID:
+            return
+        if message["op"] == "primary":
+            # Another worker's run took over /ws/train; ours stop mirroring to it
+            self.scheduler.primary_run_id = None
+        elif message["op"] == "finished" and self.on_remote_completed is not None:
+            self.on_remote_completed(message["runId"])
+
+    # Metric streams
+
+    def mirror(self, job: Job, primary: bool, op: str, payload):
+        """Publish a message a local run sent to its channels (the scheduler's ``mirror``)."""
+        event = {"op": op, "origin": WORKER_ID, "payload": payload.model_dump() if op == "metric" else payload}
+        self._send(f"run:{job.run_id}", event)
+        if primary:
+            self._send("primary", event)
+
+    def _send(self, channel: str, message: dict):
+        if self._outbox.qsize() >= MAX_OUTBOX:
+            self._outbox.get_nowait()
+        self._outbox.put_nowait((channel, json.dumps(message, default=str)))
+
+    def _write(self, method: Callable, *args):
+        self._writes.put_nowait((method, args))
+
+    async def _write_loop(self):
+        # Record writes go to the shared state in a thread, one at a time and in order
+        while True:
+            method, args = await self._writes.get()
+            try:
+                await asyncio.to_thread(method, *args)
+            except Exception as e:
+                print(f"Shared state: {method.__name__} {args[0]} failed: {e}")
+
+    async def _publish_loop(self):
+        # Publishing off the relay path keeps a slow broker from delaying local clients
+        while True:
+            channel, message = await self._outbox.get()
+            try:
+                await self.state.publish(channel, message)
+            except Exception as e:
+                print(f"Shared state: publishing to {channel} failed: {e}")
+
+    async def _consume(self, subscription: Subscription, handle):
+        async for raw in subscription:
+            try:
+                result = handle(json.loads(raw))
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"Shared state: bad message on {subscription.channel}: {e}")
+
+    async def _replay(self, channel: WebSocketManager, event: dict):
+        if event["origin"] == WORKER_ID:
+            return  # Sent to this worker's clients directly
+        if event["op"] == "metric":
+            await channel.send_metric(TrainingMetric(**event["payload"]))
+        elif event["op"] == "tip":
+            await channel.send_agent_tip(event["payload"])
+        else:
+            await channel.broadcast(event["payload"])
+
+    async def _replay_primary(self, event: dict):
+        await self._replay(self.default_channel, event)
+
+    async def channel(self, run_id: str) -> Optional[WebSocketManager]:
+        """The channel streaming a run on this worker: its own, or a mirror of another worker's run."""
+        local = self.scheduler.get(run_id)
+        if local is not None:
+            return local.channel
+        async with self._mirror_locks.setdefault(run_id, asyncio.Lock()):
+            if run_id not in self.mirrors:
+                if await self.job(run_id) is None:
+                    return None
+                channel = self.channel_factory(run_id)
+                subscription = await self.state.subscribe(f"run:{run_id}")
+                self.mirrors[run_id] = channel
+                self._mirror_tasks[run_id] = asyncio.create_task(
+                    self._consume(subscription, lambda event: self._replay(channel, event)))
+                self._mirror_tasks[run_id].add_done_callback(lambda _: asyncio.ensure_future(subscription.close()))
+            return self.mirrors[run_id]
+
+    def release(self, run_id: str):
+        """Stop mirroring a run once its last client on this worker is gone."""
+        channel = self.mirrors.get(run_id)
+        if channel is not None and not channel.clients and not channel.joining:
+            del self.mirrors[run_id]
+            self._mirror_tasks.pop(run_id).cancel()
+            if not self._mirror_locks[run_id].locked():
+                del self._mirror_locks[run_id]
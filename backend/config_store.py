@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from typing import Dict, List, Optional
+from pydantic import ValidationError
+from schemas import TrainingConfig
+
+# Fields a running job picks up at its next step boundary; everything else needs a new run
+MUTABLE_FIELDS = ("learningRate", "batchSize", "metricsEvery", "epochs")
+
+class ConfigError(ValueError):
+    pass
+
+def validate_config(config: dict) -> dict:
+    """Validate a full config and return it with defaults filled in."""
+    try:
+        return TrainingConfig(**config).model_dump()
+    except ValidationError as e:
+        problems = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+        raise ConfigError("Invalid config: " + "; ".join(problems)) from None
+
+def changed_fields(old: dict, new: dict) -> List[str]:
+    return [key for key in new if old.get(key) != new[key]]
+
+def live_changes(current: dict, changes: dict) -> Dict[str, object]:
+    """The subset of ``changes`` to push to a run whose config is ``current``.
+
+    Raises ConfigError if an immutable field would change or a value is invalid.
+    """
+    changed = changed_fields(current, changes)
+    immutable = [key for key in changed if key not in MUTABLE_FIELDS]
+    if immutable:
+        raise ConfigError(
+            f"{', '.join(immutable)} can't be changed on a running job; restart it to apply. "
+            f"Live-editable fields: {', '.join(MUTABLE_FIELDS)}"
+        )
+    validated = validate_config({**current, **{key: changes[key] for key in changed}})
+    return {key: validated[key] for key in changed}
+
+class VersionedConfig:
+    """The server's current config; every accepted update bumps ``version``.
+
+    ``values`` is updated in place, so code holding a reference sees the latest config.
+    With a ``state`` (see shared_state) the config is shared by all server workers:
+    await ``refresh()`` before reading ``values`` to pick up other workers' updates.
+    """
+
+    def __init__(self, initial: dict, state=None, key: str = "config"):
+        self.values = validate_config(initial)
+        self.version = 1
+        self._lock = threading.Lock()
+        self._state = state
+        self._key = key
+        if state is not None:
+            raw = state.get(key)
+            if self._load() is None:
+                # The first worker seeds the shared config (or replaces one this version can't read); the others adopt it
+                state.compare_and_set(key, raw, json.dumps({"version": self.version, "values": self.values}))
+            self._apply(self._load())
+
+    def _load(self) -> Optional[tuple]:
+        """The shared (raw, version, values); None if unset or no longer valid."""
+        raw = self._state.get(self._key)
+        if raw is None:
+            return None
+        stored = json.loads(raw)
+        try:
+            return raw, stored["version"], validate_config(stored["values"])
+        except ConfigError:
+            return None
+
+    def _apply(self, stored: Optional[tuple]):
+        with self._lock:
+            if stored is not None and (stored[1], stored[2]) != (self.version, self.values):
+                _, self.version, values = stored
+                self.values.clear()
+                self.values.update(values)
+
+    async def refresh(self):
+        """Pick up other workers' updates; the shared state is read in a thread, off the event loop."""
+        if self._state is not None:
+            self._apply(await asyncio.to_thread(self._load))
+
+    async def update(self, changes: dict, expected_version: Optional[int] = None) -> int:
+        if self._state is not None:
+            # Waits on the other workers' write lock, so not on the event loop
+            stored = await asyncio.to_thread(self._update_shared, changes, expected_version)
+            self._apply(stored)
+            return stored[1]
+        with self._lock:
+            if expected_version is not None and expected_version != self.version:
+                raise ConfigError(f"Config changed meanwhile (now version {self.version}, expected {expected_version}).")
+            merged = validate_config({**self.values, **changes})
+            if merged != self.values:
+                self.values.clear()
+                self.values.update(merged)
+                self.version += 1
+            return self.version
+
+    def _update_shared(self, changes: dict, expected_version: Optional[int]) -> tuple:
+        """Merge ``changes`` into the shared config; returns the (raw, version, values) stored now."""
+        while True:
+            stored = self._load()
+            raw, version, values = stored if stored is not None else (self._state.get(self._key), self.version, self.values)
+            if expected_version is not None and expected_version != version:
+                raise ConfigError(f"Config changed meanwhile (now version {version}, expected {expected_version}).")
+            merged = validate_config({**values, **changes})
+            if merged == values:
+                return raw, version, values
+            # Another worker may update it in between; then merge into its version instead
+            updated = json.dumps({"version": version + 1, "values": merged})
+            if self._state.compare_and_set(self._key, raw, updated):
+                return updated, version + 1, merged
@@ -0,0 +1,360 @@
+import copy
+import os
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, IterableDataset, Sampler, TensorDataset, get_worker_info
+import dataset_cache
+
+# CSVs larger than this are streamed instead of loaded into one DataFrame
+STREAM_THRESHOLD_BYTES = int(os.getenv("STREAM_THRESHOLD_BYTES", str(512 * 1024 * 1024)))
+CSV_CHUNK_ROWS = 50_000
+DEFAULT_SHUFFLE_BUFFER = 200_000  # rows held in memory for shuffling while streaming
+
+class TrainingData(NamedTuple):
+    loader: object  # Re-iterable once per epoch, yields (features, labels) batches
+    input_dim: int
+    num_classes: int
+    num_rows: Optional[int]
+
+class Holdout(NamedTuple):
+    """Held-out rows, for validation: features, labels and the label names in class-index order."""
+    x: torch.Tensor
+    y: torch.Tensor
+    classes: list
+
+# Dataset paths from clients must resolve to a file under one of these
+DATASET_ROOTS = (dataset_cache.UPLOAD_DIR, os.path.join("..", "dataset"))
+
+def _inside(path: str, root: str) -> bool:
+    root = os.path.realpath(root)
+    return os.path.commonpath([os.path.realpath(path), root]) == root
+
+def resolve_dataset_path(dataset: dict) -> str:
+    """Locate a dataset file, preferring the upload directory over the repo root.
+
+    Raises ValueError for a path that leads outside DATASET_ROOTS.
+    """
+    filename = dataset['path']
+    candidates = [os.path.join(dataset_cache.UPLOAD_DIR, filename), os.path.normpath(os.path.join("../", filename))]
+    candidates = [c for c in candidates if any(_inside(c, root) for root in DATASET_ROOTS)]
+    if not candidates:
+        raise ValueError(f"Dataset path '{filename}' is outside the dataset directories")
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return candidates[-1]
+
+def load_dataset(dataset_path: str):
+    """Load a CSV into (features, labels, class names); the last column is the label."""
+    data = pd.read_csv(dataset_path)
+    features = data.iloc[:, :-1].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    codes, classes = pd.factorize(data.iloc[:, -1])
+    x = torch.tensor(features.to_numpy(dtype="float32"))
+    y = torch.as_tensor(codes, dtype=torch.long)
+    return x, y, list(classes)
+
+def holdout_mask(rows: np.ndarray, fraction: float, seed: int = 0) -> np.ndarray:
+    """Whether each row, by its index in the file, is held out for validation.
+
+    A hash of the index (splitmix64) decides, so the held-out rows are the
+    same every epoch, on every rank and for every reader of the dataset, and
+    nothing has to be stored to find them again.
+    """
+    h = rows.astype(np.uint64) + np.uint64((seed + 1) * 0x9E3779B97F4A7C15 % (1 << 64))
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(40)) < np.uint64(int(fraction * (1 << 24)))
+
+def scan_csv(path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> Tuple[List[str], list, int]:
+    """One streaming pass over only the label column: (columns, label vocabulary, row count)."""
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    vocabulary = pd.Index([])
+    rows = 0
+    for chunk in pd.read_csv(path, usecols=[columns[-1]], chunksize=chunk_rows):
+        labels = chunk.iloc[:, 0].dropna()
+        # Vectorized merge keeping first-appearance order, like pd.factorize on the full column
+        uniques = pd.Index(pd.unique(labels))
+        vocabulary = vocabulary.append(uniques[~uniques.isin(vocabulary)])
+        rows += len(chunk)
+    return columns, list(vocabulary), rows
+
+class _BatchStream(IterableDataset):
+    """Yields shuffled (features, labels) batches from a source read in chunks.
+
+    Chunks are pooled into a shuffle buffer of ``shuffle_buffer`` rows, which is
+    permuted and cut into batches; leftover rows carry over. Memory stays bounded
+    by the buffer size regardless of dataset size. ``batch_size`` may be changed
+    at any time and applies from the next batch (read by DataLoader workers only
+    when they start). With ``world_size`` > 1, rank ``rank`` only reads every
+    ``world_size``-th chunk; all ranks share ``seed``, so they agree on the chunk
+    order. DataLoader workers split a rank's chunks the same way. Rows picked by holdout_mask(``holdout``,
+    ``holdout_seed``) are skipped.
+    """
+
+    def __init__(self, batch_size: int, shuffle_buffer: int = DEFAULT_SHUFFLE_BUFFER, seed: int = 0,
+                 rank: int = 0, world_size: int = 1, holdout: float = 0.0, holdout_seed: int = 0):
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.holdout = holdout
+        self.holdout_seed = holdout_seed
+        self._epoch = 0
+
+    def _readers(self) -> int:
+        """How many readers split the chunks: DataLoader workers of every rank."""
+        worker = get_worker_info()
+        return self.world_size * (worker.num_workers if worker is not None else 1)
+
+    def _mine(self, chunk_index: int) -> bool:
+        worker = get_worker_info()
+        workers, worker_id = (worker.num_workers, worker.id) if worker is not None else (1, 0)
+        return chunk_index % (self.world_size * workers) == self.rank * workers + worker_id
+
+    def _chunks(self, rng: np.random.Generator) -> Iterator[Tuple[np.ndarray, np.ndarray, int]]:
+        """Yield (features, labels, index of the chunk's first row in the file)."""
+        raise NotImplementedError
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self._epoch)
+        self._epoch += 1
+        pending_x: List[np.ndarray] = []
+        pending_y: List[np.ndarray] = []
+        buffered = 0
+        for x, y, first_row in self._chunks(rng):
+            keep = y >= 0  # Rows with a missing label can't be trained on
+            if self.holdout:
+                keep &= ~holdout_mask(np.arange(first_row, first_row + len(y)), self.holdout, self.holdout_seed)
+            pending_x.append(x[keep])
+            pending_y.append(y[keep])
+            buffered += int(keep.sum())
+            if buffered >= self.shuffle_buffer:
+                pending_x, pending_y, buffered = yield from self._drain(pending_x, pending_y, rng, final=False)
+        yield from self._drain(pending_x, pending_y, rng, final=True)
+
+    def _drain(self, pending_x, pending_y, rng, final: bool):
+        if not pending_x:
+            return [], [], 0
+        x = np.concatenate(pending_x)
+        y = np.concatenate(pending_y)
+        order = rng.permutation(len(y))
+        x, y = x[order], y[order]
+        start = 0
+        # Re-read batch_size per batch so a live config change applies at the next step
+        while len(y) - start >= self.batch_size:
+            end = start + self.batch_size
+            yield torch.from_numpy(x[start:end]), torch.from_numpy(y[start:end])
+            start = end
+        if final:
+            if start < len(y):
+                yield torch.from_numpy(x[start:]), torch.from_numpy(y[start:])
+            return [], [], 0
+        return [x[start:]], [y[start:]], len(y) - start
+
+class CsvBatchStream(_BatchStream):
+    """Streams a CSV chunk by chunk; labels are mapped onto a vocabulary found up front."""
+
+    def __init__(self, path: str, vocabulary: list, batch_size: int, chunk_rows: int = CSV_CHUNK_ROWS, **kwargs):
+        super().__init__(batch_size, **kwargs)
+        self.path = path
+        self.vocabulary = pd.Index(vocabulary)
+        self.chunk_rows = chunk_rows
+
+    def _chunks(self, rng):
+        for index, chunk in enumerate(pd.read_csv(self.path, chunksize=self.chunk_rows)):
+            if not self._mine(index):
+                continue
+            features = chunk.iloc[:, :-1].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+            labels = self.vocabulary.get_indexer(chunk.iloc[:, -1])
+            yield features.to_numpy(dtype=np.float32), labels.astype(np.int64), index * self.chunk_rows
+
+class MemmapBatchStream(_BatchStream):
+    """Streams a memory-mapped dataset in shuffled contiguous blocks, so reads stay sequential."""
+
+    def __init__(self, meta: dict, batch_size: int, block_rows: int = 8192, **kwargs):
+        super().__init__(batch_size, **kwargs)
+        self.meta = meta
+        self.x, self.y = dataset_cache.open_memmap(meta)
+        self.block_rows = block_rows
+
+    def __getstate__(self):
+        # DataLoader workers map the files again instead of receiving a copy of the data
+        return {k: v for k, v in self.__dict__.items() if k not in ("x", "y")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.x, self.y = dataset_cache.open_memmap(self.meta)
+
+    def _chunks(self, rng):
+        # Smaller blocks when the dataset has fewer blocks than readers, so every reader gets rows
+        block_rows = min(self.block_rows, max(1, -(-len(self.y) // self._readers())))
+        starts = np.arange(0, len(self.y), block_rows)
+        for index, start in enumerate(rng.permutation(starts)):
+            if not self._mine(index):
+                continue
+            end = start + block_rows
+            yield np.asarray(self.x[start:end]), np.asarray(self.y[start:end]), start
+
+class ShuffledBatchSampler(Sampler):
+    """Random batches of indices whose ``batch_size`` can change mid-epoch.
+
+    DataLoader freezes its own ``batch_size``; with num_workers=0 it pulls one
+    batch of indices at a time from this sampler, so a new size applies from the
+    next step. With ``world_size`` > 1 every rank draws the same permutation
+    (seeded with ``seed`` and the epoch) and takes its own stride of it.
+    """
+
+    def __init__(self, num_rows: int, batch_size: int, seed: Optional[int] = None, rank: int = 0,
+                 world_size: int = 1):
+        self.num_rows = num_rows
+        self.batch_size = batch_size
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self._epoch = 0
+
+    def __iter__(self):
+        generator = None
+        if self.seed is not None:
+            generator = torch.Generator().manual_seed(self.seed + self._epoch)
+        self._epoch += 1
+        order = torch.randperm(self.num_rows, generator=generator)[self.rank::self.world_size].tolist()
+        start = 0
+        while start < len(order):
+            end = start + self.batch_size
+            yield order[start:end]
+            start = end
+
+    def __len__(self):
+        return -(-len(range(self.rank, self.num_rows, self.world_size)) // self.batch_size)
+
+def configure_loader(loader: DataLoader, batch_size: int, workers: int = 0, prefetch: int = 2,
+                     pin_memory: bool = False, shuffle_buffer: Optional[int] = None) -> DataLoader:
+    """A new loader over the same data as one made by open_training_data, with other loading settings.
+
+    Workers are spawned, not forked (the process already runs torch threads),
+    and kept for the whole run.
+    """
+    settings = {"num_workers": workers, "pin_memory": pin_memory}
+    if workers:
+        settings.update(prefetch_factor=prefetch, persistent_workers=True, multiprocessing_context="spawn")
+    if isinstance(loader.batch_sampler, ShuffledBatchSampler):
+        sampler = copy.copy(loader.batch_sampler)
+        sampler.batch_size = batch_size
+        return DataLoader(loader.dataset, batch_sampler=sampler, **settings)
+    stream = copy.copy(loader.dataset)
+    stream.batch_size = batch_size
+    if shuffle_buffer is not None:
+        stream.shuffle_buffer = shuffle_buffer
+    return DataLoader(stream, batch_size=None, **settings)
+
+def set_batch_size(loader: DataLoader, batch_size: int) -> bool:
+    """Change the batch size of a loader made by open_training_data, from its next batch on.
+
+    Returns False when it can't: a stream read by worker processes batches
+    rows in its copies there, which keep the size they started with.
+    """
+    if isinstance(loader.batch_sampler, ShuffledBatchSampler):
+        loader.batch_sampler.batch_size = batch_size
+        return True
+    if loader.num_workers:
+        return False
+    loader.dataset.batch_size = batch_size
+    return True
+
+def preprocess_for_ranks(dataset: dict, streaming: Optional[bool] = None) -> dict:
+    """``dataset`` pointing at a preprocessed cache when open_training_data would load it into memory.
+
+    Data-parallel ranks then memory-map one copy of the rows, sharing its pages,
+    instead of each holding the whole CSV. Datasets that are cached or streamed
+    already are returned as they are.
+    """
+    cached = dataset_cache.read_meta(dataset.get('sha256'))
+    if cached is not None and cached["rows"] > 0:
+        return dataset
+    path = resolve_dataset_path(dataset)
+    if streaming or (streaming is None and os.path.getsize(path) > STREAM_THRESHOLD_BYTES):
+        return dataset
+    digest = dataset_cache.hash_file(path)
+    dataset_cache.preprocess_csv(path, digest)
+    return {**dataset, "sha256": digest}
+
+def open_training_data(dataset: dict, batch_size: int, streaming: Optional[bool] = None,
+                       shuffle_buffer: int = DEFAULT_SHUFFLE_BUFFER, rank: int = 0, world_size: int = 1,
+                       seed: Optional[int] = None, holdout: float = 0.0, holdout_seed: int = 0) -> TrainingData:
+    """Pick the cheapest way to feed a dataset to the training loop.
+
+    A preprocessed cache is streamed from its memory map. Otherwise CSVs are
+    streamed when ``streaming`` is set (or the file exceeds STREAM_THRESHOLD_BYTES)
+    and loaded into memory when small. Data-parallel ranks pass their ``rank``,
+    the ``world_size`` and a shared ``seed`` to get their shard of each epoch.
+    A ``holdout`` fraction of the rows is left out for validation (see load_holdout).
+    """
+    shard = {"rank": rank, "world_size": world_size, "holdout": holdout, "holdout_seed": holdout_seed}
+    cached = dataset_cache.read_meta(dataset.get('sha256'))
+    if cached is not None and cached["rows"] > 0:
+        print(f"Streaming cached dataset {cached['sha256'][:12]} ({cached['rows']} rows)")
+        stream = MemmapBatchStream(cached, batch_size, shuffle_buffer=shuffle_buffer, seed=seed or 0, **shard)
+        return TrainingData(DataLoader(stream, batch_size=None), cached["features"], len(cached["classes"]), cached["rows"])
+    path = resolve_dataset_path(dataset)
+    if streaming is None:
+        streaming = os.path.getsize(path) > STREAM_THRESHOLD_BYTES
+    if streaming:
+        print(f"Streaming dataset from: {path}")
+        columns, vocabulary, rows = scan_csv(path)
+        stream = CsvBatchStream(path, vocabulary, batch_size, shuffle_buffer=shuffle_buffer, seed=seed or 0, **shard)
+        return TrainingData(DataLoader(stream, batch_size=None), len(columns) - 1, len(vocabulary), rows)
+    print(f"Loading dataset from: {path}")
+    x, y, classes = load_dataset(path)
+    keep = y >= 0  # Rows with a missing label can't be trained on
+    if holdout:
+        # Held-out rows are picked by their index in the file, before unlabeled rows are dropped
+        keep &= torch.from_numpy(~holdout_mask(np.arange(len(y)), holdout, holdout_seed))
+    if not bool(keep.all()):
+        x, y = x[keep], y[keep]
+    loader = DataLoader(TensorDataset(x, y), batch_sampler=ShuffledBatchSampler(len(y), batch_size, seed, rank, world_size))
+    return TrainingData(loader, x.shape[1], len(classes), len(y))
+
+def _every_nth(rows: np.ndarray, max_rows: int) -> np.ndarray:
+    return rows[::-(-len(rows) // max_rows)] if len(rows) > max_rows else rows
+
+def load_holdout(dataset: dict, fraction: float, seed: int = 0, max_rows: int = 50_000,
+                 streaming: Optional[bool] = None) -> Holdout:
+    """The rows open_training_data leaves out with the same ``fraction`` and ``seed``.
+
+    Reads the dataset the way training does, with the same label encoding. When
+    more than ``max_rows`` rows are held out, an evenly spaced sample of them is kept.
+    """
+    cached = dataset_cache.read_meta(dataset.get('sha256'))
+    if cached is not None and cached["rows"] > 0:
+        x, y = dataset_cache.open_memmap(cached)
+        rows = _every_nth(np.flatnonzero(holdout_mask(np.arange(cached["rows"]), fraction, seed)), max_rows)
+        x, y = np.asarray(x[rows]), np.asarray(y[rows])
+        classes = cached["classes"]
+    else:
+        path = resolve_dataset_path(dataset)
+        if streaming is None:
+            streaming = os.path.getsize(path) > STREAM_THRESHOLD_BYTES
+        if streaming:
+            _, classes, total = scan_csv(path)
+            vocabulary = pd.Index(classes)
+            stride = max(1, -(-int(total * fraction) // max_rows))
+            parts_x, parts_y, seen = [], [], 0
+            for index, chunk in enumerate(pd.read_csv(path, chunksize=CSV_CHUNK_ROWS)):
+                held = np.flatnonzero(holdout_mask(np.arange(len(chunk)) + index * CSV_CHUNK_ROWS, fraction, seed))
+                # Every stride-th held-out row of the whole file, counting those in earlier chunks
+                chunk = chunk.iloc[held[(-seen) % stride::stride]]
+                seen += len(held)
+                parts_x.append(chunk.iloc[:, :-1].apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=np.float32))
+                parts_y.append(vocabulary.get_indexer(chunk.iloc[:, -1]).astype(np.int64))
+            x, y = np.concatenate(parts_x), np.concatenate(parts_y)
+        else:
+            features, labels, classes = load_dataset(path)
+            rows = _every_nth(np.flatnonzero(holdout_mask(np.arange(len(labels)), fraction, seed)), max_rows)
+            x, y = features.numpy()[rows], labels.numpy()[rows]
+    labeled = y >= 0
+    return Holdout(torch.from_numpy(np.ascontiguousarray(x[labeled])), torch.from_numpy(y[labeled]), list(classes))
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import BinaryIO, Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+UPLOAD_DIR = os.getenv("DATASET_DIR", "dataset")
+# Preprocessed datasets live in CACHE_DIR/<sha256>/ as raw arrays that training memory-maps
+CACHE_DIR = os.getenv("DATASET_CACHE_DIR", os.path.join(UPLOAD_DIR, ".cache"))
+CHUNK_SIZE = 1 << 20  # bytes per upload read
+CSV_CHUNK_ROWS = 100_000  # rows per pandas chunk while preprocessing
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def _copy_and_hash(source: BinaryIO, dest: BinaryIO) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        dest.write(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store_upload(source: BinaryIO, filename: str, upload_dir: str = UPLOAD_DIR) -> Tuple[str, str, int]:
+    """Stream an upload to disk in chunks while hashing it.
+
+    Returns (path, sha256, size). If identical content was uploaded before, the
+    existing file is reused and nothing new is written.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=upload_dir, prefix=".upload-", delete=False) as tmp:
+        digest, size = _copy_and_hash(source, tmp)
+    meta = read_meta(digest)
+    if meta and source_unchanged(meta):
+        os.remove(tmp.name)
+        print(f"Dataset {filename} matches already uploaded {meta['source']}; reusing it.")
+        return meta["source"], digest, size
+    path = os.path.join(upload_dir, os.path.basename(filename))
+    os.replace(tmp.name, path)
+    return path, digest, size
+
+def valid_digest(digest: Optional[str]) -> bool:
+    """Whether ``digest`` is a hex sha256, and so safe to use as a file name."""
+    return isinstance(digest, str) and DIGEST_PATTERN.match(digest) is not None
+
+def cache_path(digest: str) -> str:
+    if not valid_digest(digest):
+        raise ValueError(f"Not a sha256 digest: {digest!r}")
+    return os.path.join(CACHE_DIR, digest)
+
+def source_unchanged(meta: dict) -> bool:
+    """Whether the file a cache entry was built from still holds the same bytes."""
+    try:
+        stat = os.stat(meta["source"])
+    except OSError:
+        return False
+    return stat.st_size == meta.get("source_size") and stat.st_mtime_ns == meta.get("source_mtime_ns")
+
+def read_meta(digest: Optional[str]) -> Optional[dict]:
+    """Metadata of a preprocessed dataset, or None if it isn't cached (yet)."""
+    if not valid_digest(digest):
+        return None
+    meta_path = os.path.join(cache_path(digest), "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+def known_digest(digest: Optional[str], path: str) -> bool:
+    """Whether a client-supplied ``digest`` is that of the upload at ``path``, so it needn't be hashed again."""
+    meta = read_meta(digest)
+    if not meta or not source_unchanged(meta):
+        return False
+    try:
+        return os.path.samefile(meta["source"], path)
+    except OSError:
+        return False
+
+def preprocess_csv(source: str, digest: str, on_chunk: Optional[Callable[[pd.DataFrame], None]] = None) -> dict:
+    """Convert a CSV once into float32 features and int64 labels keyed by content hash.
+
+    The last column is the label, matching data_pipeline.load_dataset. Runs chunk by
+    chunk, so memory use doesn't depend on the file size. ``on_chunk`` sees every
+    parsed chunk (e.g. to profile the file in the same pass).
+    """
+    existing = read_meta(digest)
+    if existing:
+        return existing
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=CACHE_DIR, prefix=f".{digest[:12]}-")
+    try:
+        classes = {}
+        rows, columns = 0, None
+        with open(os.path.join(staging, "features.f32"), "wb") as features_file, \
+                open(os.path.join(staging, "labels.i64"), "wb") as labels_file:
+            for chunk in pd.read_csv(source, chunksize=CSV_CHUNK_ROWS):
+                if columns is None:
+                    columns = [str(c) for c in chunk.columns]
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                features = chunk.iloc[:, :-1].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+                features_file.write(np.ascontiguousarray(features.to_numpy(dtype=np.float32)).tobytes())
+                # Factorize per chunk, then map the chunk's vocabulary onto the global one
+                codes, uniques = pd.factorize(chunk.iloc[:, -1])
+                lookup = np.array([classes.setdefault(u, len(classes)) for u in uniques] + [-1], dtype=np.int64)
+                labels_file.write(lookup[codes].tobytes())
+                rows += len(chunk)
+        stat = os.stat(source)
+        meta = {
+            "sha256": digest,
+            "source": source,
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "rows": rows,
+            "features": len(columns) - 1 if columns else 0,
+            "columns": columns or [],
+            "classes": [str(c) for c in classes],
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, cache_path(digest))
+        except OSError:
+            # Another worker finished the same dataset first
+            shutil.rmtree(staging, ignore_errors=True)
+        print(f"Cached dataset {source} ({rows} rows) as {cache_path(digest)}")
+        return meta
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def open_memmap(meta: dict):
+    """Memory-map a preprocessed dataset's (features, labels) arrays.
+
+    Pages are copy-on-write, so nothing is parsed and only touched rows are read.
+    """
+    directory = cache_path(meta["sha256"])
+    rows, width = meta["rows"], meta["features"]
+    x = np.memmap(os.path.join(directory, "features.f32"), dtype=np.float32, mode="c", shape=(rows, width))
+    y = np.memmap(os.path.join(directory, "labels.i64"), dtype=np.int64, mode="c", shape=(rows,))
+    return x, y
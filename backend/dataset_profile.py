@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import dataset_cache
+
+# Profiles are cached here by the dataset's content hash
+PROFILE_DIR = os.path.join(dataset_cache.CACHE_DIR, "profiles")
+MAX_LABELS = 1000  # distinct label values counted before the histogram is cut off
+MAX_WARNINGS = 20
+ESTIMATE_BYTES = 1 << 20  # read to estimate the row count of a file not profiled yet
+
+class DatasetProfiler:
+    """Profile of a CSV built from its chunks in one pass: column types and stats, label histogram.
+
+    Every statistic is a per-column reduction over the whole chunk, so the cost
+    is a few vectorized passes per chunk and memory doesn't grow with the file.
+    The last column is the label, as in training.
+    """
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+        self.labels: Dict[str, int] = {}
+        self.labels_truncated = False
+
+    def update(self, chunk: pd.DataFrame):
+        # Values training can't read as numbers become NaN here (and 0 in training)
+        numeric = chunk.apply(pd.to_numeric, errors="coerce").astype("float64")
+        present = chunk.notna()
+        if self.columns is None:
+            self.columns = [str(c) for c in chunk.columns]
+            zeros = pd.Series(0, index=chunk.columns, dtype="int64")
+            self.nulls, self.non_numeric, self.counts = zeros.copy(), zeros.copy(), zeros.copy()
+            self.sums = pd.Series(0.0, index=chunk.columns)
+            self.mins = pd.Series(np.inf, index=chunk.columns)
+            self.maxs = pd.Series(-np.inf, index=chunk.columns)
+            self.integral = pd.Series(True, index=chunk.columns)
+        self.nulls += (~present).sum()
+        self.non_numeric += (present & numeric.isna()).sum()
+        self.counts += numeric.count()
+        self.sums += numeric.sum()
+        self.mins = np.fmin(self.mins, numeric.min())
+        self.maxs = np.fmax(self.maxs, numeric.max())
+        self.integral &= ((numeric % 1 == 0) | numeric.isna()).all()
+        for value, count in chunk.iloc[:, -1].dropna().astype(str).value_counts().items():
+            if value in self.labels:
+                self.labels[value] += int(count)
+            elif len(self.labels) < MAX_LABELS:
+                self.labels[value] = int(count)
+            else:
+                self.labels_truncated = True
+        self.rows += len(chunk)
+
+    def _column(self, i: int) -> dict:
+        count = int(self.counts.iloc[i])
+        nulls = int(self.nulls.iloc[i])
+        if nulls == self.rows:
+            kind = "empty"
+        elif self.non_numeric.iloc[i]:
+            kind = "string"
+        else:
+            kind = "integer" if self.integral.iloc[i] else "float"
+        return {
+            "name": self.columns[i],
+            "type": kind,
+            "nulls": nulls,
+            "nonNumeric": int(self.non_numeric.iloc[i]),
+            "min": float(self.mins.iloc[i]) if count else None,
+            "max": float(self.maxs.iloc[i]) if count else None,
+            "mean": float(self.sums.iloc[i]) / count if count else None,
+        }
+
+    def _warnings(self, columns: List[dict], label: dict) -> List[str]:
+        warnings = []
+        for column in columns[:-1]:
+            if column["type"] == "empty":
+                warnings.append(f"{column['name']}: every value is missing")
+            elif column["nonNumeric"]:
+                warnings.append(f"{column['name']}: {column['nonNumeric']} non-numeric values, read as 0 in training")
+            elif column["min"] == column["max"]:
+                warnings.append(f"{column['name']}: constant ({column['min']:g}), adds nothing to training")
+            if column["nulls"] and column["type"] != "empty":
+                warnings.append(f"{column['name']}: {column['nulls']} missing values, read as 0 in training")
+        labeled = sum(label["classes"].values())
+        if labeled < self.rows:
+            warnings.append(f"{self.rows - labeled} rows have no label")
+        if label["distinct"] < 2:
+            warnings.append(f"The label column ({label['column']}) has fewer than 2 classes")
+        elif label["truncated"] or label["distinct"] > 100:
+            warnings.append(f"The label column ({label['column']}) has {'over ' if label['truncated'] else ''}"
+                            f"{label['distinct']} distinct values; training expects class labels in the last column")
+        else:
+            rarest, count = min(label["classes"].items(), key=lambda item: item[1])
+            if count < 0.01 * labeled:
+                warnings.append(f"Class '{rarest}' has only {count} rows ({count / labeled:.2%}); classes are imbalanced")
+        return warnings[:MAX_WARNINGS]
+
+    def result(self) -> dict:
+        if self.columns is None:
+            return {"rows": 0, "columns": [], "label": None, "warnings": ["The file has no rows"]}
+        columns = [self._column(i) for i in range(len(self.columns))]
+        label = {
+            "column": self.columns[-1],
+            # Most frequent first
+            "classes": dict(sorted(self.labels.items(), key=lambda item: -item[1])),
+            "distinct": len(self.labels),
+            "truncated": self.labels_truncated,
+        }
+        return {"rows": self.rows, "columns": columns, "label": label, "warnings": self._warnings(columns, label)}
+
+def profile_path(digest: str) -> str:
+    if not dataset_cache.valid_digest(digest):
+        raise ValueError(f"Not a sha256 digest: {digest!r}")
+    return os.path.join(PROFILE_DIR, f"{digest}.json")
+
+def read_profile(digest: Optional[str]) -> Optional[dict]:
+    if not dataset_cache.valid_digest(digest) or not os.path.exists(profile_path(digest)):
+        return None
+    with open(profile_path(digest)) as f:
+        return json.load(f)
+
+def _save(profile: dict) -> dict:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=PROFILE_DIR, prefix=".profile-", delete=False) as tmp:
+        json.dump(profile, tmp)
+    os.replace(tmp.name, profile_path(profile["sha256"]))
+    return profile
+
+def profile_csv(source: str, digest: str) -> dict:
+    """Profile a CSV in one streaming pass and cache the result under its content hash."""
+    existing = read_profile(digest)
+    if existing:
+        return existing
+    profiler = DatasetProfiler()
+    for chunk in pd.read_csv(source, chunksize=dataset_cache.CSV_CHUNK_ROWS):
+        profiler.update(chunk)
+    return _save({"sha256": digest, "name": os.path.basename(source), **profiler.result()})
+
+def preprocess_and_profile(source: str, digest: str) -> dict:
+    """Build a CSV's training cache (see dataset_cache.preprocess_csv) and its profile in the same pass."""
+    if read_profile(digest):
+        return dataset_cache.preprocess_csv(source, digest)
+    profiler = DatasetProfiler()
+    meta = dataset_cache.preprocess_csv(source, digest, on_chunk=profiler.update)
+    if profiler.columns is None and meta["rows"]:
+        # The training cache already existed, so nothing was read
+        profile_csv(source, digest)
+    else:
+        _save({"sha256": digest, "name": os.path.basename(source), **profiler.result()})
+    print(f"Profiled dataset {source}")
+    return meta
+
+# Content hashes of files already hashed, by (path, size, mtime), so repeated lookups skip reading the file
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+def _digest_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+def remember_digest(path: str, digest: str):
+    """Record the hash of a file hashed elsewhere (e.g. while it was uploaded)."""
+    _digests[_digest_key(path)] = digest
+
+def file_digest(path: str) -> str:
+    key = _digest_key(path)
+    if key not in _digests:
+        _digests[key] = dataset_cache.hash_file(path)
+    return _digests[key]
+
+def estimate_rows(path: str) -> Optional[int]:
+    """Row count extrapolated from the line length in the first megabyte; exact for small files."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(ESTIMATE_BYTES)
+    lines = head.count(b"\n") + (0 if head.endswith(b"\n") or not head else 1)
+    if lines < 2:
+        return None
+    if len(head) == size:
+        return lines - 1  # minus the header
+    return int((lines - 1) * size / len(head))
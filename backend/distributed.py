@@ -0,0 +1,94 @@
+import datetime
+import socket
+import zlib
+from typing import List, Optional, Union
+import torch
+import torch.distributed as dist
+import torch.nn as nn
+
+DEFAULTS = {
+    "processes": 2,             # worker processes on this node
+    "nodes": 1,
+    "nodeRank": 0,              # this node's index; node 0 runs rank 0, which reports metrics
+    "masterAddr": "127.0.0.1",  # where rank 0 listens; must be reachable from every node
+    "masterPort": None,         # None picks a free port, which only works on a single node
+    "timeout": 120,             # seconds a rank waits for the others before failing the run
+}
+
+def distributed_options(setting: Union[bool, int, dict, None]) -> Optional[dict]:
+    """Options from the ``distributed`` config value (a process count or a dict); None when off."""
+    if not setting:
+        return None
+    if setting is True:
+        return dict(DEFAULTS)
+    if isinstance(setting, int):
+        return {**DEFAULTS, "processes": setting} if setting > 1 else None
+    if isinstance(setting, dict):
+        if not setting.get("enabled", True):
+            return None
+        unknown = set(setting) - set(DEFAULTS) - {"enabled"}
+        if unknown:
+            raise ValueError(f"Unknown distributed options: {', '.join(sorted(unknown))}")
+        options = {**DEFAULTS, **{k: v for k, v in setting.items() if k != "enabled"}}
+        if int(options["processes"]) < 1 or int(options["nodes"]) < 1:
+            raise ValueError("distributed processes and nodes must be at least 1")
+        if not 0 <= int(options["nodeRank"]) < int(options["nodes"]):
+            raise ValueError("distributed nodeRank must be between 0 and nodes - 1")
+        if int(options["nodes"]) > 1 and not options["masterPort"]:
+            raise ValueError("distributed runs over several nodes need a fixed masterPort")
+        return options if world_size(options) > 1 else None
+    raise ValueError("distributed must be a process count or an object of options")
+
+def world_size(options: dict) -> int:
+    return int(options["processes"]) * int(options["nodes"])
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+def shuffle_seed(run_id: str) -> int:
+    """A seed every rank derives alike, so they shuffle each epoch the same way."""
+    return zlib.crc32(run_id.encode())
+
+class ProcessGroup:
+    """This rank's view of a gloo process group, with the few collectives the training loop needs.
+
+    Every method is a collective: all ranks must call it, in the same order.
+    """
+
+    def __init__(self, options: dict, rank: int):
+        self.rank = rank
+        self.world_size = world_size(options)
+        dist.init_process_group(
+            "gloo",
+            init_method=f"tcp://{options['masterAddr']}:{options['masterPort']}",
+            rank=rank,
+            world_size=self.world_size,
+            timeout=datetime.timedelta(seconds=int(options["timeout"])),
+        )
+
+    def wrap(self, model: nn.Module) -> nn.Module:
+        """DistributedDataParallel over ``model``: rank 0's weights are copied to all, gradients are averaged."""
+        return nn.parallel.DistributedDataParallel(model)
+
+    def any(self, *flags: bool) -> List[bool]:
+        """Each flag, true if it is true on any rank."""
+        tensor = torch.tensor([float(flag) for flag in flags])
+        dist.all_reduce(tensor, op=dist.ReduceOp.MAX)
+        return [bool(value) for value in tensor.tolist()]
+
+    def sum(self, *values: float) -> List[float]:
+        tensor = torch.tensor(values, dtype=torch.float64)
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+        return tensor.tolist()
+
+    def broadcast(self, obj):
+        """Rank 0's ``obj`` on every rank."""
+        holder = [obj]
+        dist.broadcast_object_list(holder, src=0)
+        return holder[0]
+
+    def close(self):
+        if dist.is_initialized():
+            dist.destroy_process_group()
@@ -0,0 +1,152 @@
+import io
+import queue
+import time
+from typing import NamedTuple, Optional, Union
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from data_pipeline import load_holdout
+from model_factory import build_model
+
+DEFAULTS = {
+    "split": 0.1,        # fraction of the rows held out of training
+    "every": 0,          # steps between evaluations; 0 evaluates at the end of each epoch
+    "maxRows": 50_000,   # held-out rows scored per evaluation; more are sampled down to this
+    "batchSize": 4096,   # rows per forward pass of the evaluator
+    "threads": 1,        # torch threads of an evaluator process, on top of the run's own
+    "seed": 0,           # picks which rows are held out
+}
+# How long the end of a run waits to hand the final weights to a busy evaluator
+FINAL_SUBMIT_TIMEOUT = 60.0
+
+def validation_options(setting: Union[bool, dict, None]) -> Optional[dict]:
+    """Options from the ``validation`` config value (``true`` or a dict of overrides); None when off."""
+    if not setting:
+        return None
+    if setting is True:
+        return dict(DEFAULTS)
+    if isinstance(setting, dict):
+        if not setting.get("enabled", True):
+            return None
+        unknown = set(setting) - set(DEFAULTS) - {"enabled"}
+        if unknown:
+            raise ValueError(f"Unknown validation options: {', '.join(sorted(unknown))}")
+        options = {**DEFAULTS, **{k: v for k, v in setting.items() if k != "enabled"}}
+        if not 0 < float(options["split"]) < 1:
+            raise ValueError("validation split must be between 0 and 1")
+        if int(options["every"]) < 0:
+            raise ValueError("validation every must be 0 (each epoch) or a number of steps")
+        if int(options["maxRows"]) < 1 or int(options["batchSize"]) < 1 or int(options["threads"]) < 1:
+            raise ValueError("validation maxRows, batchSize and threads must be at least 1")
+        return options
+    raise ValueError("validation must be true/false or an object of options")
+
+class ValidationResult(NamedTuple):
+    """Scores of one model snapshot on the held-out rows (see score), or why validation failed."""
+    metrics: Optional[dict]
+    error: Optional[str] = None
+
+def score(model: nn.Module, prepare, x: torch.Tensor, y: torch.Tensor, num_classes: int, batch_size: int) -> dict:
+    """Loss, accuracy, confusion matrix and per-class F1 of ``model`` on (x, y).
+
+    Each batch adds to a flat confusion matrix with one bincount; every metric
+    is then a reduction over that matrix, with no loop over classes or rows.
+    """
+    model.eval()
+    total_loss = torch.zeros((), dtype=torch.float64)
+    confusion = torch.zeros(num_classes * num_classes, dtype=torch.long)
+    with torch.inference_mode():
+        for start in range(0, len(y), batch_size):
+            inputs, targets = x[start:start + batch_size], y[start:start + batch_size]
+            logits = model(prepare(inputs)).float()
+            total_loss += F.cross_entropy(logits, targets, reduction="sum").double()
+            confusion += torch.bincount(targets * num_classes + logits.argmax(dim=1), minlength=num_classes * num_classes)
+    confusion = confusion.view(num_classes, num_classes)  # rows: true class, columns: predicted class
+    correct = confusion.diagonal()
+    actual, predicted = confusion.sum(dim=1), confusion.sum(dim=0)
+    # F1 = 2TP / (2TP + FP + FN), where TP + FP = predicted and TP + FN = actual
+    f1 = (2 * correct / (actual + predicted).clamp(min=1)).float()
+    present = actual > 0
+    rows = max(len(y), 1)
+    return {
+        "rows": len(y),
+        "loss": total_loss.item() / rows,
+        "accuracy": correct.sum().item() / rows,
+        "macroF1": f1[present].mean().item() if bool(present.any()) else 0.0,
+        "f1": f1.tolist(),
+        "confusion": confusion.tolist(),
+    }
+
+def run_evaluator(config: dict, options: dict, requests, results, own_process: bool = True):
+    """Evaluator body: load the held-out rows, then score each snapshot on ``requests`` until None arrives.
+
+    Snapshots are dicts with the ``step``, ``epoch``, ``modelInfo`` and the
+    ``model`` state of the run saved with torch.save (see TrainingLoop._evaluate). Results and
+    errors go onto ``results`` as ValidationResult.
+    """
+    from trainer import prepare_inputs  # trainer imports this module
+    if own_process:
+        # In a thread this would resize the training loop's pool too
+        torch.set_num_threads(int(options["threads"]))
+    model = None
+    try:
+        holdout = load_holdout(config['dataset'], float(options["split"]), int(options["seed"]),
+                               int(options["maxRows"]), config.get('streaming'))
+        if not len(holdout.y):
+            raise ValueError("no rows were held out; raise the split or use a larger dataset")
+        print(f"Validating on {len(holdout.y)} held-out rows")
+    except Exception as e:
+        results.put(ValidationResult(None, str(e)))
+        holdout = None
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        if holdout is None:
+            continue  # Keep taking snapshots so the training loop never waits on a full queue
+        try:
+            started = time.perf_counter()
+            info = request["modelInfo"]
+            if model is None:
+                model = build_model(info["modelType"], info["inputDim"], info["numClasses"], info.get("modelName"))
+            model.load_state_dict(torch.load(io.BytesIO(request["model"]), weights_only=True))
+            metrics = score(model, lambda inputs: prepare_inputs(info["modelType"], inputs), holdout.x, holdout.y,
+                            info["numClasses"], int(options["batchSize"]))
+            results.put(ValidationResult({
+                "step": request["step"],
+                "epoch": request["epoch"],
+                **metrics,
+                "classes": [str(c) for c in holdout.classes],
+                "seconds": time.perf_counter() - started,
+            }))
+        except Exception as e:
+            print(f"Validation at step {request['step']} failed: {e}")
+            results.put(ValidationResult(None, str(e)))
+            holdout = None
+
+def submit(requests, snapshot: dict, wait: bool = False) -> bool:
+    """Hand a snapshot to the evaluator; False when it is still busy (or, with ``wait``, busy for too long)."""
+    try:
+        if wait:
+            requests.put(snapshot, timeout=FINAL_SUBMIT_TIMEOUT)
+        else:
+            requests.put_nowait(snapshot)
+        return True
+    except queue.Full:
+        return False
+
+def finish(requests, wait: bool = False):
+    """Tell the evaluator to exit once it is done with the snapshots it has.
+
+    Without ``wait`` (or when the evaluator stays busy past the timeout) a
+    snapshot it hasn't taken yet is dropped, so the sentinel always fits.
+    """
+    if wait and submit(requests, None, wait=True):
+        return
+    while True:
+        try:
+            requests.get(timeout=0.1)
+        except queue.Empty:
+            pass
+        if submit(requests, None):
+            return
@@ -0,0 +1,114 @@
+import hashlib
+import io
+import os
+import threading
+from typing import Dict, List, Optional
+import torch
+import torch.nn as nn
+import artifact_store
+from checkpoints import latest_checkpoint, load_checkpoint
+from model_factory import build_model
+from trainer import MODEL_FILE, checkpoint_dir, prepare_inputs, run_dir
+
+# format -> (file suffix, media type)
+EXPORT_FORMATS = {
+    "state_dict": (".pt", "application/octet-stream"),
+    "torchscript": (".torchscript.pt", "application/octet-stream"),
+    "onnx": (".onnx", "application/octet-stream"),
+    "quantized": (".int8.torchscript.pt", "application/octet-stream"),
+}
+
+# Exports of one run never overlap; different runs export in parallel
+_run_locks: Dict[str, threading.Lock] = {}
+_run_locks_guard = threading.Lock()
+
+class FlatInputModel(nn.Module):
+    """Takes rows of features like the training CSV and reshapes them as the model expects,
+    so exported graphs accept ``(batch, input_dim)`` whatever the architecture."""
+
+    def __init__(self, model: nn.Module, model_type: str):
+        super().__init__()
+        self.model = model
+        self.model_type = model_type
+
+    def forward(self, x):
+        return self.model(prepare_inputs(self.model_type, x))
+
+def load_source(run_id: str) -> Optional[dict]:
+    """The run's final weights, or its latest checkpoint if it never completed."""
+    path = os.path.join(run_dir(run_id), MODEL_FILE)
+    if os.path.exists(path):
+        return torch.load(path, map_location="cpu")
+    entry = latest_checkpoint(checkpoint_dir(run_id))
+    return load_checkpoint(checkpoint_dir(run_id), entry) if entry else None
+
+def rebuild_model(source: dict) -> FlatInputModel:
+    """An eval-mode model from ``load_source`` output, taking flat feature rows."""
+    info = source["modelInfo"]
+    model = build_model(info["modelType"], info["inputDim"], info["numClasses"], info.get("modelName"))
+    model.load_state_dict(source["model"])
+    model.eval()
+    return FlatInputModel(model, info["modelType"])
+
+def _serialize(fmt: str, source: dict) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "state_dict":
+        torch.save(source["model"], buffer)
+        return buffer.getvalue()
+    wrapped = rebuild_model(source)
+    example = torch.zeros(1, source["modelInfo"]["inputDim"])
+    with torch.no_grad():
+        if fmt == "torchscript":
+            torch.jit.save(torch.jit.trace(wrapped, example), buffer)
+        elif fmt == "onnx":
+            torch.onnx.export(
+                wrapped, example, buffer,
+                input_names=["features"], output_names=["logits"],
+                dynamic_axes={"features": {0: "batch"}, "logits": {0: "batch"}},
+            )
+        elif fmt == "quantized":
+            # Dynamic int8 quantization of the Linear layers: smaller and faster on CPU, no calibration needed
+            quantized = torch.ao.quantization.quantize_dynamic(wrapped, {nn.Linear}, dtype=torch.qint8)
+            torch.jit.save(torch.jit.trace(quantized, example), buffer)
+        else:
+            raise ValueError(f"Unknown export format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    return buffer.getvalue()
+
+def export_run(run_id: str, formats: Optional[List[str]] = None, force: bool = False) -> dict:
+    """Export a run to ``formats`` (all by default) and record the artifacts in its manifest.
+
+    Formats already exported from the same weights are skipped unless ``force``
+    is set. A format that fails is recorded with its error; the others still
+    export. Blocking; call it from a worker thread.
+    """
+    formats = formats or list(EXPORT_FORMATS)
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}. Use: {', '.join(EXPORT_FORMATS)}")
+    with _run_locks_guard:
+        lock = _run_locks.setdefault(run_id, threading.Lock())
+    with lock:
+        source = load_source(run_id)
+        if source is None:
+            raise ValueError(f"Run '{run_id}' has no trained weights or checkpoints to export.")
+        weights = io.BytesIO()
+        torch.save(source["model"], weights)
+        source_hash = hashlib.sha256(weights.getvalue()).hexdigest()
+        manifest = artifact_store.read_manifest(run_id)
+        info = source["modelInfo"]
+        stem = info["modelName"] if info["modelType"] == "custom" else info["modelType"]
+        for fmt in formats:
+            previous = manifest.get(fmt)
+            if not force and previous and previous.get("source") == source_hash and "sha256" in previous:
+                continue
+            try:
+                digest, size = artifact_store.put_bytes(_serialize(fmt, source))
+            except Exception as e:
+                print(f"Run {run_id}: {fmt} export failed: {e}")
+                artifact_store.record(run_id, fmt, {"source": source_hash, "error": str(e)})
+                continue
+            filename = f"{stem}-{run_id}{EXPORT_FORMATS[fmt][0]}"
+            artifact_store.record(run_id, fmt, {"sha256": digest, "size": size, "filename": filename,
+                                                "source": source_hash})
+            print(f"Run {run_id}: exported {fmt} ({size} bytes)")
+        return artifact_store.read_manifest(run_id)
@@ -0,0 +1,252 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional
+import torch
+import dataset_cache
+from exports import load_source, rebuild_model
+from metric_store import MetricStore
+from telemetry import SIZE_BUCKETS, histogram
+
+CACHE_SIZE = int(os.getenv("INFERENCE_CACHE_SIZE", "4"))      # models kept warm
+MAX_BATCH_ROWS = int(os.getenv("INFERENCE_MAX_BATCH", "64"))  # rows per forward pass
+MAX_DELAY_MS = float(os.getenv("INFERENCE_MAX_DELAY_MS", "5"))  # how long a request may wait for company
+THREADS = int(os.getenv("INFERENCE_THREADS", "2"))
+LATENCY_SAMPLES = 1000
+
+REQUEST_SECONDS = histogram("inference_request_seconds", "Prediction request latency, queueing included")
+BATCH_ROWS = histogram("inference_batch_rows", "Rows per inference forward pass", SIZE_BUCKETS)
+
+class LoadedModel:
+    def __init__(self, run_id: str, model: torch.nn.Module, input_dim: int, labels: Optional[list]):
+        self.run_id = run_id
+        self.model = model
+        self.input_dim = input_dim
+        self.labels = labels
+        self.loaded_at = time.time()
+
+def load_model(run_id: str) -> LoadedModel:
+    """Rebuild a run's model from its final weights (or latest checkpoint). Blocking."""
+    source = load_source(run_id)
+    if source is None:
+        raise LookupError(f"Run '{run_id}' has no trained weights or checkpoints.")
+    labels = None
+    if MetricStore.exists(run_id):
+        store = MetricStore(run_id)
+        try:
+            config = store.load_config() or {}
+        finally:
+            store.close()
+        # Class names are known when the run trained from the preprocessed cache
+        meta = dataset_cache.read_meta((config.get("dataset") or {}).get("sha256"))
+        if meta is not None and len(meta["classes"]) == source["modelInfo"]["numClasses"]:
+            labels = meta["classes"]
+    return LoadedModel(run_id, rebuild_model(source), source["modelInfo"]["inputDim"], labels)
+
+def iter_nowait(queue: asyncio.Queue):
+    while not queue.empty():
+        yield queue.get_nowait()
+
+class _Request:
+    def __init__(self, rows: torch.Tensor, future: asyncio.Future):
+        self.rows = rows
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    """Gathers concurrent requests for one model into batches.
+
+    A batch closes when it holds ``max_rows`` rows or ``max_delay`` seconds after
+    its first request arrived, whichever comes first, then runs on the executor.
+    """
+
+    def __init__(self, service: "InferenceService", loaded: LoadedModel):
+        self.service = service
+        self.loaded = loaded
+        self.queue: "asyncio.Queue[Optional[_Request]]" = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, rows: torch.Tensor) -> tuple:
+        request = _Request(rows, asyncio.get_running_loop().create_future())
+        if self.task.done():
+            # Evicted after the caller got hold of it: run unbatched
+            await self._execute([request], len(rows))
+        else:
+            self.queue.put_nowait(request)
+        return await request.future
+
+    def close(self):
+        """Finish what's queued, then stop (used on eviction)."""
+        self.queue.put_nowait(None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            first = await self.queue.get()
+            if first is None:
+                break
+            batch: List[_Request] = [first]
+            rows = len(first.rows)
+            deadline = loop.time() + self.service.max_delay
+            while rows < self.service.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+                rows += len(request.rows)
+            await self._execute(batch, rows)
+        # Requests queued behind the close marker still get answered
+        while not self.queue.empty():
+            leftovers = [request for request in iter_nowait(self.queue) if request is not None]
+            if leftovers:
+                await self._execute(leftovers, sum(len(request.rows) for request in leftovers))
+
+    async def _execute(self, batch: List[_Request], rows: int):
+        loop = asyncio.get_running_loop()
+        inputs = torch.cat([request.rows for request in batch]) if len(batch) > 1 else batch[0].rows
+        try:
+            probabilities = await loop.run_in_executor(self.service.executor, self._forward, inputs)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        done = time.perf_counter()
+        self.service.record_batch(rows)
+        start = 0
+        for request in batch:
+            end = start + len(request.rows)
+            latency = done - request.enqueued
+            self.service.record_latency(latency)
+            if not request.future.done():
+                request.future.set_result((probabilities[start:end], latency, rows))
+            start = end
+
+    def _forward(self, inputs: torch.Tensor) -> torch.Tensor:
+        with torch.inference_mode():
+            return torch.softmax(self.loaded.model(inputs), dim=1)
+
+class InferenceService:
+    """Serves predictions from trained runs.
+
+    Models stay warm in an LRU cache of ``cache_size`` runs. Concurrent requests
+    for the same model are micro-batched, and forward passes run on a small
+    thread pool so the event loop stays free.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE, max_rows: int = MAX_BATCH_ROWS,
+                 max_delay_ms: float = MAX_DELAY_MS, threads: int = THREADS):
+        self.cache_size = max(1, cache_size)
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="inference")
+        self.batchers: "OrderedDict[str, MicroBatcher]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.max_batch_rows = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def record_latency(self, seconds: float):
+        self.requests += 1
+        self.latencies.append(seconds)
+        REQUEST_SECONDS.observe(seconds)
+
+    def record_batch(self, rows: int):
+        self.batches += 1
+        self.batched_rows += rows
+        BATCH_ROWS.observe(rows)
+        self.max_batch_rows = max(self.max_batch_rows, rows)
+
+    async def _batcher(self, run_id: str) -> MicroBatcher:
+        batcher = self.batchers.get(run_id)
+        if batcher is not None:
+            self.batchers.move_to_end(run_id)
+            return batcher
+        # Concurrent first requests share one load
+        loading = self._loading.get(run_id)
+        if loading is None:
+            loop = asyncio.get_running_loop()
+            loading = asyncio.ensure_future(loop.run_in_executor(self.executor, load_model, run_id))
+            self._loading[run_id] = loading
+        try:
+            loaded = await asyncio.shield(loading)
+        finally:
+            self._loading.pop(run_id, None)
+        batcher = self.batchers.get(run_id)
+        if batcher is None:
+            self.loads += 1
+            batcher = self.batchers[run_id] = MicroBatcher(self, loaded)
+            while len(self.batchers) > self.cache_size:
+                evicted_id, evicted = self.batchers.popitem(last=False)
+                evicted.close()
+                self.evictions += 1
+                print(f"Inference: evicted model of run {evicted_id}")
+        return batcher
+
+    def invalidate(self, run_id: str):
+        """Drop a cached model, e.g. when its run was resumed and produced new weights."""
+        batcher = self.batchers.pop(run_id, None)
+        if batcher is not None:
+            batcher.close()
+
+    async def predict(self, run_id: str, inputs: list) -> dict:
+        if not inputs:
+            raise ValueError("'inputs' must be a row of features or a list of rows.")
+        batcher = await self._batcher(run_id)
+        loaded = batcher.loaded
+        rows = torch.as_tensor(inputs, dtype=torch.float32)
+        if rows.dim() == 1:
+            rows = rows.unsqueeze(0)
+        if rows.dim() != 2 or rows.shape[1] != loaded.input_dim:
+            raise ValueError(f"Expected rows of {loaded.input_dim} features, got shape {tuple(rows.shape)}.")
+        probabilities, latency, batch_rows = await batcher.submit(rows)
+        predictions = probabilities.argmax(dim=1).tolist()
+        return {
+            "runId": run_id,
+            "predictions": predictions,
+            "labels": [loaded.labels[i] for i in predictions] if loaded.labels else None,
+            "probabilities": probabilities.tolist(),
+            "latencyMs": latency * 1000,
+            "batchRows": batch_rows,
+        }
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+        return {
+            "models": list(self.batchers),
+            "cacheSize": self.cache_size,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "requests": self.requests,
+            "batches": self.batches,
+            "meanBatchRows": self.batched_rows / self.batches if self.batches else None,
+            "maxBatchRows": self.max_batch_rows,
+            "latencyMs": {"p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99)},
+            "maxDelayMs": self.max_delay * 1000,
+        }
+
+    def shutdown(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.batchers.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,61 @@
+"""Start this node's ranks of a data-parallel run whose rank 0 runs on another node.
+
+Rank 0 (node 0) is started by the server as usual; with a config such as
+``"distributed": {"processes": 8, "nodes": 2, "masterAddr": "10.0.0.1", "masterPort": 29500}``
+run on each other node, from backend/:
+
+    python launch.py config.json --run-id <run id> --node-rank 1
+
+``config.json`` is the run's config (e.g. from GET /jobs/{run_id}). Ranks on
+this node train their shards; metrics are reported by rank 0 only. The run
+directory must be on storage shared with node 0 for resuming to work.
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+from distributed import distributed_options
+from trainer import launch_ranks, run_dir
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("config", help="JSON file with the run's config")
+    parser.add_argument("--run-id", required=True, help="The run's ID on node 0; ranks derive their shuffling from it")
+    parser.add_argument("--node-rank", type=int, required=True)
+    parser.add_argument("--threads", type=int, default=None, help="torch threads shared by this node's ranks")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    config = config.get("config", config)  # accept a whole GET /jobs/{run_id} response too
+    setting = config.get("distributed")
+    options = distributed_options({**setting, "nodeRank": args.node_rank} if isinstance(setting, dict) else setting)
+    if options is None or int(options["nodes"]) < 2:
+        parser.error("the config's 'distributed' setting must span several nodes")
+    if args.node_rank == 0:
+        parser.error("node 0 is run by the server")
+
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    ranks = launch_ranks(ctx, config, options, events, ctx.Event(), args.threads, None,
+                         run_dir(args.run_id), f"training-{args.run_id}")
+    for rank in ranks:
+        rank.start()
+    print(f"Started ranks {ranks[0].name} to {ranks[-1].name}")
+    failed = False
+    while any(rank.is_alive() for rank in ranks):
+        try:
+            exit_event = events.get(timeout=1)
+        except queue.Empty:
+            continue
+        # Ranks other than 0 only report failures
+        print(f"Rank {exit_event.rank} failed: {exit_event.error}")
+        failed = True
+        for rank in ranks:
+            rank.terminate()
+    for rank in ranks:
+        rank.join()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,16 +2,40 @@ import asyncio
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from websocket_manager import WebSocketManager
-from trainer import train_model
+from scheduler import JobScheduler
+from trainer import checkpoint_dir, resume_config
+from checkpoints import read_index
+from sweeps import Sweep
 from fastapi import Request, Body, UploadFile, File
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from agent.agent import TrainingAgent  # Import the rule-based agent
 from agent.agent_chat import router as agent_chat_router
 from schemas import TrainingMetric
+from metric_store import MetricStore, list_runs
+import dataset_cache
+import dataset_profile
+from data_pipeline import resolve_dataset_path
+import artifact_store
+from exports import EXPORT_FORMATS, export_run
+from inference import InferenceService
+from telemetry import REGISTRY
+from config_store import ConfigError, VersionedConfig, changed_fields, live_changes, validate_config
+from shared_state import open_state
+from cluster import WORKER_ID, Cluster, WorkerUnavailable, is_active
+from typing import Optional
 import os
 
 app = FastAPI()
-ws_manager = WebSocketManager()
+# Each /ws/train client gets a bounded send queue; see websocket_manager.OVERFLOW_POLICIES
+def make_channel() -> WebSocketManager:
+    return WebSocketManager(
+        max_queue=int(os.getenv("WS_MAX_QUEUE", "256")),
+        overflow=os.getenv("WS_OVERFLOW_POLICY", "drop_oldest"),
+        tick_hz=float(os.getenv("WS_TICK_HZ", "10")),
+        ring_size=int(os.getenv("WS_RING_SIZE", "4096")),
+    )
+
+ws_manager = make_channel()
 app.include_router(agent_chat_router)
 # Include the router for agent chat
 
@@ -24,59 +48,338 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory config for demonstration (replace with persistent storage as needed)
-CONFIG = {
+# Config, job records and metric streams are shared by all uvicorn workers (see shared_state.py)
+shared_state = open_state()
+
+# Validated and versioned; CONFIG is always the current dict once config_store.refresh() has run.
+config_store = VersionedConfig({
     "learningRate": 0.001,
     "batchSize": 32,
     "epochs": 100,
     "optimizer": "adam",
     "modelName": "default",
+    "autopilot": False,  # Let the agent stop early / lower the LR / abort (see autopilot.py)
+    "performance": False,  # Tune threads, bf16 autocast, torch.compile, channels_last (see performance.py)
+    "distributed": False,  # Data-parallel worker processes for one run (see distributed.py)
+    "autotune": False,  # Benchmark batch sizes and DataLoader settings before training (see autotune.py)
+    "validation": False,  # Hold out rows and score snapshots on them off the training loop (see evaluation.py)
     "dataset": None  # Add dataset field to config
-}
+}, state=shared_state)
+CONFIG = config_store.values
 
-TRAINING_RUNNING = False
-TRAINING_TASK = None
+def run_snapshot(run_id: Optional[str], points: int = 100) -> Optional[dict]:
+    """Downsampled metrics of a run for resyncing clients."""
+    if run_id is None or not MetricStore.exists(run_id):
+        return None
+    store = MetricStore(run_id)
+    try:
+        series = store.query(kind="step", points=points)
+        if not series["total"]:
+            series = store.query(kind="epoch", points=points)
+    finally:
+        store.close()
+    return {"runId": run_id, **series}
 
-@app.websocket("/ws/train")
-async def websocket_endpoint(websocket: WebSocket):
-    await ws_manager.connect(websocket)
+def run_channel(run_id: str) -> WebSocketManager:
+    channel = make_channel()
+    channel.snapshot_provider = lambda: run_snapshot(run_id)
+    return channel
+
+# Background exports by run ID
+EXPORTS = {}
+
+def start_export(run_id: str, formats=None, force: bool = False) -> asyncio.Task:
+    running = EXPORTS.get(run_id)
+    if running is not None and not running.done():
+        return running
+    task = asyncio.create_task(asyncio.to_thread(export_run, run_id, formats, force))
+
+    def report(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Export of {run_id} failed: {task.exception()}")
+
+    task.add_done_callback(report)
+    EXPORTS[run_id] = task
+    return task
+
+inference = InferenceService()
+
+def run_completed(job):
+    inference.invalidate(job.run_id)  # A resumed run has new weights
+    if job.primary:
+        start_export(job.run_id)
+
+# Training runs are queued and executed by the scheduler; /ws/train follows the latest started run.
+# Completed primary runs are exported right away; others (e.g. sweep trials) on request.
+scheduler = JobScheduler(
+    default_channel=ws_manager,
+    channel_factory=run_channel,
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_RUNS", "0")) or None,
+    use_processes=os.getenv("TRAINING_BACKEND", "process") == "process",
+    on_completed=run_completed,
+    # uvicorn takes its --workers default from WEB_CONCURRENCY; the workers share the CPU
+    server_workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+)
+
+# Runs stay on the worker that accepted them; the others mirror their streams and forward stop/config requests
+cluster = Cluster(shared_state, scheduler, ws_manager, run_channel, on_remote_completed=inference.invalidate)
+
+def primary_run_id() -> Optional[str]:
+    return cluster.primary_run_id() or next(iter(list_runs()), None)
+
+ws_manager.snapshot_provider = lambda: run_snapshot(primary_run_id())
+
+async def serve_channel(channel: WebSocketManager, websocket: WebSocket, mode: str, encoding: str,
+                        since: Optional[int], session: Optional[str]):
+    try:
+        await channel.connect(websocket, mode=mode, encoding=encoding, since=since, session=session)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
     try:
-        # Keep the connection alive and wait for incoming messages
-        await websocket.receive_text()
+        # Keep the connection alive; clients don't need to send anything
+        while True:
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        ws_manager.disconnect(websocket)
+        await channel.disconnect(websocket)
+
+@app.websocket("/ws/train")
+async def websocket_endpoint(websocket: WebSocket, mode: str = "stream", encoding: str = "json",
+                             since: Optional[int] = None, session: Optional[str] = None):
+    # ?mode=batch&encoding=binary opts into tick-coalesced, packed float32 metric frames;
+    # ?since=<seq>&session=<id> resyncs a reconnecting client
+    await serve_channel(ws_manager, websocket, mode, encoding, since, session)
+
+@app.websocket("/ws/train/{run_id}")
+async def run_websocket_endpoint(websocket: WebSocket, run_id: str, mode: str = "stream", encoding: str = "json",
+                                 since: Optional[int] = None, session: Optional[str] = None):
+    """Metric stream of a single run; accepts the same options as /ws/train."""
+    channel = await cluster.channel(run_id)
+    if channel is None:
+        await websocket.close(code=1008, reason=f"Run '{run_id}' not found.")
+        return
+    try:
+        await serve_channel(channel, websocket, mode, encoding, since, session)
+    finally:
+        cluster.release(run_id)
 
 @app.on_event("startup")
 async def startup_event():
+    await cluster.start()
     print("Backend ready. Waiting for training to be started via /start-training.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.shutdown()
+    inference.shutdown()
+    await cluster.close()
+
 @app.post("/start-training")
 async def start_training_endpoint():
-    global TRAINING_RUNNING, TRAINING_TASK
-    if not TRAINING_RUNNING:
-        TRAINING_RUNNING = True
-        if TRAINING_TASK is None or TRAINING_TASK.done():
-            TRAINING_TASK = asyncio.create_task(train_model(ws_manager))
-        return {"success": True, "message": "Training started."}
+    if not is_active(await cluster.primary_job()):
+        await config_store.refresh()
+        job = scheduler.submit(CONFIG)
+        return {"success": True, "message": "Training started.", "runId": job.run_id}
     return {"success": False, "message": "Training already running."}
 
 @app.post("/stop-training")
 async def stop_training_endpoint():
-    global TRAINING_RUNNING, TRAINING_TASK
-    TRAINING_RUNNING = False
-    if TRAINING_TASK and not TRAINING_TASK.done():
-        TRAINING_TASK.cancel()
-        TRAINING_TASK = None
+    # The worker finishes its current step, reports Idle and exits on its own
+    run_id = await cluster.primary_run()
+    if run_id is not None:
+        try:
+            await cluster.stop(run_id)
+        except WorkerUnavailable as e:
+            return JSONResponse(status_code=503, content={"error": str(e)})
     return {"success": True, "message": "Training stopped."}
 
 @app.post("/restart-training")
 async def restart_training_endpoint():
-    global TRAINING_RUNNING, TRAINING_TASK
-    TRAINING_RUNNING = True
-    if TRAINING_TASK and not TRAINING_TASK.done():
-        TRAINING_TASK.cancel()
-    TRAINING_TASK = asyncio.create_task(train_model(ws_manager))
-    return {"success": True, "message": "Training restarted."}
+    primary = await cluster.primary_job()
+    if is_active(primary):
+        try:
+            await cluster.stop(primary["runId"])
+        except WorkerUnavailable as e:
+            return JSONResponse(status_code=503, content={"error": str(e)})
+        await cluster.wait(primary["runId"])
+    await config_store.refresh()
+    job = scheduler.submit(CONFIG)
+    return {"success": True, "message": "Training restarted.", "runId": job.run_id}
+
+@app.post("/jobs")
+async def submit_job(overrides: Optional[dict] = Body(None)):
+    """Queue a run using the current config plus optional overrides (snapshotted now)."""
+    await config_store.refresh()
+    try:
+        config = validate_config({**CONFIG, **(overrides or {})})
+    except ConfigError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    job = scheduler.submit(config)
+    return job.to_dict()
+
+@app.get("/jobs")
+async def list_jobs():
+    # maxConcurrent is per worker; each job reports the worker running it
+    return {
+        "maxConcurrent": scheduler.max_concurrent,
+        "worker": WORKER_ID,
+        "primaryRunId": await cluster.primary_run(),
+        "jobs": await cluster.jobs(),
+    }
+
+@app.get("/jobs/{run_id}")
+async def get_job(run_id: str):
+    job = await cluster.job(run_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    return job
+
+@app.patch("/jobs/{run_id}/config")
+async def update_job_config(run_id: str, changes: dict = Body(...)):
+    """Change live-editable fields (config_store.MUTABLE_FIELDS) of a queued or running run.
+
+    They take effect at the run's next step boundary.
+    """
+    try:
+        version = await cluster.update_config(run_id, changes)
+    except ConfigError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    except WorkerUnavailable as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    if version is None:
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    return {"success": True, "runId": run_id, "configVersion": version}
+
+@app.post("/jobs/{run_id}/stop")
+async def stop_job(run_id: str):
+    try:
+        job = await cluster.stop(run_id)
+    except WorkerUnavailable as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    return job
+
+SWEEPS = {}
+
+@app.post("/sweeps")
+async def start_sweep(spec: dict = Body(...)):
+    """Start a hyperparameter sweep over the current config.
+
+    Example: {"strategy": "asha", "trials": 20, "space": {"learningRate": {"min": 1e-4, "max": 0.1, "log": true},
+    "optimizer": {"values": ["adam", "sgd"]}}, "minEpochs": 1, "eta": 3}
+    """
+    await config_store.refresh()
+    try:
+        sweep = Sweep(
+            scheduler, CONFIG, spec.get("space", {}),
+            strategy=spec.get("strategy", "random"),
+            num_trials=int(spec.get("trials", 10)),
+            prune=spec.get("prune"),
+            min_epochs=int(spec.get("minEpochs", 1)),
+            eta=int(spec.get("eta", 3)),
+            seed=spec.get("seed"),
+        )
+    except (ValueError, TypeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    SWEEPS[sweep.sweep_id] = sweep
+    # Preprocessing the dataset can take a while; poll GET /sweeps/{id} for progress or an error
+    sweep.launch()
+    return sweep.to_dict()
+
+@app.get("/sweeps")
+async def list_sweeps():
+    return [sweep.to_dict() for sweep in SWEEPS.values()]
+
+@app.get("/sweeps/{sweep_id}")
+async def get_sweep(sweep_id: str):
+    sweep = SWEEPS.get(sweep_id)
+    if sweep is None:
+        return JSONResponse(status_code=404, content={"error": f"Sweep '{sweep_id}' not found."})
+    return sweep.to_dict()
+
+@app.post("/sweeps/{sweep_id}/stop")
+async def stop_sweep(sweep_id: str):
+    sweep = SWEEPS.get(sweep_id)
+    if sweep is None:
+        return JSONResponse(status_code=404, content={"error": f"Sweep '{sweep_id}' not found."})
+    sweep.stop()
+    return sweep.to_dict()
+
+@app.get("/runs")
+def get_runs():
+    """List stored runs, newest first, with their config and latest metric."""
+    runs = []
+    for run_id in list_runs():
+        store = MetricStore(run_id)
+        try:
+            runs.append({"runId": run_id, "config": store.load_config(), "count": store.count(), "last": store.last()})
+        finally:
+            store.close()
+    return runs
+
+@app.get("/runs/{run_id}/checkpoints")
+def get_run_checkpoints(run_id: str):
+    if not MetricStore.exists(run_id):
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    return sorted(read_index(checkpoint_dir(run_id)), key=lambda e: e["step"])
+
+@app.post("/runs/{run_id}/resume")
+async def resume_run(run_id: str):
+    """Continue a stopped, failed or crashed run from its latest checkpoint under the same run ID."""
+    if not MetricStore.exists(run_id):
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    job = await cluster.job(run_id)
+    if is_active(job):
+        return JSONResponse(status_code=409, content={"error": f"Run '{run_id}' is still {job['status']}."})
+    await config_store.refresh()
+    store = MetricStore(run_id)
+    try:
+        config = store.load_config() or dict(CONFIG)
+    finally:
+        store.close()
+    try:
+        job = scheduler.submit(resume_config(run_id, config), run_id=run_id)
+    except ValueError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    return job.to_dict()
+
+@app.post("/runs/{run_id}/predict")
+async def predict(run_id: str, body: dict = Body(...)):
+    """Classify feature rows with a run's model: {"inputs": [[...], ...]} (or a single row).
+
+    Concurrent requests are batched together; the response reports the request's
+    latency and the size of the batch it ran in.
+    """
+    try:
+        return await inference.predict(run_id, body.get("inputs"))
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except (ValueError, TypeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+@app.get("/inference/stats")
+async def inference_stats():
+    return inference.stats()
+
+@app.get("/runs/{run_id}/metrics")
+def get_run_metrics(run_id: str, kind: str = "step", start: Optional[float] = None,
+                    end: Optional[float] = None, points: Optional[int] = 1000):
+    """Fetch a range of a run's metrics as columns, downsampled server-side to ``points``."""
+    if not MetricStore.exists(run_id):
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    store = MetricStore(run_id)
+    try:
+        return store.query(kind=kind, start=start, end=end, points=points)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    finally:
+        store.close()
+
+@app.get("/metrics")
+def metrics():
+    """Training step phases, WebSocket fan-out and inference timings in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def root():
@@ -92,15 +395,36 @@ async def agent_chat(request: Request):
     return {"response": response}
 
 @app.get("/config")
-async def get_config():
+async def get_config(response: Response):
+    await config_store.refresh()
     print("Current CONFIG:", CONFIG)
+    response.headers["X-Config-Version"] = str(config_store.version)
     return CONFIG
 
 @app.put("/config")
-async def update_config(config: dict = Body(...)):
-    CONFIG.update(config)
+async def update_config(config: dict = Body(...), apply: bool = False, version: Optional[int] = None):
+    """Validate and store a config update.
+
+    With ``apply=true`` the changes are also pushed to the running primary run; if
+    that would change a field a running job can't take (e.g. modelType), nothing is
+    updated. ``version`` rejects the update if the config changed since it was read.
+    """
+    primary = await cluster.primary_job() if apply else None
+    live = is_active(primary)
+    try:
+        changes = {}
+        if live:
+            # Check the running job accepts the changes before storing anything
+            changes = live_changes(primary["config"], {key: config[key] for key in changed_fields(primary["config"], config)})
+        new_version = await config_store.update(config, expected_version=version)
+        if changes:
+            await cluster.update_config(primary["runId"], changes)
+    except ConfigError as e:
+        return JSONResponse(status_code=409 if live or version is not None else 400, content={"error": str(e)})
+    except WorkerUnavailable as e:
+        return JSONResponse(status_code=503, content={"error": f"Config saved but not applied: {e}"})
     print("CONFIG updated to:", CONFIG)
-    return {"success": True, "config": CONFIG}
+    return {"success": True, "config": CONFIG, "version": new_version, "appliedTo": primary["runId"] if live else None}
 
 @app.websocket("/ws/agent")
 async def agent_chat_ws(websocket: WebSocket):
@@ -129,38 +453,151 @@ async def agent_chat_ws(websocket: WebSocket):
     finally:
         pass
 
+def serve_artifact(request: Request, entry: dict, compress: bool = False) -> Response:
+    """Stream a stored artifact with ETag, single-range and optional gzip support."""
+    digest, size = entry["sha256"], entry["size"]
+    path = artifact_store.object_path(digest)
+    headers = {
+        "ETag": f'"{digest}"',
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable",  # Content-addressed, so never stale
+        "Content-Disposition": f'attachment; filename="{entry["filename"]}"',
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") in (f'"{digest}"', f'"{digest}-gzip"'):
+        return Response(status_code=304, headers=headers)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == f'"{digest}"'):
+        try:
+            byte_range = artifact_store.parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+            return StreamingResponse(artifact_store.iter_file(path, start, end), status_code=206,
+                                     headers=headers, media_type="application/octet-stream")
+    if compress and "gzip" in request.headers.get("accept-encoding", ""):
+        path = artifact_store.gzip_path(digest)
+        headers.update({"ETag": f'"{digest}-gzip"', "Content-Encoding": "gzip"})
+        headers.pop("Accept-Ranges")
+    headers["Content-Length"] = str(os.path.getsize(path))
+    return StreamingResponse(artifact_store.iter_file(path), headers=headers, media_type="application/octet-stream")
+
+@app.post("/runs/{run_id}/exports")
+async def export_run_endpoint(run_id: str, request_body: Optional[dict] = Body(None)):
+    """Export a run in the background; body: {"formats": ["onnx", ...], "force": false}."""
+    if not MetricStore.exists(run_id):
+        return JSONResponse(status_code=404, content={"error": f"Run '{run_id}' not found."})
+    formats = (request_body or {}).get("formats")
+    unknown = [fmt for fmt in formats or [] if fmt not in EXPORT_FORMATS]
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unknown export format(s): {', '.join(unknown)}. Use: {', '.join(EXPORT_FORMATS)}"})
+    start_export(run_id, formats, bool((request_body or {}).get("force")))
+    return JSONResponse(status_code=202, content={"runId": run_id, "exporting": True})
+
+@app.get("/runs/{run_id}/exports")
+async def list_exports(run_id: str):
+    task = EXPORTS.get(run_id)
+    error = str(task.exception()) if task is not None and task.done() and not task.cancelled() and task.exception() else None
+    return {
+        "runId": run_id,
+        "exporting": task is not None and not task.done(),
+        "error": error,
+        "artifacts": artifact_store.read_manifest(run_id),
+    }
+
+@app.get("/runs/{run_id}/exports/{fmt}")
+async def download_export(request: Request, run_id: str, fmt: str, compress: bool = False):
+    if fmt not in EXPORT_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"Unknown export format: {fmt}. Use: {', '.join(EXPORT_FORMATS)}"})
+    entry = artifact_store.read_manifest(run_id).get(fmt)
+    if entry is None or "sha256" not in entry:
+        running = EXPORTS.get(run_id)
+        if running is not None and not running.done():
+            status = "still exporting, try again shortly"
+        elif entry is None and MetricStore.exists(run_id):
+            start_export(run_id, [fmt])
+            status = "export started, try again shortly"
+        else:
+            status = (entry or {}).get("error", "run not found")
+        return JSONResponse(status_code=404, content={"error": f"No {fmt} export for run '{run_id}': {status}."})
+    if compress:
+        # The first compressed download of an artifact gzips it once; later ones reuse the file
+        await asyncio.to_thread(artifact_store.gzip_path, entry["sha256"])
+    return serve_artifact(request, entry, compress)
+
+# Background dataset profiling by content hash
+PROFILES = {}
+
+def start_profile(path: str, digest: str, preprocess: bool = False) -> asyncio.Task:
+    running = PROFILES.get(digest)
+    if running is not None and not running.done():
+        return running
+    # After an upload the training cache is built in the same pass
+    work = dataset_profile.preprocess_and_profile if preprocess else dataset_profile.profile_csv
+    task = asyncio.create_task(asyncio.to_thread(work, path, digest))
+    PROFILES[digest] = task
+    return task
+
+@app.get("/datasets/profile")
+async def get_dataset_profile(path: str, sha256: Optional[str] = None):
+    """Column types and stats, label histogram and warnings of a CSV dataset, cached by content hash.
+
+    Until the profile is ready this starts it in the background and answers 202
+    with an approximate row count; poll again for the result.
+    """
+    try:
+        file_path = resolve_dataset_path({"path": path})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if not os.path.isfile(file_path):
+        return JSONResponse(status_code=404, content={"error": f"Dataset '{path}' not found."})
+    # A digest from the client is only trusted for the upload it belongs to
+    digest = sha256 if dataset_cache.known_digest(sha256, file_path) else None
+    if digest is None:
+        digest = await asyncio.to_thread(dataset_profile.file_digest, file_path)
+    profile = dataset_profile.read_profile(digest)
+    if profile is not None:
+        return profile
+    task = PROFILES.get(digest)
+    if task is not None and task.done() and task.exception() is not None:
+        del PROFILES[digest]  # Report the failure once; the next request tries again
+        return JSONResponse(status_code=422, content={"error": f"Couldn't profile '{path}': {task.exception()}"})
+    start_profile(file_path, digest)
+    approx_rows = await asyncio.to_thread(dataset_profile.estimate_rows, file_path)
+    return JSONResponse(status_code=202, content={"profiling": True, "sha256": digest, "approxRows": approx_rows})
+
+# Formats offered by the dashboard's download dialog
+DOWNLOAD_FORMATS = {"pytorch": "state_dict", "torchscript": "torchscript", "onnx": "onnx", "quantized": "quantized"}
+
 @app.get("/download-model")
-def download_model(format: str = "pytorch"):
-    config = CONFIG
-    model_type = config.get("modelType", "custom")
-    model_name = config.get("modelName", "model")
-    # Only serve the file, do not save to Downloads anymore (frontend chooses location)
-    if format == "onnx":
-        filename = f"trained_model_{model_type if model_type != 'custom' else model_name}.onnx"
-    elif format == "tensorflow":
-        filename = f"trained_model_{model_type if model_type != 'custom' else model_name}.h5"
-    else:
-        filename = f"trained_model_{model_type if model_type != 'custom' else model_name}.pt"
-    # Save location: backend working directory
-    model_path = os.path.join(os.getcwd(), filename)
-    if not os.path.exists(model_path):
-        return JSONResponse(status_code=404, content={"error": f"Model file not found for format '{format}'. Please train and export the model first."})
-    return FileResponse(model_path, filename=filename, media_type="application/octet-stream")
+async def download_model(request: Request, format: str = "pytorch", runId: Optional[str] = None, compress: bool = False):
+    """Download an export of a run (by default the latest one)."""
+    fmt = DOWNLOAD_FORMATS.get(format)
+    if fmt is None:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported format '{format}'. Use one of: {', '.join(DOWNLOAD_FORMATS)}"})
+    run_id = runId or await asyncio.to_thread(primary_run_id)
+    if run_id is None:
+        return JSONResponse(status_code=404, content={"error": "No trained model yet. Please train the model first."})
+    return await download_export(request, run_id, fmt, compress)
 
 @app.post("/upload-dataset")
 async def upload_dataset(file: UploadFile = File(...)):
-    # Save the uploaded file to a specific location
-    upload_dir = "dataset"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    # Stream the upload to disk in chunks (hashing as we go) off the event loop
+    file_path, digest, size = await asyncio.to_thread(dataset_cache.store_upload, file.file, file.filename)
+    dataset_profile.remember_digest(file_path, digest)
     # Update the config with the new dataset information
-    CONFIG["dataset"] = {
+    await config_store.update({"dataset": {
         "name": file.filename,
-        "path": file.filename,
+        "path": os.path.basename(file_path),
         "type": "custom",
-        "size": file.size,
+        "size": size,
         "format": file.content_type,
-    }
-    return {"path": file.filename}
+        "sha256": digest,
+    }})
+    # Parse the CSV once into the memory-mapped cache, profiling it in the same pass; later runs skip parsing
+    if file.filename.lower().endswith(".csv"):
+        start_profile(file_path, digest, preprocess=True)
+    return {"path": os.path.basename(file_path), "sha256": digest}
@@ -0,0 +1,91 @@
+import json
+import math
+import struct
+from array import array
+from typing import List
+from schemas import TrainingMetric
+
+# Encodings a /ws/train client can ask for in batch mode
+BATCH_ENCODINGS = ("json", "binary")
+
+# Binary batch layout (little-endian), chosen so every column is aligned for JS typed arrays:
+#   header     8 bytes   magic b"TMB1", uint32 count
+#   timestamp  float64[count]
+#   seq        uint32[count]  (broadcast sequence number, see WebSocketManager)
+#   epoch      int32[count]
+#   step       int32[count]   (-1 for epoch summaries)
+#   loss       float32[count]
+#   accuracy   float32[count]
+#   status     uint8[count]   (index into STATUS_CODES)
+BINARY_MAGIC = b"TMB1"
+STATUS_CODES = (None, "Idle", "Ongoing", "Completed")
+_STATUS_INDEX = {status: code for code, status in enumerate(STATUS_CODES)}
+
+def _finite(value):
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def dumps(message) -> str:
+    """JSON text a browser can parse: NaN and infinities, which JSON.parse rejects, become null."""
+    try:
+        return json.dumps(message, allow_nan=False)
+    except ValueError:
+        return json.dumps(_finite(message))
+
+class MetricBatch:
+    """Columnar buffer of metrics collected between two ticks."""
+
+    def __init__(self):
+        self.timestamp = array("d")
+        self.seq = array("I")
+        self.epoch = array("i")
+        self.step = array("i")
+        self.loss = array("f")
+        self.accuracy = array("f")
+        self.status: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+    def append(self, metric: TrainingMetric, seq: int = 0):
+        self.timestamp.append(metric.timestamp)
+        self.seq.append(seq)
+        self.epoch.append(metric.epoch)
+        self.step.append(-1 if metric.step is None else metric.step)
+        self.loss.append(metric.loss)
+        self.accuracy.append(metric.accuracy)
+        self.status.append(_STATUS_INDEX.get(metric.status, 0))
+
+    def to_json(self) -> str:
+        return dumps({
+            "type": "metrics_batch",
+            "seq": self.seq[-1] if len(self) else None,
+            "payload": {
+                "timestamp": self.timestamp.tolist(),
+                "seq": self.seq.tolist(),
+                "epoch": self.epoch.tolist(),
+                "step": [None if s < 0 else s for s in self.step],
+                "loss": self.loss.tolist(),
+                "accuracy": self.accuracy.tolist(),
+                "status": [STATUS_CODES[code] for code in self.status],
+            },
+        })
+
+    def to_binary(self) -> bytes:
+        columns = [self.timestamp, self.seq, self.epoch, self.step, self.loss, self.accuracy]
+        if struct.pack("=i", 1) != struct.pack("<i", 1):
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        parts = [BINARY_MAGIC, struct.pack("<I", len(self))]
+        parts.extend(column.tobytes() for column in columns)
+        parts.append(bytes(self.status))
+        return b"".join(parts)
+
+    def encode(self, encoding: str):
+        return self.to_binary() if encoding == "binary" else self.to_json()
@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+import numpy as np
+from schemas import TrainingMetric
+
+# Every run gets its own directory holding its config snapshot and metric database
+RUNS_DIR = os.getenv("RUNS_DIR", "runs")
+
+COLUMNS = ("epoch", "step", "loss", "accuracy", "status", "timestamp")
+
+class MetricStore:
+    """Append-only, run-scoped metric time series backed by SQLite.
+
+    Step metrics and epoch summaries share one table; epoch summaries have a
+    NULL step. Reads can be issued from any thread while the run is writing.
+    """
+
+    def __init__(self, run_id: str, root: str = RUNS_DIR):
+        self.run_id = run_id
+        self.run_dir = os.path.join(root, run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.path = os.path.join(self.run_dir, "metrics.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            "seq INTEGER PRIMARY KEY, epoch INTEGER, step INTEGER, loss REAL, "
+            "accuracy REAL, status TEXT, timestamp REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metrics_step ON metrics(step)")
+        self._conn.commit()
+
+    @classmethod
+    def exists(cls, run_id: str, root: str = RUNS_DIR) -> bool:
+        return os.path.exists(os.path.join(root, run_id, "metrics.sqlite3"))
+
+    def save_config(self, config: dict):
+        with open(os.path.join(self.run_dir, "config.json"), "w") as f:
+            json.dump(config, f, indent=2, default=str)
+
+    def load_config(self) -> Optional[dict]:
+        path = os.path.join(self.run_dir, "config.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def append(self, metrics: Iterable[TrainingMetric]):
+        rows = [(m.epoch, m.step, m.loss, m.accuracy, m.status, m.timestamp) for m in metrics]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO metrics (epoch, step, loss, accuracy, status, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def truncate(self, step: int, epoch: int):
+        """Drop step metrics after ``step`` and epoch summaries after ``epoch``, which a resumed run reports again."""
+        with self._lock:
+            self._conn.execute("DELETE FROM metrics WHERE step > ? OR (step IS NULL AND epoch > ?)", (step, epoch))
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+
+    def last(self) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT epoch, step, loss, accuracy, status, timestamp FROM metrics ORDER BY seq DESC LIMIT 1"
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def query(self, kind: str = "step", start: Optional[float] = None, end: Optional[float] = None,
+              points: Optional[int] = None) -> dict:
+        """Fetch a range of metrics as columns, optionally downsampled to ``points`` rows.
+
+        ``kind="step"`` ranges over the global step, ``kind="epoch"`` over epoch
+        summaries. Downsampling uses LTTB on the loss curve and keeps whole rows,
+        so accuracy is sampled at the same x positions.
+        """
+        if kind == "epoch":
+            x_column, where = "epoch", ["step IS NULL"]
+        elif kind == "step":
+            x_column, where = "step", ["step IS NOT NULL"]
+        else:
+            raise ValueError(f"Unknown metric kind '{kind}'. Use 'step' or 'epoch'.")
+        params = []
+        if start is not None:
+            where.append(f"{x_column} >= ?")
+            params.append(start)
+        if end is not None:
+            where.append(f"{x_column} <= ?")
+            params.append(end)
+        sql = (
+            f"SELECT {', '.join(COLUMNS)} FROM metrics WHERE {' AND '.join(where)} ORDER BY {x_column}, seq"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        total = len(rows)
+        if points is not None and 2 < points < total:
+            x = np.fromiter((row[COLUMNS.index(x_column)] for row in rows), dtype=np.float64, count=total)
+            y = np.fromiter((row[2] for row in rows), dtype=np.float64, count=total)
+            rows = [rows[i] for i in lttb_indices(x, y, points)]
+        result = {column: [row[i] for row in rows] for i, column in enumerate(COLUMNS)}
+        result["total"] = total
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets: pick ``threshold`` indices that preserve the curve's shape."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    y = np.nan_to_num(y, nan=0.0, posinf=np.finfo(np.float64).max, neginf=np.finfo(np.float64).min)
+    # Bucket boundaries for the points between the fixed first and last samples
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo, next_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_hi = max(next_hi, next_lo + 1)
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        with np.errstate(over="ignore", invalid="ignore"):  # Diverged losses were clamped to the float range
+            areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(areas.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+def list_runs(root: str = RUNS_DIR) -> List[str]:
+    """Run IDs with stored metrics, newest first."""
+    if not os.path.isdir(root):
+        return []
+    runs = [name for name in os.listdir(root) if MetricStore.exists(name, root)]
+    runs.sort(key=lambda name: os.path.getmtime(os.path.join(root, name)), reverse=True)
+    return runs
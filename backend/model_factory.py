@@ -0,0 +1,42 @@
+from typing import Optional
+import torch.nn as nn
+from models import LogisticRegression, SimpleCNN, SimpleMLP, TinyResNet
+
+# Dropdown entries that need tokenized text or image inputs; runs only feed tabular features
+PRETRAINED_MODELS = ('bert-base-uncased', 'gpt2', 'vit-base')
+
+CUSTOM_MODEL_HELP = """
+[Custom Model Selected]
+To add your custom model logic, edit build_model() in backend/model_factory.py:
+
+    elif model_type == 'custom':
+        # Example:
+        # from my_custom_models import MyCustomModel
+        # model = MyCustomModel(input_dim, output_dim, ...)
+        # Optionally, use model_name for experiment tracking or logic:
+        # if model_name == 'model-11':
+        #     ... # your custom logic here
+
+Your provided model name: '{}'
+"""
+
+def build_model(model_type: str, input_dim: int, output_dim: int, model_name: Optional[str] = None) -> nn.Module:
+    """Construct the model selected in the config dropdown; heavy libraries are imported on first use."""
+    if model_type == 'mlp':
+        return SimpleMLP(input_dim, output_dim)
+    elif model_type == 'logreg':
+        return LogisticRegression(input_dim, output_dim)
+    elif model_type == 'tiny-resnet':
+        return TinyResNet(input_dim, output_dim)
+    elif model_type == 'simple-cnn':
+        return SimpleCNN(1, output_dim)
+    elif model_type == 'resnet50':
+        from torchvision.models import resnet50
+        return resnet50(num_classes=output_dim)
+    elif model_type in PRETRAINED_MODELS:
+        raise ValueError(f"Model '{model_type}' needs tokenized text or image inputs, which this dashboard does not provide yet.")
+    elif model_type == 'custom':
+        # === USER CUSTOM MODEL CODE GOES HERE ===
+        print(CUSTOM_MODEL_HELP.format(model_name))
+        raise ValueError("Custom models are not implemented yet. See build_model() in backend/model_factory.py.")
+    raise ValueError(f"Unknown modelType: {model_type}")
@@ -0,0 +1,45 @@
+import torch
+import torch.nn as nn
+
+# Example model architectures
+class SimpleMLP(nn.Module):
+    def __init__(self, input_dim, output_dim):
+        super().__init__()
+        self.net = nn.Sequential(
+            nn.Linear(input_dim, 64),
+            nn.ReLU(),
+            nn.Linear(64, output_dim)
+        )
+    def forward(self, x):
+        return self.net(x)
+
+class SimpleCNN(nn.Module):
+    def __init__(self, input_channels, num_classes):
+        super().__init__()
+        self.conv = nn.Sequential(
+            nn.Conv2d(input_channels, 8, 3, 1),
+            nn.ReLU(),
+            nn.Flatten()
+        )
+        self.fc = nn.Linear(8*26*26, num_classes)  # assuming 28x28 input
+    def forward(self, x):
+        x = self.conv(x)
+        return self.fc(x)
+
+class LogisticRegression(nn.Module):
+    def __init__(self, input_dim, output_dim):
+        super().__init__()
+        self.linear = nn.Linear(input_dim, output_dim)
+    def forward(self, x):
+        return self.linear(x)
+
+class TinyResNet(nn.Module):
+    def __init__(self, input_dim, output_dim):
+        super().__init__()
+        self.fc1 = nn.Linear(input_dim, 32)
+        self.fc2 = nn.Linear(32, output_dim)
+        self.shortcut = nn.Linear(input_dim, output_dim)
+    def forward(self, x):
+        out = torch.relu(self.fc1(x))
+        out = self.fc2(out) + self.shortcut(x)  # simple residual
+        return out
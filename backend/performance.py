@@ -0,0 +1,133 @@
+import contextlib
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+import torch
+import torch.nn as nn
+
+# Inductor's compiled kernels are cached here, so later runs of the same model skip most of the compile
+COMPILE_CACHE_DIR = os.getenv("COMPILE_CACHE_DIR", "compile-cache")
+CONV_MODEL_TYPES = ("simple-cnn", "resnet50")  # the models channels_last applies to
+WARMUP_STEPS = 2
+
+DEFAULTS = {
+    "threads": None,        # intra-op threads; None keeps the run's share of the cores
+    "interopThreads": 1,    # one training loop gains little from inter-op parallelism
+    "bf16": True,           # CPU bfloat16 autocast
+    "compile": True,        # torch.compile
+    "channelsLast": True,   # conv models only
+    "calibrationSteps": 5,  # timed steps per setting tried
+    "minSpeedup": 1.03,     # a setting is kept only if it makes steps at least this much faster
+}
+# Tried in this order, each on top of the ones already kept
+TUNABLE = ("channelsLast", "bf16", "compile")
+
+def performance_options(setting: Union[bool, dict, None]) -> Optional[dict]:
+    """Options from the ``performance`` config value (``true`` or a dict of overrides); None when off."""
+    if not setting:
+        return None
+    if setting is True:
+        return dict(DEFAULTS)
+    if isinstance(setting, dict):
+        if not setting.get("enabled", True):
+            return None
+        unknown = set(setting) - set(DEFAULTS) - {"enabled"}
+        if unknown:
+            raise ValueError(f"Unknown performance options: {', '.join(sorted(unknown))}")
+        return {**DEFAULTS, **{k: v for k, v in setting.items() if k != "enabled"}}
+    raise ValueError("performance must be true/false or an object of options")
+
+def autocast(bf16: bool):
+    return torch.autocast("cpu", dtype=torch.bfloat16) if bf16 else contextlib.nullcontext()
+
+def configure_threads(options: dict) -> Tuple[Dict[str, int], Optional[str]]:
+    """Apply the thread pool sizes; returns the sizes in effect and why one couldn't be set, if so."""
+    if options["threads"]:
+        torch.set_num_threads(int(options["threads"]))
+    fallback = None
+    if options["interopThreads"]:
+        try:
+            torch.set_num_interop_threads(int(options["interopThreads"]))
+        except RuntimeError as e:
+            # Only possible once per process, before any inter-op work (e.g. not on thread-backend reruns)
+            fallback = f"not supported: {e}"
+    return {"threads": torch.get_num_threads(), "interopThreads": torch.get_num_interop_threads()}, fallback
+
+def compile_model(model: nn.Module) -> nn.Module:
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.abspath(COMPILE_CACHE_DIR))
+    try:
+        import torch._inductor.config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+    return torch.compile(model)
+
+def _time_steps(trial: Callable[[], None], steps: int) -> float:
+    """Mean seconds per call of ``trial`` after a few untimed warmups (which absorb compilation)."""
+    for _ in range(WARMUP_STEPS):
+        trial()
+    started = time.perf_counter()
+    for _ in range(steps):
+        trial()
+    return (time.perf_counter() - started) / steps
+
+def tune(model: nn.Module, model_type: str, options: dict,
+         trial: Callable[[nn.Module, bool, bool], None]) -> Tuple[nn.Module, dict]:
+    """Find the fastest supported combination of channels_last, bf16 autocast and torch.compile.
+
+    ``trial(forward_model, bf16, channels_last)`` runs one forward and backward
+    pass on a fixed batch and clears the gradients. Each setting is tried on
+    top of those already kept and dropped again if it fails or isn't at least
+    ``minSpeedup`` times faster. Returns the module to call in training steps
+    (``model`` itself or a compiled wrapper sharing its parameters) and a
+    report with the measured speedup.
+    """
+    steps = max(1, int(options["calibrationSteps"]))
+    # BatchNorm running stats must not see the calibration batch over and over
+    buffers = {name: buffer.clone() for name, buffer in model.named_buffers()}
+    active = dict.fromkeys(TUNABLE, False)
+    fallbacks: Dict[str, str] = {}
+    forward_model = model
+    baseline = best = _time_steps(lambda: trial(model, False, False), steps)
+    for name in TUNABLE:
+        if not options[name]:
+            continue
+        if name == "channelsLast" and model_type not in CONV_MODEL_TYPES:
+            fallbacks[name] = "only applies to conv models"
+            continue
+        candidate = {**active, name: True}
+        try:
+            if name == "channelsLast":
+                model.to(memory_format=torch.channels_last)
+            candidate_model = compile_model(model) if name == "compile" else forward_model
+            seconds = _time_steps(lambda: trial(candidate_model, candidate["bf16"], candidate["channelsLast"]), steps)
+        except Exception as e:
+            seconds, candidate_model = None, None
+            fallbacks[name] = f"not supported: {str(e).splitlines()[0] if str(e) else type(e).__name__}"
+        if seconds is not None and best / seconds >= float(options["minSpeedup"]):
+            active, forward_model, best = candidate, candidate_model, seconds
+            continue
+        if seconds is not None:
+            fallbacks[name] = f"no speedup (x{best / seconds:.2f})"
+        if name == "channelsLast":
+            model.to(memory_format=torch.contiguous_format)
+    with torch.no_grad():
+        for name, buffer in model.named_buffers():
+            buffer.copy_(buffers[name])
+    report = {
+        "active": [name for name in TUNABLE if active[name]],
+        "fallbacks": fallbacks,
+        "baselineStepMs": baseline * 1000,
+        "tunedStepMs": best * 1000,
+        "speedup": baseline / best,
+    }
+    return forward_model, report
+
+def describe(report: dict) -> str:
+    """One line for the log and the dashboard."""
+    kept = ", ".join(report["active"]) or "no step settings"
+    skipped = "; ".join(f"{name}: {reason}" for name, reason in report["fallbacks"].items())
+    line = (f"Performance: {kept} kept, {report['speedup']:.2f}x per step "
+            f"({report['baselineStepMs']:.2f} -> {report['tunedStepMs']:.2f} ms), "
+            f"{report['threads']} threads")
+    return f"{line}; skipped {skipped}" if skipped else line
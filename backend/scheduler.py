@@ -0,0 +1,231 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+from config_store import ConfigError, live_changes
+from schemas import TrainingMetric
+from trainer import TrainingWorker, new_run_id, train_model
+from websocket_manager import WebSocketManager
+
+# Job lifecycle: queued -> running -> completed | stopped | failed
+QUEUED, RUNNING, COMPLETED, STOPPED, FAILED = "queued", "running", "completed", "stopped", "failed"
+
+def default_max_concurrent(server_workers: int = 1) -> int:
+    # Each run gets a share of the cores for its intra-op threads; the server's workers split them
+    return max(1, (os.cpu_count() or 1) // 4 // server_workers)
+
+class Job:
+    """A submitted training run and its own metric channel."""
+
+    def __init__(self, run_id: str, config: dict, channel: WebSocketManager):
+        self.run_id = run_id
+        self.config = config
+        self.channel = channel
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.worker: Optional[TrainingWorker] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stop_requested = False
+        # Whether starting this run makes it the one mirrored on /ws/train
+        self.primary = True
+        # Called on the event loop with every metric the run produces (e.g. by sweeps)
+        self.listeners: List[Callable[[TrainingMetric], None]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, STOPPED, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "runId": self.run_id,
+            "status": self.status,
+            "error": self.error,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "config": self.config,
+            "configVersion": self.worker.config_version if self.worker else 0,
+            "performance": self.worker.performance if self.worker else None,
+            "validation": self.worker.validation if self.worker else None,
+            "autotune": self.worker.autotune if self.worker else None,
+        }
+
+class _RunBroadcaster:
+    """Sends a run's messages to its own channel, and to the default channel while it is the primary run."""
+
+    def __init__(self, scheduler: "JobScheduler", job: Job):
+        self.scheduler = scheduler
+        self.job = job
+
+    def _targets(self, op: str, payload) -> List[WebSocketManager]:
+        primary = self.scheduler.primary_run_id == self.job.run_id
+        if self.scheduler.mirror is not None:
+            self.scheduler.mirror(self.job, primary, op, payload)
+        return [self.job.channel, self.scheduler.default_channel] if primary else [self.job.channel]
+
+    async def send_metric(self, metric):
+        for listener in self.job.listeners:
+            listener(metric)
+        for channel in self._targets("metric", metric):
+            await channel.send_metric(metric)
+
+    async def send_agent_tip(self, tip):
+        for channel in self._targets("tip", tip):
+            await channel.send_agent_tip(tip)
+
+    async def broadcast(self, message: dict):
+        for channel in self._targets("broadcast", message):
+            await channel.broadcast(message)
+
+class JobScheduler:
+    """Queues training runs and runs up to ``max_concurrent`` of them at once.
+
+    Every run's config is snapshotted at submission. Runs execute in their own
+    process (or thread, with ``use_processes=False``), each limited to its share
+    of the cores. Metrics stream on a per-run channel; the most recently started
+    run (the "primary") is also mirrored on ``default_channel`` for /ws/train.
+    """
+
+    def __init__(self, default_channel: WebSocketManager, channel_factory: Callable[[str], WebSocketManager],
+                 max_concurrent: Optional[int] = None, use_processes: bool = True, keep_finished: int = 100,
+                 on_completed: Optional[Callable[[Job], None]] = None, server_workers: int = 1):
+        self.default_channel = default_channel
+        self.channel_factory = channel_factory
+        # Every server worker runs its own scheduler on the same cores
+        self.server_workers = max(1, server_workers)
+        self.max_concurrent = max_concurrent or default_max_concurrent(self.server_workers)
+        self.use_processes = use_processes
+        self.keep_finished = keep_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.queue: Deque[Job] = deque()
+        self.primary_run_id: Optional[str] = None
+        self.on_completed = on_completed
+        # Set by cluster.Cluster to share jobs and their messages with other server workers:
+        # on_change(job, removed) after a job's status changes, mirror(job, primary, op, payload) per message
+        self.on_change: Optional[Callable[[Job, bool], None]] = None
+        self.mirror: Optional[Callable[[Job, bool, str, object], None]] = None
+
+    @property
+    def threads_per_run(self) -> int:
+        return max(1, (os.cpu_count() or 1) // (self.max_concurrent * self.server_workers))
+
+    def running(self) -> List[Job]:
+        return [job for job in self.jobs.values() if job.status == RUNNING]
+
+    def get(self, run_id: str) -> Optional[Job]:
+        return self.jobs.get(run_id)
+
+    def primary(self) -> Optional[Job]:
+        return self.jobs.get(self.primary_run_id) if self.primary_run_id else None
+
+    def submit(self, config: dict, primary: bool = True, run_id: Optional[str] = None) -> Job:
+        """Queue a run with a snapshot of ``config`` and start it if a slot is free.
+
+        Runs submitted with ``primary=False`` (e.g. sweep trials) never take over /ws/train.
+        Passing the ``run_id`` of a finished run continues it (see trainer.resume_config).
+        """
+        existing = self.jobs.get(run_id) if run_id else None
+        if existing is not None and not existing.finished:
+            raise ValueError(f"Run '{run_id}' is still {existing.status}.")
+        run_id = run_id or new_run_id()
+        self.jobs.pop(run_id, None)
+        worker = TrainingWorker(config, run_id=run_id, use_process=self.use_processes,
+                                num_threads=self.threads_per_run)
+        job = Job(run_id, worker.config, self.channel_factory(run_id))
+        job.worker = worker
+        job.primary = primary
+        self.jobs[run_id] = job
+        self.queue.append(job)
+        self._changed(job)
+        self._dispatch()
+        self._prune()
+        return job
+
+    def stop(self, run_id: str) -> Optional[Job]:
+        """Stop a run at its next step boundary, or drop it from the queue."""
+        job = self.jobs.get(run_id)
+        if job is None:
+            return None
+        job.stop_requested = True
+        if job.status == QUEUED:
+            self.queue.remove(job)
+            job.status = STOPPED
+            job.finished_at = time.time()
+            self._changed(job)
+        elif job.status == RUNNING:
+            job.worker.stop()
+        return job
+
+    def update_config(self, run_id: str, changes: dict) -> Optional[int]:
+        """Validate ``changes`` against a run and push them to it; returns the run's new config version.
+
+        Raises ConfigError for immutable fields, invalid values or finished runs.
+        """
+        job = self.jobs.get(run_id)
+        if job is None:
+            return None
+        if job.finished:
+            raise ConfigError(f"Run '{run_id}' is {job.status}; its config can no longer change.")
+        applied = live_changes(job.config, changes)
+        if not applied:
+            return job.worker.config_version
+        # A queued run picks the changes up at its first step
+        return job.worker.update_config(applied)
+
+    async def wait(self, run_id: str):
+        job = self.jobs.get(run_id)
+        if job is not None and job.task is not None:
+            await asyncio.shield(job.task)
+
+    def _dispatch(self):
+        while self.queue and len(self.running()) < self.max_concurrent:
+            job = self.queue.popleft()
+            job.status = RUNNING
+            job.started_at = time.time()
+            if job.primary:
+                self.primary_run_id = job.run_id
+            job.task = asyncio.create_task(train_model(_RunBroadcaster(self, job), job.worker))
+            job.task.add_done_callback(lambda task, job=job: self._finished(job, task))
+            print(f"Run {job.run_id} started ({len(self.running())}/{self.max_concurrent} slots busy)")
+            self._changed(job)
+
+    def _finished(self, job: Job, task: asyncio.Task):
+        job.finished_at = time.time()
+        if task.cancelled():
+            job.status = STOPPED
+        elif task.exception() is not None:
+            job.status, job.error = FAILED, str(task.exception())
+        elif job.worker.error:
+            job.status, job.error = FAILED, job.worker.error
+        elif job.stop_requested:
+            job.status = STOPPED
+        else:
+            job.status = COMPLETED
+        print(f"Run {job.run_id} {job.status}")
+        self._changed(job)
+        if job.status == COMPLETED and self.on_completed is not None:
+            self.on_completed(job)
+        self._dispatch()
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.run_id]
+            self._changed(job, removed=True)
+
+    def _changed(self, job: Job, removed: bool = False):
+        if self.on_change is not None:
+            self.on_change(job, removed)
+
+    async def shutdown(self):
+        """Stop everything; used when the server shuts down."""
+        for job in list(self.queue):
+            self.stop(job.run_id)
+        tasks = [job.task for job in self.running() if job.task is not None]
+        for job in self.running():
+            job.worker.stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,11 +1,73 @@
 # backend/schemas.py
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, Union
 import time
+from autopilot import autopilot_options
+from autotune import autotune_options
+from distributed import distributed_options
+from evaluation import validation_options
+from performance import performance_options
 
 class TrainingMetric(BaseModel):
     epoch: int
     loss: float
     accuracy: float
-    timestamp: float = time.time()
+    step: Optional[int] = None  # Global optimizer step; None for epoch summaries
+    status: Optional[str] = None
+    timestamp: float = Field(default_factory=time.time)
     note: Optional[str] = None
+
+class TrainingConfig(BaseModel):
+    """The training config as validated by PUT /config; unknown keys are kept as-is."""
+    model_config = ConfigDict(extra="allow")
+
+    learningRate: float = Field(0.001, gt=0)
+    batchSize: int = Field(32, ge=1)
+    epochs: int = Field(100, ge=1)
+    optimizer: str = "adam"
+    modelType: Optional[str] = None
+    modelName: Optional[str] = "default"
+    metricsEvery: int = Field(1, ge=1)
+    autopilot: Union[bool, dict] = False
+    performance: Union[bool, dict] = False
+    distributed: Union[bool, int, dict, None] = False
+    validation: Union[bool, dict] = False
+    autotune: Union[bool, dict] = False
+    dataset: Optional[dict] = None
+
+    @field_validator("optimizer")
+    @classmethod
+    def known_optimizer(cls, value: str) -> str:
+        if value.lower() not in ("adam", "sgd", "rmsprop", "adagrad"):
+            raise ValueError(f"Unknown optimizer: {value}")
+        return value
+
+    @field_validator("autopilot")
+    @classmethod
+    def valid_autopilot(cls, value):
+        autopilot_options(value)
+        return value
+
+    @field_validator("performance")
+    @classmethod
+    def valid_performance(cls, value):
+        performance_options(value)
+        return value
+
+    @field_validator("distributed")
+    @classmethod
+    def valid_distributed(cls, value):
+        distributed_options(value)
+        return value
+
+    @field_validator("autotune")
+    @classmethod
+    def valid_autotune(cls, value):
+        autotune_options(value)
+        return value
+
+    @field_validator("validation")
+    @classmethod
+    def valid_validation(cls, value):
+        validation_options(value)
+        return value
@@ -0,0 +1,414 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-memory backend is available
+    fcntl = None
+
+# Where the default backend keeps its database and broker socket; shared by all workers of one server
+STATE_DIR = os.getenv("STATE_DIR", "state")
+# Bytes a broker subscriber may have unread before further messages to it are dropped
+BROKER_MAX_BUFFER = 4 * 1024 * 1024
+RECONNECT_SECONDS = 0.5
+
+class Subscription:
+    """Messages published on one channel, in order; iterate or ``await get()``."""
+
+    def __init__(self, channel: str, on_close=None):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._on_close = on_close
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self.get()
+
+    async def close(self):
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            await on_close(self)
+
+class SharedState:
+    """Key/value state and pub/sub shared by all server workers.
+
+    Keys and values are strings (callers store JSON), as in Redis, which the
+    interface mirrors so a Redis-compatible server can back it. The key/value
+    methods are synchronous and cheap enough to call from request handlers;
+    pub/sub is async and delivers each message to every subscriber of its
+    channel, the publishing process included.
+    """
+
+    shared = True  # False when other processes can't see the state, so there is no point publishing
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def scan(self, prefix: str) -> Dict[str, str]:
+        """All keys starting with ``prefix`` and their values."""
+        raise NotImplementedError
+
+    def compare_and_set(self, key: str, expected: Optional[str], value: str) -> bool:
+        """Set ``key`` only if it still holds ``expected`` (None: is unset); returns whether it did."""
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str) -> Subscription:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class _LocalPubSub:
+    """Delivers messages to this process's subscriptions."""
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def add(self, channel: str, on_close) -> Subscription:
+        subscription = Subscription(channel, on_close)
+        self.subscriptions[channel].add(subscription)
+        return subscription
+
+    def remove(self, subscription: Subscription) -> bool:
+        """Drop a subscription; returns whether it was its channel's last one."""
+        subscribers = self.subscriptions.get(subscription.channel)
+        if subscribers is None:
+            return False
+        subscribers.discard(subscription)
+        if subscribers:
+            return False
+        del self.subscriptions[subscription.channel]
+        return True
+
+    def deliver(self, channel: str, message: str):
+        for subscription in self.subscriptions.get(channel, ()):
+            subscription.queue.put_nowait(message)
+
+class MemoryState(SharedState):
+    """Process-local state for a single worker: nothing is shared."""
+
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._pubsub = _LocalPubSub()
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def delete(self, key):
+        self._values.pop(key, None)
+
+    def scan(self, prefix):
+        return {key: value for key, value in list(self._values.items()) if key.startswith(prefix)}
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            if self._values.get(key) != expected:
+                return False
+            self._values[key] = value
+            return True
+
+    async def publish(self, channel, message):
+        self._pubsub.deliver(channel, message)
+
+    async def subscribe(self, channel):
+        async def unsubscribe(subscription):
+            self._pubsub.remove(subscription)
+        return self._pubsub.add(channel, unsubscribe)
+
+class SQLiteValues:
+    """Key/value table in a SQLite database that any number of processes on this host can share."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def scan(self, prefix):
+        # Prefixes are plain identifiers, so LIKE's wildcards never appear in them
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM state WHERE key LIKE ?", (prefix + "%",)).fetchall()
+        return dict(rows)
+
+    def compare_and_set(self, key, expected, value):
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other process can change the row in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+                swapped = (row[0] if row else None) == expected
+                if swapped:
+                    self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return swapped
+
+    def close(self):
+        self._conn.close()
+
+async def _serve_broker(path: str) -> asyncio.AbstractServer:
+    """Relay newline-delimited JSON: ``{"op": "sub"|"unsub", "channel"}`` and ``{"op": "pub", "channel", "message"}``."""
+    subscribers: Dict[str, Set[asyncio.StreamWriter]] = defaultdict(set)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            async for line in reader:
+                request = json.loads(line)
+                channel = request["channel"]
+                if request["op"] == "sub":
+                    subscribers[channel].add(writer)
+                elif request["op"] == "unsub":
+                    subscribers[channel].discard(writer)
+                elif request["op"] == "pub":
+                    frame = (json.dumps({"channel": channel, "message": request["message"]}) + "\n").encode()
+                    for subscriber in list(subscribers.get(channel, ())):
+                        # A worker that stopped reading loses messages rather than growing the broker's memory
+                        if subscriber.transport.get_write_buffer_size() < BROKER_MAX_BUFFER:
+                            subscriber.write(frame)
+        except (ConnectionError, ValueError, KeyError, asyncio.CancelledError):
+            pass  # The connection ends (or the broker shuts down) either way
+        finally:
+            for channel in list(subscribers):
+                subscribers[channel].discard(writer)
+                if not subscribers[channel]:
+                    del subscribers[channel]
+            writer.close()
+
+    return await asyncio.start_unix_server(handle, path=path, limit=BROKER_MAX_BUFFER)
+
+class LocalState(SharedState):
+    """State shared by the workers of one host: SQLite for values, a Unix-socket broker for pub/sub.
+
+    Whichever worker takes the lock file first runs the broker; when it exits
+    another worker takes over and every worker reconnects and resubscribes.
+    Messages published during the switch are lost.
+    """
+
+    def __init__(self, directory: str = STATE_DIR):
+        if fcntl is None or not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("The local shared state needs Unix sockets; use SHARED_STATE=memory here.")
+        os.makedirs(directory, exist_ok=True)
+        self._values = SQLiteValues(os.path.join(directory, "state.db"))
+        self._socket_path = os.path.join(directory, "broker.sock")
+        self._lock_path = os.path.join(directory, "broker.lock")
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pubsub = _LocalPubSub()
+
+    def get(self, key):
+        return self._values.get(key)
+
+    def set(self, key, value):
+        self._values.set(key, value)
+
+    def delete(self, key):
+        self._values.delete(key)
+
+    def scan(self, prefix):
+        return self._values.scan(prefix)
+
+    def compare_and_set(self, key, expected, value):
+        return self._values.compare_and_set(key, expected, value)
+
+    async def _become_broker(self) -> bool:
+        if self._server is not None:
+            return True
+        lock_file = open(self._lock_path, "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        # Holding the lock means any socket file left behind belongs to a broker that is gone
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._server = await _serve_broker(self._socket_path)
+        print(f"Shared state: this worker ({os.getpid()}) runs the pub/sub broker")
+        return True
+
+    async def _connect(self):
+        while True:
+            try:
+                await self._become_broker()
+                reader, writer = await asyncio.open_unix_connection(self._socket_path, limit=BROKER_MAX_BUFFER)
+            except (ConnectionError, FileNotFoundError):
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+            for channel in self._pubsub.subscriptions:
+                writer.write((json.dumps({"op": "sub", "channel": channel}) + "\n").encode())
+            self._writer = writer
+            self._connected.set()
+            return reader
+
+    async def _read_loop(self):
+        while True:
+            reader = await self._connect()
+            try:
+                async for line in reader:
+                    message = json.loads(line)
+                    self._pubsub.deliver(message["channel"], message["message"])
+            except (ConnectionError, ValueError):
+                pass
+            self._connected.clear()
+            self._writer = None
+            print("Shared state: lost the pub/sub broker, reconnecting")
+
+    async def _send(self, request: dict):
+        if self._reader_task is None:
+            self._reader_task = asyncio.create_task(self._read_loop())
+        await self._connected.wait()
+        self._writer.write((json.dumps(request) + "\n").encode())
+
+    async def publish(self, channel, message):
+        await self._send({"op": "pub", "channel": channel, "message": message})
+
+    async def subscribe(self, channel):
+        first = channel not in self._pubsub.subscriptions
+        subscription = self._pubsub.add(channel, self._unsubscribe)
+        if first:
+            await self._send({"op": "sub", "channel": channel})
+        return subscription
+
+    async def _unsubscribe(self, subscription: Subscription):
+        if self._pubsub.remove(subscription) and self._writer is not None:
+            await self._send({"op": "unsub", "channel": subscription.channel})
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+            self._lock_file.close()
+        self._values.close()
+
+class RedisState(SharedState):
+    """State in a Redis-compatible server (``redis://host:port/db``), for workers on several hosts.
+
+    Needs the ``redis`` package.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise RuntimeError("SHARED_STATE=redis://... needs the 'redis' package (pip install redis).") from None
+        self._watch_error = redis.WatchError
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._async_client = redis.asyncio.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value):
+        self._client.set(key, value)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def scan(self, prefix):
+        keys = list(self._client.scan_iter(match=prefix + "*"))
+        values = self._client.mget(keys) if keys else []
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def compare_and_set(self, key, expected, value):
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != expected:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.set(key, value)
+                pipe.execute()
+                return True
+            except self._watch_error:
+                return False
+
+    async def publish(self, channel, message):
+        await self._async_client.publish(channel, message)
+
+    async def subscribe(self, channel):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(channel)
+
+        async def forward():
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    subscription.queue.put_nowait(message["data"])
+
+        async def unsubscribe(subscription):
+            reader.cancel()
+            await pubsub.unsubscribe(channel)
+            await (pubsub.aclose() if hasattr(pubsub, "aclose") else pubsub.reset())
+
+        subscription = Subscription(channel, unsubscribe)
+        reader = asyncio.create_task(forward())
+        return subscription
+
+    async def close(self):
+        self._client.close()
+        await (self._async_client.aclose() if hasattr(self._async_client, "aclose") else self._async_client.close())
+
+def open_state(setting: Optional[str] = None) -> SharedState:
+    """The backend named by ``setting`` (default: the SHARED_STATE environment variable).
+
+    ``memory`` keeps everything in this process (a single worker), ``local``
+    shares it between the workers on this host, ``redis://...`` between hosts.
+    """
+    setting = setting or os.getenv("SHARED_STATE") or ("local" if fcntl is not None else "memory")
+    if setting == "memory":
+        return MemoryState()
+    if setting == "local":
+        return LocalState()
+    if setting.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(setting)
+    raise ValueError(f"Unknown SHARED_STATE '{setting}'. Use memory, local or a redis:// URL.")
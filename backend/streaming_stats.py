@@ -0,0 +1,176 @@
+import math
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+class RollingWindow:
+    """Fixed-size window over a stream with O(1) updates.
+
+    Maintains the running sum, sum of squares, least-squares slope (against the
+    sample index) and min/max (via monotonic deques, amortized O(1)). Sums are
+    rebuilt from the buffer once per window length to keep float drift bounded.
+    """
+
+    def __init__(self, size: int):
+        if size < 2:
+            raise ValueError("RollingWindow needs a size of at least 2")
+        self.size = size
+        self.values: List[float] = [0.0] * size
+        self.start = 0
+        self.count = 0
+        self.total = 0  # Samples seen over the window's lifetime
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.sum_xy = 0.0  # sum of i * y_i with i = 0 for the oldest sample in the window
+        self._min: Deque[Tuple[int, float]] = deque()
+        self._max: Deque[Tuple[int, float]] = deque()
+        self._since_rebuild = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+    def push(self, value: float):
+        if self.count == self.size:
+            oldest = self.values[self.start]
+            # Dropping index 0 shifts every remaining index down by one
+            self.sum_xy -= self.sum - oldest
+            self.sum -= oldest
+            self.sum_sq -= oldest * oldest
+            self.values[self.start] = value
+            self.start = (self.start + 1) % self.size
+            self.sum_xy += (self.size - 1) * value
+        else:
+            self.values[(self.start + self.count) % self.size] = value
+            self.sum_xy += self.count * value
+            self.count += 1
+        self.sum += value
+        self.sum_sq += value * value
+        position = self.total
+        self.total += 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((position, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((position, value))
+        oldest_position = self.total - self.count
+        while self._min[0][0] < oldest_position:
+            self._min.popleft()
+        while self._max[0][0] < oldest_position:
+            self._max.popleft()
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.size:
+            self._rebuild()
+
+    def _rebuild(self):
+        ordered = self.ordered()
+        self.sum = math.fsum(ordered)
+        self.sum_sq = math.fsum(v * v for v in ordered)
+        self.sum_xy = math.fsum(i * v for i, v in enumerate(ordered))
+        self._since_rebuild = 0
+
+    def ordered(self) -> List[float]:
+        """Window contents, oldest first (O(n); for display and tests, not hot paths)."""
+        return [self.values[(self.start + i) % self.size] for i in range(self.count)]
+
+    def last(self, back: int = 0) -> Optional[float]:
+        if back >= self.count:
+            return None
+        return self.values[(self.start + self.count - 1 - back) % self.size]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.count < 2:
+            return 0.0
+        return max(0.0, (self.sum_sq - self.sum * self.sum / self.count) / (self.count - 1))
+
+    @property
+    def slope(self) -> float:
+        """Least-squares slope per sample over the window."""
+        n = self.count
+        if n < 2:
+            return 0.0
+        mean_x = (n - 1) / 2
+        sxx = n * (n * n - 1) / 12  # sum of (i - mean_x)^2 for i = 0..n-1
+        return (self.sum_xy - mean_x * self.sum) / sxx
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+class MetricMonitor:
+    """Constant-time diagnostics over a stream of loss/accuracy values.
+
+    Call ``update`` for every metric; read the detector properties afterwards.
+    Non-finite losses are counted but kept out of the windows.
+    """
+
+    def __init__(self, window: int = 50, ewma_alpha: float = 0.1, plateau_tolerance: float = 1e-3,
+                 divergence_ratio: float = 1.5, explosion_factor: float = 10.0):
+        self.loss = RollingWindow(window)
+        self.accuracy = RollingWindow(window)
+        self.ewma_alpha = ewma_alpha
+        self.plateau_tolerance = plateau_tolerance
+        self.divergence_ratio = divergence_ratio
+        self.explosion_factor = explosion_factor
+        self.ewma_loss: Optional[float] = None
+        self.best_ewma_loss: Optional[float] = None
+        self.updates = 0
+        self.non_finite = 0
+        self.last_non_finite = False
+        self.last_exploded = False
+
+    def update(self, loss: float, accuracy: Optional[float] = None):
+        self.updates += 1
+        self.last_non_finite = not math.isfinite(loss)
+        if self.last_non_finite:
+            self.non_finite += 1
+            self.last_exploded = False
+            return
+        # Compare against the smoothed loss before this sample moves it
+        self.last_exploded = self.ewma_loss is not None and loss > self.explosion_factor * max(self.ewma_loss, 1e-8)
+        self.ewma_loss = loss if self.ewma_loss is None else self.ewma_alpha * loss + (1 - self.ewma_alpha) * self.ewma_loss
+        if self.best_ewma_loss is None or self.ewma_loss < self.best_ewma_loss:
+            self.best_ewma_loss = self.ewma_loss
+        self.loss.push(loss)
+        if accuracy is not None and math.isfinite(accuracy):
+            self.accuracy.push(accuracy)
+
+    @property
+    def plateaued(self) -> bool:
+        """Loss has been flat (relative slope and spread within tolerance) for a full window."""
+        if not self.loss.full:
+            return False
+        scale = max(abs(self.loss.mean), 1e-8)
+        spread = math.sqrt(self.loss.variance)
+        return abs(self.loss.slope) * self.loss.size / scale < self.plateau_tolerance * 10 and spread / scale < 0.05
+
+    @property
+    def diverging(self) -> bool:
+        """Smoothed loss has climbed well above the best it has reached, and is still rising."""
+        if self.ewma_loss is None or self.best_ewma_loss is None or len(self.loss) < 3:
+            return False
+        return self.ewma_loss > self.divergence_ratio * max(self.best_ewma_loss, 1e-8) and self.loss.slope > 0
+
+    def summary(self) -> dict:
+        return {
+            "updates": self.updates,
+            "ewmaLoss": self.ewma_loss,
+            "lossSlope": self.loss.slope,
+            "lossVariance": self.loss.variance,
+            "accuracyRange": (self.accuracy.max - self.accuracy.min) if len(self.accuracy) else None,
+            "plateaued": self.plateaued,
+            "diverging": self.diverging,
+            "nonFinite": self.non_finite,
+        }
@@ -0,0 +1,211 @@
+import asyncio
+import itertools
+import math
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+import dataset_cache
+from data_pipeline import resolve_dataset_path
+from schemas import TrainingMetric
+from scheduler import COMPLETED, FAILED, RUNNING, STOPPED, JobScheduler
+
+STRATEGIES = ("grid", "random", "asha")
+# Config keys a sweep may vary
+SWEEPABLE_KEYS = ("learningRate", "batchSize", "optimizer", "epochs")
+
+def validate_space(space: Dict[str, dict], strategy: str):
+    """Check a search space such as
+    ``{"learningRate": {"min": 1e-4, "max": 1e-1, "log": true}, "optimizer": {"values": ["adam", "sgd"]}}``.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}")
+    if not space:
+        raise ValueError("Search space is empty.")
+    for key, spec in space.items():
+        if key not in SWEEPABLE_KEYS:
+            raise ValueError(f"'{key}' can't be swept. Sweepable keys: {', '.join(SWEEPABLE_KEYS)}")
+        if "values" in spec:
+            if not spec["values"]:
+                raise ValueError(f"'{key}' has no values.")
+        elif "min" in spec and "max" in spec:
+            if strategy == "grid":
+                raise ValueError(f"Grid search needs explicit values for '{key}'.")
+            if spec["min"] > spec["max"] or (spec.get("log") and spec["min"] <= 0):
+                raise ValueError(f"Invalid range for '{key}'.")
+        else:
+            raise ValueError(f"'{key}' needs either 'values' or 'min'/'max'.")
+
+def _sample(spec: dict, key: str, rng: random.Random):
+    if "values" in spec:
+        return rng.choice(spec["values"])
+    low, high = spec["min"], spec["max"]
+    if spec.get("log"):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return int(round(value)) if key in ("batchSize", "epochs") else value
+
+def generate_trials(space: Dict[str, dict], strategy: str, num_trials: int, seed: Optional[int] = None) -> List[dict]:
+    """Parameter sets to try: the full grid, or ``num_trials`` random samples."""
+    if strategy == "grid":
+        keys = list(space)
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[k]["values"] for k in keys))]
+    rng = random.Random(seed)
+    return [{key: _sample(spec, key, rng) for key, spec in space.items()} for _ in range(num_trials)]
+
+class RungPruner:
+    """Asynchronous successive halving (ASHA) applied as early stopping.
+
+    Rungs sit at ``min_epochs * eta**k`` epochs. When a trial reaches a rung, its
+    epoch loss is compared with every loss recorded at that rung so far; unless
+    it is within the best 1/eta of them, the trial is stopped. Decisions need at
+    least ``eta`` recorded results, so the first trials always continue.
+    """
+
+    def __init__(self, min_epochs: int = 1, eta: int = 3):
+        self.min_epochs = max(1, min_epochs)
+        self.eta = max(2, eta)
+        self.rungs: Dict[int, List[float]] = {}
+
+    def is_rung(self, epoch: int) -> bool:
+        rung = self.min_epochs
+        while rung < epoch:
+            rung *= self.eta
+        return rung == epoch
+
+    def should_prune(self, epoch: int, loss: float) -> bool:
+        if not self.is_rung(epoch):
+            return False
+        if math.isnan(loss) or math.isinf(loss):
+            return True
+        losses = self.rungs.setdefault(epoch, [])
+        losses.append(loss)
+        if len(losses) < self.eta:
+            return False
+        keep = max(1, len(losses) // self.eta)
+        return loss > sorted(losses)[keep - 1]
+
+class Trial:
+    def __init__(self, index: int, params: dict):
+        self.index = index
+        self.params = params
+        self.run_id: Optional[str] = None
+        self.status = "pending"
+        self.epoch = 0
+        self.loss: Optional[float] = None
+        self.accuracy: Optional[float] = None
+        self.pruned_at: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "params": self.params,
+            "runId": self.run_id,
+            "status": self.status,
+            "epoch": self.epoch,
+            "loss": self.loss,
+            "accuracy": self.accuracy,
+            "prunedAt": self.pruned_at,
+        }
+
+class Sweep:
+    """A set of trials run in parallel through the JobScheduler."""
+
+    def __init__(self, scheduler: JobScheduler, base_config: dict, space: Dict[str, dict], strategy: str = "random",
+                 num_trials: int = 10, prune: Optional[bool] = None, min_epochs: int = 1, eta: int = 3,
+                 seed: Optional[int] = None):
+        validate_space(space, strategy)
+        self.sweep_id = f"sweep-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:4]}"
+        self.scheduler = scheduler
+        self.base_config = base_config
+        self.space = space
+        self.strategy = strategy
+        self.prune = strategy == "asha" if prune is None else prune
+        self.pruner = RungPruner(min_epochs, eta)
+        self.trials = [Trial(i, params) for i, params in enumerate(generate_trials(space, strategy, num_trials, seed))]
+        self.created_at = time.time()
+        self.stopped = False
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def launch(self) -> asyncio.Task:
+        """Run start in the background; the sweep records why it failed instead of raising."""
+        self.task = asyncio.create_task(self._start_or_fail())
+        return self.task
+
+    async def _start_or_fail(self):
+        try:
+            await self.start()
+        except Exception as e:
+            print(f"{self.sweep_id} failed to start: {e}")
+            self.error = str(e)
+            for trial in self.trials:
+                if trial.run_id is None:
+                    trial.status = FAILED
+
+    async def start(self):
+        """Make sure the dataset is preprocessed once, then queue every trial."""
+        dataset = dict(self.base_config.get("dataset") or {})
+        if dataset.get("path"):
+            # All trials memory-map the same cache instead of each parsing the CSV
+            path = resolve_dataset_path(dataset)
+            if not dataset_cache.known_digest(dataset.get("sha256"), path):
+                digest = await asyncio.to_thread(dataset_cache.hash_file, path)
+                await asyncio.to_thread(dataset_cache.preprocess_csv, path, digest)
+                dataset["sha256"] = digest
+                self.base_config = {**self.base_config, "dataset": dataset}
+        for trial in self.trials:
+            if self.stopped:
+                break
+            job = self.scheduler.submit({**self.base_config, **trial.params}, primary=False)
+            trial.run_id = job.run_id
+            job.listeners.append(lambda metric, trial=trial: self._observe(trial, metric))
+
+    def _observe(self, trial: Trial, metric: TrainingMetric):
+        if metric.step is not None or metric.status != "Ongoing":
+            return
+        trial.epoch, trial.loss, trial.accuracy = metric.epoch, metric.loss, metric.accuracy
+        if self.prune and trial.pruned_at is None and self.pruner.should_prune(metric.epoch, metric.loss):
+            trial.pruned_at = metric.epoch
+            print(f"{self.sweep_id}: pruning trial {trial.index} at epoch {metric.epoch} (loss {metric.loss:.4f})")
+            self.scheduler.stop(trial.run_id)
+
+    def _refresh(self):
+        for trial in self.trials:
+            job = self.scheduler.get(trial.run_id) if trial.run_id else None
+            if job is None:
+                continue
+            if trial.pruned_at is not None and job.status == STOPPED:
+                trial.status = "pruned"
+            else:
+                trial.status = job.status
+
+    def best(self) -> Optional[Trial]:
+        scored = [t for t in self.trials if t.loss is not None and t.status in (COMPLETED, RUNNING)]
+        return min(scored, key=lambda t: t.loss, default=None)
+
+    def stop(self):
+        self.stopped = True
+        for trial in self.trials:
+            if trial.run_id:
+                self.scheduler.stop(trial.run_id)
+            else:
+                trial.status = STOPPED
+
+    def to_dict(self) -> dict:
+        self._refresh()
+        best = self.best()
+        finished = sum(t.status in (COMPLETED, STOPPED, FAILED, "pruned") for t in self.trials)
+        return {
+            "sweepId": self.sweep_id,
+            "strategy": self.strategy,
+            "space": self.space,
+            "prune": self.prune,
+            "createdAt": self.created_at,
+            "starting": self.task is not None and not self.task.done(),
+            "error": self.error,
+            "finished": finished == len(self.trials),
+            "best": best.to_dict() if best else None,
+            "trials": [t.to_dict() for t in self.trials],
+        }
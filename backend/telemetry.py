@@ -0,0 +1,206 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from 50us to 10s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self.values.items()]
+
+class Gauge(_Metric):
+    """A gauge read from ``collect`` at scrape time: a callable returning {label values: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self.collect().items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def _series(self, key):
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value: float, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series(self._key(labels))
+            series[0][index] += 1
+            series[1] += value
+
+    def merge(self, counts: Sequence[int], total: float, **labels):
+        """Add pre-aggregated observations (same buckets), e.g. from a StepProfiler."""
+        with self._lock:
+            series = self._series(self._key(labels))
+            for i, count in enumerate(counts):
+                series[0][i] += count
+            series[1] += total
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total) in self.series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+def histogram(name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+              labelnames: Sequence[str] = ()) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, buckets, labelnames))
+
+def gauge(name: str, help: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+          labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, collect, labelnames))
+
+STEP_PHASES = ("data", "forward", "backward", "optimizer", "emit")
+
+class StepProfiler:
+    """Per-phase timings of training steps, aggregated locally into histogram buckets.
+
+    Cheap enough for every step: a ``perf_counter`` call and a bisect per phase.
+    ``drain`` hands back what was collected since the last call, to be shipped
+    to the server as one event and merged into the /metrics histograms.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._reset()
+        self.mark = time.perf_counter()
+
+    def _reset(self):
+        self.counts = {phase: [0] * (len(self.buckets) + 1) for phase in STEP_PHASES}
+        self.totals = dict.fromkeys(STEP_PHASES, 0.0)
+        self.steps = 0
+        self.started = time.perf_counter()
+
+    def lap(self, phase: str):
+        """Attribute the time since the previous lap to ``phase``."""
+        now = time.perf_counter()
+        elapsed = now - self.mark
+        self.mark = now
+        self.counts[phase][bisect.bisect_left(self.buckets, elapsed)] += 1
+        self.totals[phase] += elapsed
+
+    def restart(self):
+        """Start timing afresh, e.g. at the start of an epoch, so time spent between epochs isn't counted."""
+        self.mark = time.perf_counter()
+
+    def end_step(self):
+        self.lap("emit")
+        self.steps += 1
+
+    def drain(self) -> Optional[dict]:
+        if not self.steps:
+            return None
+        sample = {"steps": self.steps, "seconds": time.perf_counter() - self.started,
+                  "phases": {phase: (self.counts[phase], self.totals[phase]) for phase in STEP_PHASES}}
+        self._reset()
+        return sample
+
+class SampledLog:
+    """Rate-limited logging: at most one line per ``interval`` seconds per key.
+
+    Suppressed lines are counted and reported with the next one that gets through.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def __call__(self, key: str, message: str):
+        now = time.monotonic()
+        if now - self._last.get(key, -math.inf) < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        print(f"{message} (+{suppressed} similar)" if suppressed else message)
+
+log_sampled = SampledLog()
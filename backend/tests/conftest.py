@@ -0,0 +1,48 @@
+"""Shared fixtures. Run the tests from backend/ with ``python -m pytest tests``."""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import pytest
+
+# The backend's modules import each other flat, as uvicorn runs them from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules read their directories from the environment on import; keep tests away from real runs and uploads
+SCRATCH = tempfile.mkdtemp(prefix="dashboard-tests-")
+for name, directory in (("RUNS_DIR", "runs"), ("ARTIFACTS_DIR", "artifacts"), ("DATASET_DIR", "datasets"),
+                        ("STATE_DIR", "state"), ("COMPILE_CACHE_DIR", "compile-cache")):
+    os.environ.setdefault(name, os.path.join(SCRATCH, directory))
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+def write_csv(name: str, rows: int = 200, features: int = 3, seed: int = 0) -> dict:
+    """A learnable CSV in the upload directory (label "pos" when the features sum above half their count).
+
+    Returns the ``dataset`` config value pointing at it.
+    """
+    import dataset_cache
+    os.makedirs(dataset_cache.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(dataset_cache.UPLOAD_DIR, name)
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write(",".join(f"f{i}" for i in range(features)) + ",label\n")
+        for _ in range(rows):
+            values = [rng.random() for _ in range(features)]
+            f.write(",".join(f"{v:.6f}" for v in values) + f",{'pos' if sum(values) > features / 2 else 'neg'}\n")
+    return {"name": name, "path": name}
+
+@pytest.fixture
+def dataset(request) -> dict:
+    """A small CSV dataset unique to the test."""
+    return write_csv(f"{request.node.name}.csv".replace("/", "_").replace("[", "_").replace("]", ""))
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup run. Started once: its shared state and executors don't outlive a shutdown."""
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,65 @@
+import gzip
+import os
+import pytest
+import artifact_store
+from artifact_store import gzip_path, iter_file, object_path, parse_range, put_bytes, read_manifest, record
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("items=0-1", None),
+    ("bytes=0-1,4-5", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=20-10", "bytes=-0", "bytes=a-b"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+def test_objects_are_stored_once_by_content(tmp_path):
+    root = str(tmp_path)
+    digest, size = put_bytes(b"weights", root)
+    assert (digest, size) == put_bytes(b"weights", root)
+    assert size == 7
+    assert [name for name in os.listdir(os.path.dirname(object_path(digest, root)))] == [digest]
+    assert b"".join(iter_file(object_path(digest, root), 2, 4)) == b"igh"
+    with gzip.open(gzip_path(digest, root)) as f:
+        assert f.read() == b"weights"
+
+def test_manifest_records_by_format(tmp_path):
+    os.makedirs(tmp_path / "run")
+    record("run", "pytorch", {"sha256": "ab", "size": 1}, runs_root=str(tmp_path))
+    record("run", "onnx", {"error": "no onnx"}, runs_root=str(tmp_path))
+    manifest = read_manifest("run", runs_root=str(tmp_path))
+    assert manifest["pytorch"]["sha256"] == "ab" and "createdAt" in manifest["pytorch"]
+    assert manifest["onnx"]["error"] == "no onnx"
+    assert read_manifest("missing", runs_root=str(tmp_path)) == {}
+
+def test_downloads_support_ranges_etags_and_gzip(client):
+    from metric_store import RUNS_DIR
+    data = bytes(range(256)) * 64
+    digest, size = put_bytes(data)
+    os.makedirs(os.path.join(RUNS_DIR, "exported"), exist_ok=True)
+    record("exported", "state_dict", {"sha256": digest, "size": size, "filename": "model.pt"})
+    url = "/runs/exported/exports/state_dict"
+    full = client.get(url)
+    assert full.status_code == 200 and full.content == data
+    etag = full.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == data[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{size}"
+    # A stale If-Range gets the whole file instead of a piece of a different one
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"other"'}).content == data
+    assert client.get(url, headers={"Range": f"bytes={size}-"}).status_code == 416
+    compressed = client.get(url + "?compress=true", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip" and compressed.content == data
+    assert client.get("/runs/exported/exports/pickle").status_code == 400
+    assert client.get("/runs/missing/exports/onnx").status_code == 404
@@ -0,0 +1,65 @@
+import asyncio
+import math
+import pytest
+from autopilot import ABORT, DEFAULTS, EARLY_STOP, REDUCE_LR, Autopilot, autopilot_options
+from scheduler import COMPLETED, JobScheduler
+from websocket_manager import WebSocketManager
+
+def test_options():
+    assert autopilot_options(None) is None
+    assert autopilot_options(False) is None
+    assert autopilot_options({"enabled": False}) is None
+    assert autopilot_options(True) == DEFAULTS
+    assert autopilot_options({"patience": 2}) == {**DEFAULTS, "patience": 2}
+    with pytest.raises(ValueError):
+        autopilot_options({"patiense": 2})
+    with pytest.raises(ValueError):
+        autopilot_options("on")
+
+def test_plateau_cuts_the_learning_rate_then_stops():
+    pilot = Autopilot({**DEFAULTS, "patience": 4, "lrPatience": 2, "lrFactor": 0.1}, learning_rate=0.01)
+    assert pilot.on_epoch(1, 1.0) is None and pilot.improved
+    assert pilot.on_epoch(2, 1.0) is None and not pilot.improved
+    action = pilot.on_epoch(3, 1.0)
+    assert action.kind == REDUCE_LR and action.learning_rate == pytest.approx(0.001)
+    assert pilot.on_epoch(4, 1.0) is None
+    action = pilot.on_epoch(5, 1.0)
+    assert action.kind == EARLY_STOP and "epoch 1" in action.message
+    assert pilot.best_epoch == 1
+
+def test_improvement_resets_patience():
+    pilot = Autopilot({**DEFAULTS, "patience": 2, "lrPatience": 5}, learning_rate=0.01)
+    for epoch, loss in enumerate((1.0, 1.0, 0.5, 0.5), start=1):
+        assert pilot.on_epoch(epoch, loss) is None
+    assert pilot.best_epoch == 3
+    assert pilot.on_epoch(5, 0.5).kind == EARLY_STOP
+
+def test_learning_rate_stops_at_its_floor():
+    pilot = Autopilot({**DEFAULTS, "patience": 100, "lrPatience": 1, "minLr": 0.004}, learning_rate=0.01)
+    pilot.on_epoch(1, 1.0)
+    assert [pilot.on_epoch(epoch, 1.0).learning_rate for epoch in (2, 3)] == [0.005, 0.004]
+    assert pilot.on_epoch(4, 1.0) is None
+
+def test_non_finite_and_diverging_step_losses_abort():
+    pilot = Autopilot({**DEFAULTS, "divergenceWindow": 10}, learning_rate=0.01)
+    assert pilot.on_step(1.0) is None
+    assert pilot.on_step(math.nan).kind == ABORT
+    pilot = Autopilot({**DEFAULTS, "divergenceWindow": 10}, learning_rate=0.01)
+    actions = [pilot.on_step(1.0 - 0.05 * i) for i in range(15)]
+    actions += [pilot.on_step(0.3 * 1.5 ** i) for i in range(10)]
+    assert not any(actions[:15])
+    assert any(action is not None and action.kind == ABORT for action in actions)
+
+def test_learning_rate_cuts_are_recorded_as_config_changes(dataset):
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        # Nothing counts as an improvement, so the rate is halved after every epoch but the first
+        config = {"dataset": dataset, "epochs": 4, "batchSize": 20, "learningRate": 0.01, "optimizer": "adam",
+                  "modelType": "mlp", "autopilot": {"minDelta": 0.99, "lrPatience": 1, "patience": 100}}
+        job = scheduler.submit(config)
+        await scheduler.wait(job.run_id)
+        assert job.status == COMPLETED
+        # The cut after the final epoch has no step left to be applied at
+        assert job.config["learningRate"] == pytest.approx(0.0025)
+        assert job.to_dict()["configVersion"] == 2
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+import autotune
+from autotune import DEFAULTS, autotune_options, describe, tune_loader, uses_workers
+from trainer import TrainingWorker, train_model
+from websocket_manager import WebSocketManager
+
+def test_options():
+    assert autotune_options(None) is None
+    assert autotune_options(True) == DEFAULTS
+    assert autotune_options({"workers": [0]})["workers"] == [0]
+    for setting in ({"batchSizes": []}, {"batchSizes": [0, 8]}, {"workers": [-1]}, {"prefetch": [0]},
+                    {"batchsizes": [8]}, 1):
+        with pytest.raises(ValueError):
+            autotune_options(setting)
+    assert uses_workers(DEFAULTS) and not uses_workers({**DEFAULTS, "workers": [0]})
+
+@pytest.fixture
+def measured(monkeypatch):
+    """Replace timing with a table: {batch size: (samples/s, memory MB)}; returns the sizes tried."""
+    table, tried = {}, []
+
+    def trial(loader, step, steps):
+        tried.append(loader.batch_size)
+        result = table[loader.batch_size]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(autotune, "_trial", trial)
+    return SimpleNamespace(table=table, tried=tried)
+
+def tune(batch_size: int, **options) -> dict:
+    options = {**DEFAULTS, "workers": [0], "memoryLimitMb": 1000, **options}
+    return tune_loader(options, batch_size, lambda size, workers, prefetch, pin: SimpleNamespace(batch_size=size),
+                       lambda inputs, targets: None)
+
+def test_preserved_batches_are_accumulated(measured):
+    measured.table.update({16: (900, 10), 32: (1000, 20), 64: (950, 40)})
+    report = tune(64, batchSizes=[16, 32, 128])
+    # 128 doesn't divide the configured 64
+    assert measured.tried == [16, 32, 64]
+    assert (report["batchSize"], report["accumulate"], report["effectiveBatchSize"]) == (32, 2, 64)
+    assert report["speedup"] == pytest.approx(1000 / 950)
+
+def test_sizes_expected_to_exceed_the_memory_limit_are_skipped(measured):
+    measured.table.update({size: (size, size / 2) for size in (16, 32, 64, 128, 256)})
+    report = tune(16, batchSizes=[32, 64, 128, 256], preserveBatch=False, memoryLimitMb=100)
+    assert measured.tried == [16, 32, 64, 128]
+    assert report["batchSize"] == 128 and report["accumulate"] == 1
+    assert report["fallbacks"]["batchSize"] == "256 and up would exceed 100 MB"
+
+def test_failures_end_the_size_sweep(measured):
+    measured.table.update({8: (100, 1), 16: (150, 2), 32: RuntimeError("out of memory\ntrace")})
+    report = tune(8, batchSizes=[16, 32, 64], preserveBatch=False)
+    assert measured.tried == [8, 16, 32]
+    assert report["batchSize"] == 16
+    assert report["trials"][-1]["error"] == "out of memory"
+    measured.table[8] = RuntimeError("no rows")
+    with pytest.raises(RuntimeError, match="no batch size"):
+        tune(8, batchSizes=[8])
+
+def test_small_gains_keep_the_configured_batch_size(measured):
+    measured.table.update({16: (102, 1), 32: (100, 2)})
+    report = tune(32, batchSizes=[16])
+    assert report["batchSize"] == 32 and report["accumulate"] == 1
+    assert "tuned" in report["fallbacks"]
+    assert describe(report).startswith("Autotune: batch 32, no loader workers")
+
+def test_runs_train_with_the_tuned_settings(dataset):
+    worker = TrainingWorker({"dataset": dataset, "epochs": 1, "batchSize": 20, "learningRate": 0.01,
+                             "optimizer": "adam", "modelType": "mlp",
+                             "autotune": {"batchSizes": [10, 20], "workers": [0], "steps": 2, "minSpeedup": 0}})
+    asyncio.run(train_model(WebSocketManager(), worker))
+    assert worker.error is None
+    report = worker.autotune
+    assert {trial["batchSize"] for trial in report["trials"]} == {10, 20}
+    assert report["effectiveBatchSize"] == 20
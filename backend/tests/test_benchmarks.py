@@ -0,0 +1,59 @@
+import filecmp
+import json
+import pandas as pd
+import pytest
+import dataset_cache
+from benchmarks.__main__ import compare, headline
+from benchmarks.fanout import frame_seqs, run_fanout
+from benchmarks.training import make_dataset, run_training
+from metric_frames import MetricBatch
+from schemas import TrainingMetric
+
+def test_synthetic_datasets_are_reproducible(tmp_path):
+    first = make_dataset(str(tmp_path / "a"), rows=100, features=4, classes=3, seed=1)
+    second = make_dataset(str(tmp_path / "b"), rows=100, features=4, classes=3, seed=1)
+    assert filecmp.cmp(first, second, shallow=False)
+    frame = pd.read_csv(first)
+    assert list(frame.columns) == ["f0", "f1", "f2", "f3", "label"]
+    assert set(frame["label"]) <= {"class0", "class1", "class2"}
+    assert not filecmp.cmp(first, make_dataset(str(tmp_path / "a"), rows=100, features=4, classes=3, seed=2),
+                           shallow=False)
+
+def test_frame_seqs_reads_every_encoding():
+    batch = MetricBatch()
+    for seq in (4, 5, 6):
+        batch.append(TrainingMetric(epoch=1, loss=0.5, accuracy=0.5, step=seq, status="Ongoing"), seq)
+    assert frame_seqs(batch.encode("binary")) == [4, 5, 6]
+    assert frame_seqs(batch.encode("json")) == [4, 5, 6]
+    assert frame_seqs(json.dumps({"type": "metrics", "seq": 9, "payload": {}})) == [9]
+    assert frame_seqs(json.dumps({"type": "tip", "seq": 10})) == []
+
+def test_compare_marks_regressions(capsys):
+    def result(steps_per_sec, p99):
+        fanout = {"fast": {"latencyMs": {"p99": p99}}, "slow": {"latencyMs": {"p99": None}, "lossRate": 0.0},
+                  "memory": {"rssPeakBytes": None}}
+        return {"environment": {"commit": "abc123"}, "training": {"models": {"mlp": {"stepsPerSec": steps_per_sec}}},
+                "fanout": fanout}
+    assert headline(result(100.0, 2.0)) == {"training.mlp.stepsPerSec": (100.0, True), "fanout.fast.p99Ms": (2.0, False),
+                                            "fanout.slow.lossRate": (0.0, False)}
+    compare(result(110.0, 3.0), result(100.0, 2.0))
+    lines = capsys.readouterr().out.splitlines()
+    assert "abc123" in lines[1]
+    assert "+10.0%" in lines[2] and "(worse)" not in lines[2]
+    assert "+50.0%" in lines[3] and "(worse)" in lines[3]
+
+def test_fast_clients_get_every_metric():
+    result = run_fanout(clients=4, slow_clients=1, slow_delay_ms=20, rate=200, duration=0.3, max_queue=4)
+    assert result["sent"] > 0
+    assert result["fast"]["minReceivedPerClient"] == result["sent"]
+    assert result["fast"]["droppedFrames"] == 0
+    assert result["slow"]["droppedFrames"] > 0
+
+def test_training_suite_reports_throughput():
+    result = run_training(dataset_cache.UPLOAD_DIR, models=("mlp",), rows=256, features=4, classes=2, epochs=1,
+                          batch_size=32)
+    run = result["models"]["mlp"]
+    assert "error" not in run
+    assert run["steps"] == 8
+    assert run["stepsPerSec"] > 0 and run["samplesPerSec"] == pytest.approx(run["stepsPerSec"] * 32)
+    assert set(run["phasesMs"]) == {"data", "forward", "backward", "optimizer", "emit"}
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+import torch
+from checkpoints import CheckpointWriter, latest_checkpoint, load_checkpoint, read_index, snapshot
+from metric_store import MetricStore
+from scheduler import COMPLETED, JobScheduler
+from trainer import checkpoint_dir, resume_config
+from websocket_manager import WebSocketManager
+
+def write_all(writer: CheckpointWriter, states: list):
+    """Save each state once the previous one is on disk (a busy writer skips to the newest)."""
+    for state in states:
+        writer.save(state)
+        deadline = time.time() + 10
+        while not any(e["step"] == state["step"] for e in read_index(writer.directory)):
+            assert time.time() < deadline, f"step {state['step']} was never written"
+            time.sleep(0.01)
+
+def test_snapshot_copies_state_to_cpu():
+    model = torch.nn.Linear(3, 2)
+    optimizer = torch.optim.Adam(model.parameters())
+    model(torch.randn(4, 3)).sum().backward()
+    optimizer.step()
+    state = snapshot(model, optimizer, step=1, epoch=1)
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    assert not torch.equal(state["model"]["weight"], model.weight)
+    assert state["optimizer"]["state"][0]["exp_avg"].shape == (2, 3)
+    assert state["step"] == 1
+
+def test_retention_keeps_the_newest_and_the_best(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), keep_last=2)
+    losses = [0.9, 0.2, 0.5, 0.6, 0.7]
+    write_all(writer, [{"step": step, "epoch": step, "loss": loss, "weights": torch.full((2,), float(step))}
+                       for step, loss in enumerate(losses, start=1)])
+    writer.close()
+    assert sorted(e["step"] for e in read_index(str(tmp_path))) == [2, 4, 5]
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".pt")) == [
+        "ckpt-00000002.pt", "ckpt-00000004.pt", "ckpt-00000005.pt"]
+    latest = latest_checkpoint(str(tmp_path))
+    assert latest["step"] == 5
+    assert torch.equal(load_checkpoint(str(tmp_path), latest)["weights"], torch.full((2,), 5.0))
+
+def test_a_new_writer_continues_the_index(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), keep_last=3)
+    write_all(writer, [{"step": 1, "epoch": 1}])
+    writer.close()
+    writer = CheckpointWriter(str(tmp_path), keep_last=3)
+    write_all(writer, [{"step": 2, "epoch": 2}])
+    writer.close()
+    assert [e["step"] for e in read_index(str(tmp_path))] == [1, 2]
+
+def test_resumed_runs_continue_from_their_latest_checkpoint(dataset):
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        config = {"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01, "optimizer": "adam",
+                  "modelType": "mlp"}
+        job = scheduler.submit(config)
+        await scheduler.wait(job.run_id)
+        assert job.status == COMPLETED
+        assert latest_checkpoint(checkpoint_dir(job.run_id))["epoch"] == 2
+        resumed = scheduler.submit(resume_config(job.run_id, {**config, "epochs": 4}), run_id=job.run_id)
+        await scheduler.wait(resumed.run_id)
+        assert resumed.status == COMPLETED
+        assert latest_checkpoint(checkpoint_dir(job.run_id))["step"] == 40
+        store = MetricStore(job.run_id)
+        try:
+            # Steps and epochs carry on from the checkpoint instead of starting over
+            steps, epochs = store.query("step"), store.query("epoch")
+            assert [s for s, status in zip(steps["step"], steps["status"]) if status == "Ongoing"] == list(range(1, 41))
+            assert [e for e, status in zip(epochs["epoch"], epochs["status"]) if status == "Ongoing"] == [1, 2, 3, 4]
+        finally:
+            store.close()
+    asyncio.run(scenario())
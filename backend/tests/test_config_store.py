@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from config_store import ConfigError, VersionedConfig, changed_fields, live_changes, validate_config
+
+def test_validate_fills_defaults_and_keeps_unknown_keys():
+    config = validate_config({"learningRate": 0.1, "theme": "dark"})
+    assert config["learningRate"] == 0.1
+    assert config["batchSize"] == 32 and config["optimizer"] == "adam"
+    assert config["theme"] == "dark"
+
+@pytest.mark.parametrize("config", [
+    {"learningRate": 0},
+    {"batchSize": "many"},
+    {"optimizer": "lbfgs"},
+    {"autopilot": {"patiense": 2}},
+])
+def test_validate_rejects(config):
+    with pytest.raises(ConfigError, match="Invalid config"):
+        validate_config(config)
+
+def test_changed_fields():
+    assert changed_fields({"a": 1, "b": 2}, {"a": 1, "b": 3, "c": 4}) == ["b", "c"]
+
+def test_live_changes_only_include_what_changed():
+    current = validate_config({"learningRate": 0.01, "modelType": "mlp"})
+    assert live_changes(current, {"learningRate": 0.001, "modelType": "mlp", "epochs": current["epochs"]}) == {
+        "learningRate": 0.001}
+    with pytest.raises(ConfigError, match="modelType"):
+        live_changes(current, {"modelType": "cnn"})
+    with pytest.raises(ConfigError, match="batchSize"):
+        live_changes(current, {"batchSize": 0})
+
+def test_updates_bump_the_version_only_when_something_changes():
+    async def scenario():
+        config = VersionedConfig({"learningRate": 0.01})
+        values = config.values
+        assert config.version == 1
+        assert await config.update({"learningRate": 0.01}) == 1
+        assert await config.update({"learningRate": 0.02}) == 2
+        # Updated in place, so held references follow
+        assert values["learningRate"] == 0.02
+        with pytest.raises(ConfigError):
+            await config.update({"learningRate": -1})
+        assert config.version == 2 and values["learningRate"] == 0.02
+    asyncio.run(scenario())
+
+def test_expected_version_rejects_stale_updates():
+    async def scenario():
+        config = VersionedConfig({})
+        version = config.version
+        assert await config.update({"epochs": 5}, expected_version=version) == version + 1
+        with pytest.raises(ConfigError, match="changed meanwhile"):
+            await config.update({"epochs": 6}, expected_version=version)
+        assert config.values["epochs"] == 5
+    asyncio.run(scenario())
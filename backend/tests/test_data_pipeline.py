@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+import dataset_cache
+from data_pipeline import CsvBatchStream, ShuffledBatchSampler, open_training_data, scan_csv, set_batch_size
+
+def file_rows(dataset: dict) -> list:
+    frame = pd.read_csv(os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"]))
+    return sorted(map(tuple, frame.iloc[:, :-1].to_numpy(dtype="float32").tolist()))
+
+def epoch_rows(loader) -> tuple:
+    """(sorted feature rows, batch sizes) of one pass over ``loader``."""
+    rows, sizes = [], []
+    for x, y in loader:
+        rows.extend(map(tuple, x.tolist()))
+        sizes.append(len(y))
+    return sorted(rows), sizes
+
+def test_scan_csv_finds_the_label_vocabulary_in_order(dataset):
+    path = os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"])
+    columns, vocabulary, rows = scan_csv(path, chunk_rows=7)
+    assert columns == ["f0", "f1", "f2", "label"] and rows == 200
+    assert vocabulary == list(pd.read_csv(path)["label"].unique())
+
+def test_stream_yields_every_row_once_per_epoch(dataset):
+    path = os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"])
+    stream = CsvBatchStream(path, ["neg", "pos"], batch_size=16, chunk_rows=30, shuffle_buffer=50, seed=1)
+    first, sizes = epoch_rows(stream)
+    assert first == file_rows(dataset)
+    assert sizes[:-1] == [16] * (len(sizes) - 1) and sum(sizes) == 200
+    orders = [[tuple(x[0].tolist()) for x, _ in stream] for _ in range(2)]
+    assert orders[0] != orders[1]  # Reshuffled every epoch
+
+def test_small_csvs_load_into_memory_and_large_ones_stream(dataset):
+    in_memory = open_training_data(dataset, batch_size=32)
+    assert isinstance(in_memory.loader.batch_sampler, ShuffledBatchSampler)
+    assert (in_memory.input_dim, in_memory.num_classes, in_memory.num_rows) == (3, 2, 200)
+    streamed = open_training_data(dataset, batch_size=32, streaming=True)
+    assert isinstance(streamed.loader.dataset, CsvBatchStream)
+    assert epoch_rows(streamed.loader)[0] == epoch_rows(in_memory.loader)[0] == file_rows(dataset)
+
+def test_batch_size_changes_from_the_next_batch(dataset):
+    for streaming in (False, True):
+        loader = open_training_data(dataset, batch_size=10, streaming=streaming, shuffle_buffer=1000).loader
+        batches = iter(loader)
+        assert len(next(batches)[1]) == 10
+        assert set_batch_size(loader, 25)
+        assert len(next(batches)[1]) == 25
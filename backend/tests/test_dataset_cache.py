@@ -0,0 +1,41 @@
+import hashlib
+import io
+import os
+import numpy as np
+import pytest
+import dataset_cache
+
+CSV = b"a,b,label\n1,2,cat\n3,x,dog\n5,6,cat\n7,8,\n9,10,bird\n"
+
+def test_valid_digest():
+    assert dataset_cache.valid_digest(hashlib.sha256(b"").hexdigest())
+    for digest in (None, "", "../../etc", "A" * 64, "0" * 63, "0" * 64 + "/"):
+        assert not dataset_cache.valid_digest(digest)
+    assert dataset_cache.read_meta("../escape") is None
+    with pytest.raises(ValueError):
+        dataset_cache.cache_path("../escape")
+
+def test_upload_is_hashed_while_streamed_and_deduplicated(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CHUNK_SIZE", 7)
+    path, digest, size = dataset_cache.store_upload(io.BytesIO(CSV), "pets.csv", str(tmp_path))
+    assert digest == hashlib.sha256(CSV).hexdigest() and size == len(CSV)
+    with open(path, "rb") as f:
+        assert f.read() == CSV
+    dataset_cache.preprocess_csv(path, digest)
+    # The same bytes under another name reuse the cached upload
+    again, _, _ = dataset_cache.store_upload(io.BytesIO(CSV), "copy.csv", str(tmp_path))
+    assert again == path
+    assert sorted(os.listdir(tmp_path)) == ["pets.csv"]
+
+def test_preprocess_maps_labels_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CSV_CHUNK_ROWS", 2)
+    source = tmp_path / "pets.csv"
+    source.write_bytes(CSV + b"11,12,dog\n")  # Not cached by another test
+    digest = dataset_cache.hash_file(str(source))
+    meta = dataset_cache.preprocess_csv(str(source), digest)
+    assert meta["rows"] == 6 and meta["features"] == 2 and meta["classes"] == ["cat", "dog", "bird"]
+    assert dataset_cache.read_meta(digest) == meta
+    x, y = dataset_cache.open_memmap(meta)
+    # Non-numeric features become 0; a missing label is -1
+    np.testing.assert_array_equal(x, [[1, 2], [3, 0], [5, 6], [7, 8], [9, 10], [11, 12]])
+    np.testing.assert_array_equal(y, [0, 1, 0, -1, 2, 1])
@@ -0,0 +1,76 @@
+import io
+import os
+import time
+import pandas as pd
+import pytest
+import dataset_cache
+import dataset_profile
+from data_pipeline import resolve_dataset_path
+from dataset_profile import DatasetProfiler, estimate_rows
+
+CSV = """size,count,constant,name,label
+1.5,3,7,a,yes
+2.5,,7,b,yes
+,5,7,c,no
+4.0,6,7,d,yes
+"""
+
+def profile_of(text: str, chunk_rows: int) -> dict:
+    profiler = DatasetProfiler()
+    for chunk in pd.read_csv(io.StringIO(text), chunksize=chunk_rows):
+        profiler.update(chunk)
+    return profiler.result()
+
+def test_columns_and_label_histogram():
+    profile = profile_of(CSV, chunk_rows=10)
+    columns = {column["name"]: column for column in profile["columns"]}
+    assert profile["rows"] == 4
+    assert columns["size"] == {"name": "size", "type": "float", "nulls": 1, "nonNumeric": 0,
+                               "min": 1.5, "max": 4.0, "mean": pytest.approx(8 / 3)}
+    assert columns["count"]["type"] == "integer" and columns["count"]["nulls"] == 1
+    assert columns["name"]["type"] == "string" and columns["name"]["nonNumeric"] == 4
+    assert profile["label"] == {"column": "label", "classes": {"yes": 3, "no": 1}, "distinct": 2, "truncated": False}
+    assert "constant: constant (7), adds nothing to training" in profile["warnings"]
+    assert "size: 1 missing values, read as 0 in training" in profile["warnings"]
+    assert "name: 4 non-numeric values, read as 0 in training" in profile["warnings"]
+
+def test_chunking_does_not_change_the_profile():
+    assert profile_of(CSV, chunk_rows=1) == profile_of(CSV, chunk_rows=10)
+
+def test_label_warnings():
+    single = profile_of("x,label\n1,a\n2,a\n3,\n", chunk_rows=10)
+    assert "1 rows have no label" in single["warnings"]
+    assert any("fewer than 2 classes" in warning for warning in single["warnings"])
+    imbalanced = profile_of("x,label\n" + "1,a\n" * 200 + "2,b\n", chunk_rows=50)
+    assert any("classes are imbalanced" in warning for warning in imbalanced["warnings"])
+    assert DatasetProfiler().result()["warnings"] == ["The file has no rows"]
+
+def test_estimate_rows(tmp_path, monkeypatch):
+    path = tmp_path / "rows.csv"
+    path.write_text("a,b\n" + "1,2\n" * 1000)
+    assert estimate_rows(str(path)) == 1000
+    monkeypatch.setattr(dataset_profile, "ESTIMATE_BYTES", 400)
+    assert estimate_rows(str(path)) == pytest.approx(1000, rel=0.05)
+
+@pytest.mark.parametrize("path", ["../../etc/passwd", "/etc/passwd", "../backend/main.py", "sub/../../x.csv"])
+def test_paths_outside_the_dataset_directories_are_rejected(path):
+    with pytest.raises(ValueError, match="outside"):
+        resolve_dataset_path({"path": path})
+
+def test_uploaded_files_resolve_to_the_upload_directory(dataset):
+    assert resolve_dataset_path(dataset) == os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"])
+
+def test_profile_endpoint(client, dataset):
+    assert client.get("/datasets/profile", params={"path": "../../etc/passwd"}).status_code == 400
+    assert client.get("/datasets/profile", params={"path": "missing.csv"}).status_code == 404
+    response = client.get("/datasets/profile", params={"path": dataset["path"]})
+    assert response.status_code == 202 and response.json()["approxRows"] == 200
+    deadline = time.time() + 30
+    while response.status_code == 202:
+        assert time.time() < deadline, "the profile never finished"
+        time.sleep(0.05)
+        response = client.get("/datasets/profile", params={"path": dataset["path"]})
+    assert response.status_code == 200
+    profile = response.json()
+    assert profile["rows"] == 200 and profile["label"]["distinct"] == 2
+    assert profile["sha256"] == dataset_cache.hash_file(os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"]))
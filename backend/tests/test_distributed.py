@@ -0,0 +1,61 @@
+import asyncio
+import os
+import pytest
+import dataset_cache
+from data_pipeline import MemmapBatchStream, ShuffledBatchSampler
+from distributed import DEFAULTS, distributed_options, shuffle_seed, world_size
+from scheduler import COMPLETED, JobScheduler
+from websocket_manager import WebSocketManager
+
+def test_options():
+    assert distributed_options(False) is None
+    assert distributed_options(1) is None
+    assert distributed_options(4) == {**DEFAULTS, "processes": 4}
+    assert world_size(distributed_options({"processes": 2, "nodes": 3, "masterPort": 29500})) == 6
+    assert distributed_options({"processes": 1}) is None
+
+@pytest.mark.parametrize("setting", [
+    {"procs": 2},
+    {"processes": 0},
+    {"nodes": 2, "nodeRank": 2, "masterPort": 29500},
+    {"nodes": 2},
+    "2",
+])
+def test_invalid_options(setting):
+    with pytest.raises(ValueError):
+        distributed_options(setting)
+
+def test_shuffle_seed_is_stable():
+    assert shuffle_seed("run-a") == shuffle_seed("run-a") != shuffle_seed("run-b")
+
+def test_sampler_ranks_split_the_rows():
+    shards = [list(ShuffledBatchSampler(103, 10, seed=5, rank=rank, world_size=3)) for rank in range(3)]
+    rows = [index for shard in shards for batch in shard for index in batch]
+    assert sorted(rows) == list(range(103))
+    assert [len(shard) for shard in shards] == [len(ShuffledBatchSampler(103, 10, rank=r, world_size=3)) for r in range(3)]
+
+@pytest.mark.parametrize("world", [2, 3])
+def test_every_rank_streams_rows_of_a_small_cached_dataset(dataset, world):
+    path = os.path.join(dataset_cache.UPLOAD_DIR, dataset["path"])
+    meta = dataset_cache.preprocess_csv(path, dataset_cache.hash_file(path))
+    # One default block would hold the whole dataset and leave the other ranks without data
+    shards = []
+    for rank in range(world):
+        stream = MemmapBatchStream(meta, batch_size=16, seed=3, rank=rank, world_size=world)
+        shards.append([row for x, _ in stream for row in map(tuple, x.tolist())])
+    assert all(len(shard) >= 200 // world - 1 for shard in shards)
+    assert sorted(row for shard in shards for row in shard) == sorted(
+        tuple(row) for row in MemmapBatchStream(meta, batch_size=200).x.tolist())
+
+def test_data_parallel_run_completes(dataset):
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        steps = []
+        job = scheduler.submit({"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01,
+                                "optimizer": "adam", "modelType": "mlp", "distributed": 2})
+        job.listeners.append(lambda metric: steps.append(metric.step) if metric.step and metric.status == "Ongoing" else None)
+        await scheduler.wait(job.run_id)
+        assert job.status == COMPLETED, job.error
+        # Each rank trains on half the rows: 100 rows in batches of 20 per epoch
+        assert steps == list(range(1, 11))
+    asyncio.run(scenario())
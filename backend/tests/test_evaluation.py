@@ -0,0 +1,67 @@
+import asyncio
+import queue
+import numpy as np
+import pytest
+import torch
+from data_pipeline import holdout_mask, load_holdout, open_training_data
+from evaluation import DEFAULTS, finish, score, submit, validation_options
+from trainer import TrainingWorker, train_model
+from websocket_manager import WebSocketManager
+
+def test_options():
+    assert validation_options(False) is None
+    assert validation_options(True) == DEFAULTS
+    assert validation_options({"split": 0.3})["split"] == 0.3
+    for setting in ({"split": 1.5}, {"every": -1}, {"threads": 0}, {"splt": 0.2}, "yes"):
+        with pytest.raises(ValueError):
+            validation_options(setting)
+
+def test_holdout_mask_is_a_stable_fraction():
+    rows = np.arange(100_000)
+    mask = holdout_mask(rows, 0.2, seed=3)
+    assert mask.mean() == pytest.approx(0.2, abs=0.01)
+    assert np.array_equal(mask, holdout_mask(rows, 0.2, seed=3))
+    assert not np.array_equal(mask, holdout_mask(rows, 0.2, seed=4))
+    # Rows are decided by their index alone, whatever slice they are looked up in
+    assert np.array_equal(mask[500:700], holdout_mask(rows[500:700], 0.2, seed=3))
+
+def test_training_never_sees_held_out_rows(dataset):
+    trained = {tuple(row) for x, _ in open_training_data(dataset, 32, holdout=0.25).loader for row in x.tolist()}
+    held = {tuple(row) for row in load_holdout(dataset, 0.25).x.tolist()}
+    assert held and not trained & held
+    assert len(trained) + len(held) == 200
+
+def test_score_matches_a_direct_computation():
+    torch.manual_seed(0)
+    model = torch.nn.Linear(4, 3)
+    x, y = torch.randn(50, 4), torch.randint(0, 3, (50,))
+    metrics = score(model, lambda inputs: inputs, x, y, num_classes=3, batch_size=7)
+    logits = model(x).detach()
+    predicted = logits.argmax(dim=1)
+    confusion = [[int(((y == t) & (predicted == p)).sum()) for p in range(3)] for t in range(3)]
+    assert metrics["confusion"] == confusion
+    assert metrics["loss"] == pytest.approx(torch.nn.functional.cross_entropy(logits, y).item(), rel=1e-5)
+    assert metrics["accuracy"] == pytest.approx((predicted == y).float().mean().item())
+    for c in range(3):
+        tp = confusion[c][c]
+        fp, fn = sum(row[c] for row in confusion) - tp, sum(confusion[c]) - tp
+        assert metrics["f1"][c] == pytest.approx(2 * tp / max(2 * tp + fp + fn, 1))
+
+def test_finish_always_fits_its_sentinel():
+    requests = queue.Queue(maxsize=1)
+    assert submit(requests, {"step": 1})
+    assert not submit(requests, {"step": 2})
+    finish(requests)
+    assert requests.get_nowait() is None
+
+def test_process_runs_score_their_final_model(dataset):
+    worker = TrainingWorker({"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01,
+                             "optimizer": "adam", "modelType": "mlp", "validation": {"split": 0.2}},
+                            use_process=True)
+    asyncio.run(train_model(WebSocketManager(), worker))
+    assert worker.error is None
+    held = len(load_holdout(dataset, 0.2).y)
+    # The final snapshot outlives the run's process, which exits before the evaluator reads it
+    assert (worker.validation["epoch"], worker.validation["step"]) == (2, 2 * -(-(200 - held) // 20))
+    assert worker.validation["rows"] == held
+    assert sorted(worker.validation["classes"]) == ["neg", "pos"]
@@ -0,0 +1,88 @@
+import asyncio
+import time
+import pytest
+import torch
+import inference
+from inference import InferenceService, LoadedModel
+from scheduler import COMPLETED, JobScheduler
+from websocket_manager import WebSocketManager
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Serve a fixed linear model for every run instead of loading trained weights; returns the load log."""
+    loads = []
+
+    def load_model(run_id):
+        loads.append(run_id)
+        time.sleep(0.05)
+        torch.manual_seed(0)
+        return LoadedModel(run_id, torch.nn.Linear(3, 2), 3, ["neg", "pos"])
+
+    monkeypatch.setattr(inference, "load_model", load_model)
+    return loads
+
+def test_concurrent_requests_share_a_batch(fake_models):
+    async def scenario():
+        service = InferenceService(max_rows=64, max_delay_ms=50)
+        rows = torch.randn(8, 3).tolist()
+        results = await asyncio.gather(*(service.predict("run", [row]) for row in rows))
+        # One load for all the first requests, and one forward pass for all of them
+        assert fake_models == ["run"]
+        assert service.batches == 1 and all(result["batchRows"] == 8 for result in results)
+        torch.manual_seed(0)
+        expected = torch.softmax(torch.nn.Linear(3, 2)(torch.tensor(rows)), dim=1)
+        for result, probabilities in zip(results, expected):
+            assert result["probabilities"][0] == pytest.approx(probabilities.tolist(), abs=1e-6)
+            assert result["labels"] == [["neg", "pos"][result["predictions"][0]]]
+        service.shutdown()
+    asyncio.run(scenario())
+
+def test_batches_close_at_max_rows(fake_models):
+    async def scenario():
+        service = InferenceService(max_rows=4, max_delay_ms=1000)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(service.predict("run", [[0.1, 0.2, 0.3]]) for _ in range(8)))
+        assert time.perf_counter() - started < 1
+        assert sorted(result["batchRows"] for result in results) == [4] * 8
+        assert service.stats()["maxBatchRows"] == 4
+        service.shutdown()
+    asyncio.run(scenario())
+
+def test_least_recently_used_models_are_evicted(fake_models):
+    async def scenario():
+        service = InferenceService(cache_size=2, max_delay_ms=1)
+        for run_id in ("a", "b", "a", "c", "a"):
+            await service.predict(run_id, [0.0, 0.0, 0.0])
+        assert fake_models == ["a", "b", "c"]
+        assert service.stats()["models"] == ["c", "a"] and service.evictions == 1
+        service.invalidate("a")
+        await service.predict("a", [0.0, 0.0, 0.0])
+        assert fake_models == ["a", "b", "c", "a"]
+        service.shutdown()
+    asyncio.run(scenario())
+
+def test_wrong_shapes_are_rejected(fake_models):
+    async def scenario():
+        service = InferenceService()
+        with pytest.raises(ValueError):
+            await service.predict("run", [])
+        with pytest.raises(ValueError, match="3 features"):
+            await service.predict("run", [[1.0, 2.0]])
+        service.shutdown()
+    asyncio.run(scenario())
+
+def test_predicts_with_a_trained_run(dataset):
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        job = scheduler.submit({"dataset": dataset, "epochs": 1, "batchSize": 20, "learningRate": 0.01,
+                                "optimizer": "adam", "modelType": "mlp"})
+        await scheduler.wait(job.run_id)
+        assert job.status == COMPLETED
+        service = InferenceService()
+        result = await service.predict(job.run_id, [[0.1, 0.2, 0.3], [0.9, 0.8, 0.7]])
+        assert len(result["predictions"]) == 2
+        assert all(sum(row) == pytest.approx(1.0) for row in result["probabilities"])
+        with pytest.raises(LookupError):
+            await service.predict("no-such-run", [0.0, 0.0, 0.0])
+        service.shutdown()
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import json
+import math
+import struct
+from metric_frames import BINARY_MAGIC, MetricBatch, dumps
+from schemas import TrainingMetric
+
+def decode_binary(frame: bytes) -> dict:
+    """Read a TMB1 frame back by the layout documented in metric_frames."""
+    assert frame[:4] == BINARY_MAGIC
+    (count,) = struct.unpack_from("<I", frame, 4)
+    offset, columns = 8, {}
+    for name, code, size in (("timestamp", "d", 8), ("seq", "I", 4), ("epoch", "i", 4), ("step", "i", 4),
+                             ("loss", "f", 4), ("accuracy", "f", 4), ("status", "B", 1)):
+        columns[name] = list(struct.unpack_from(f"<{count}{code}", frame, offset))
+        offset += count * size
+    assert offset == len(frame)
+    return columns
+
+def sample_batch() -> MetricBatch:
+    batch = MetricBatch()
+    batch.append(TrainingMetric(epoch=1, loss=0.5, accuracy=0.25, step=7, status="Ongoing", timestamp=100.0), seq=3)
+    batch.append(TrainingMetric(epoch=1, loss=0.75, accuracy=0.5, status="Completed", timestamp=101.5), seq=4)
+    return batch
+
+def test_binary_frame_round_trips():
+    columns = decode_binary(sample_batch().to_binary())
+    assert columns == {
+        "timestamp": [100.0, 101.5],
+        "seq": [3, 4],
+        "epoch": [1, 1],
+        "step": [7, -1],  # -1 marks an epoch summary
+        "loss": [0.5, 0.75],
+        "accuracy": [0.25, 0.5],
+        "status": [2, 3],
+    }
+
+def test_json_frame_matches_the_binary_one():
+    message = json.loads(sample_batch().to_json())
+    assert message["type"] == "metrics_batch" and message["seq"] == 4
+    assert message["payload"]["step"] == [7, None]
+    assert message["payload"]["status"] == ["Ongoing", "Completed"]
+
+def test_non_finite_values_become_null():
+    batch = MetricBatch()
+    batch.append(TrainingMetric(epoch=1, loss=math.nan, accuracy=math.inf, step=1))
+    assert json.loads(batch.to_json())["payload"]["loss"] == [None]
+    assert json.loads(dumps({"loss": -math.inf, "values": [1.0, math.nan]})) == {"loss": None, "values": [1.0, None]}
+    assert math.isnan(decode_binary(batch.to_binary())["loss"][0])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from metric_store import MetricStore, list_runs, lttb_indices
+from schemas import TrainingMetric
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[123] = 10.0
+    y[777] = -10.0
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert indices == sorted(set(indices))
+    assert 123 in indices and 777 in indices
+
+def test_lttb_returns_everything_below_the_threshold():
+    assert lttb_indices(np.arange(5.0), np.zeros(5), 10) == [0, 1, 2, 3, 4]
+    assert lttb_indices(np.arange(5.0), np.zeros(5), 2) == [0, 1, 2, 3, 4]
+
+def test_lttb_ignores_non_finite_losses():
+    y = np.ones(100)
+    y[10], y[20] = np.nan, np.inf
+    assert len(lttb_indices(np.arange(100.0), y, 10)) == 10
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricStore("run-a", root=str(tmp_path))
+    store.append([TrainingMetric(epoch=1 + step // 100, loss=1 / step, accuracy=0.5, step=step, status="Ongoing")
+                  for step in range(1, 301)])
+    store.append([TrainingMetric(epoch=epoch, loss=1 / epoch, accuracy=0.5, status="Ongoing") for epoch in (1, 2, 3)])
+    yield store
+    store.close()
+
+def test_query_ranges_and_downsamples(store):
+    result = store.query("step", start=101, end=200)
+    assert result["step"] == list(range(101, 201)) and result["total"] == 100
+    sampled = store.query("step", points=20)
+    assert len(sampled["step"]) == 20 and sampled["total"] == 300
+    assert sampled["step"][0] == 1 and sampled["step"][-1] == 300
+    assert store.query("epoch")["epoch"] == [1, 2, 3]
+    with pytest.raises(ValueError):
+        store.query("minute")
+
+def test_truncate_drops_what_a_resumed_run_reports_again(store, tmp_path):
+    store.truncate(step=150, epoch=1)
+    assert store.query("step")["step"][-1] == 150
+    assert store.query("epoch")["epoch"] == [1]
+    assert store.count() == 151
+    assert list_runs(str(tmp_path)) == ["run-a"]
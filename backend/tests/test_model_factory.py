@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import pytest
+import torch
+from model_factory import PRETRAINED_MODELS, build_model
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_heavy_libraries_are_not_imported_at_startup():
+    probe = "import sys, main; print('torchvision' in sys.modules, 'transformers' in sys.modules)"
+    env = {**os.environ, "SHARED_STATE": "memory"}
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-2:] == ["False", "False"]
+
+@pytest.mark.parametrize("model_type, input_dim", [("mlp", 5), ("logreg", 5), ("tiny-resnet", 5), ("simple-cnn", 784)])
+def test_tabular_models(model_type, input_dim):
+    model = build_model(model_type, input_dim, 3)
+    inputs = torch.zeros(2, input_dim) if model_type != "simple-cnn" else torch.zeros(2, 1, 28, 28)
+    assert model(inputs).shape == (2, 3)
+
+def test_resnet50_is_built_on_first_use():
+    assert build_model("resnet50", 32 * 32, 4).fc.out_features == 4
+
+@pytest.mark.parametrize("model_type", PRETRAINED_MODELS + ("custom", "nope"))
+def test_unsupported_models_are_rejected(model_type):
+    with pytest.raises(ValueError):
+        build_model(model_type, 5, 2)
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import pytest
+import torch
+from performance import DEFAULTS, describe, performance_options, tune
+from trainer import TrainingWorker, train_model
+from websocket_manager import WebSocketManager
+
+def test_options():
+    assert performance_options(False) is None
+    assert performance_options({"enabled": False}) is None
+    assert performance_options(True) == DEFAULTS
+    assert performance_options({"compile": False})["compile"] is False
+    with pytest.raises(ValueError):
+        performance_options({"compiled": False})
+    with pytest.raises(ValueError):
+        performance_options(4)
+
+def test_settings_are_kept_only_when_faster():
+    model = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.BatchNorm1d(4))
+    running_mean = model[1].running_mean.clone()
+    batch = torch.randn(8, 4) + 3
+
+    def trial(forward_model, bf16, channels_last):
+        forward_model(batch).sum().backward()
+        model.zero_grad()
+        time.sleep(0.001 if bf16 else 0.004)
+
+    options = {**DEFAULTS, "compile": False, "calibrationSteps": 2}
+    forward_model, report = tune(model, "mlp", options, trial)
+    assert forward_model is model
+    assert report["active"] == ["bf16"]
+    assert report["fallbacks"] == {"channelsLast": "only applies to conv models"}
+    assert report["speedup"] > 2
+    # The calibration batches don't leak into BatchNorm's running statistics
+    assert torch.equal(model[1].running_mean, running_mean)
+    assert "bf16 kept" in describe({**report, "threads": 2})
+
+def test_failing_and_slower_settings_fall_back():
+    model = torch.nn.Conv2d(1, 2, 3)
+
+    def trial(forward_model, bf16, channels_last):
+        if bf16:
+            raise RuntimeError("bf16 unsupported here\ndetails")
+        time.sleep(0.004 if channels_last else 0.002)
+
+    options = {**DEFAULTS, "compile": False, "calibrationSteps": 2}
+    _, report = tune(model, "simple-cnn", options, trial)
+    assert report["active"] == []
+    assert report["fallbacks"]["bf16"] == "not supported: bf16 unsupported here"
+    assert report["fallbacks"]["channelsLast"].startswith("no speedup")
+    assert model.weight.is_contiguous()
+
+def test_runs_report_what_they_kept(dataset):
+    # In its own process, so the thread settings don't resize this one's pool
+    worker = TrainingWorker({"dataset": dataset, "epochs": 1, "batchSize": 20, "learningRate": 0.01,
+                             "optimizer": "adam", "modelType": "mlp",
+                             "performance": {"compile": False, "threads": 1, "calibrationSteps": 1}}, use_process=True)
+    asyncio.run(train_model(WebSocketManager(), worker))
+    assert worker.error is None
+    assert worker.performance["threads"] == 1
+    assert set(worker.performance["active"]) <= {"bf16"}
+    assert "channelsLast" in worker.performance["fallbacks"]
@@ -0,0 +1,49 @@
+import asyncio
+from scheduler import COMPLETED, FAILED, QUEUED, RUNNING, STOPPED, JobScheduler
+from websocket_manager import WebSocketManager
+
+def run_config(dataset: dict, **overrides) -> dict:
+    return {"dataset": dataset, "epochs": 1, "batchSize": 20, "learningRate": 0.01, "optimizer": "adam",
+            "modelType": "mlp", **overrides}
+
+def new_scheduler(**kwargs) -> JobScheduler:
+    return JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False, **kwargs)
+
+def test_runs_queue_for_a_free_slot(dataset):
+    async def scenario():
+        scheduler = new_scheduler(max_concurrent=1)
+        first = scheduler.submit(run_config(dataset))
+        second = scheduler.submit(run_config(dataset))
+        third = scheduler.submit(run_config(dataset))
+        assert (first.status, second.status, third.status) == (RUNNING, QUEUED, QUEUED)
+        scheduler.stop(third.run_id)
+        assert third.status == STOPPED and list(scheduler.queue) == [second]
+        await scheduler.wait(first.run_id)
+        assert first.status == COMPLETED and second.status == RUNNING
+        assert scheduler.primary_run_id == second.run_id
+        await scheduler.wait(second.run_id)
+        assert second.status == COMPLETED
+    asyncio.run(scenario())
+
+def test_stopped_and_failed_runs(dataset):
+    async def scenario():
+        scheduler = new_scheduler(max_concurrent=2)
+        stopped = scheduler.submit(run_config(dataset, epochs=1000))
+        failed = scheduler.submit(run_config(dataset, modelType=None))
+        scheduler.stop(stopped.run_id)
+        await asyncio.gather(scheduler.wait(stopped.run_id), scheduler.wait(failed.run_id))
+        assert stopped.status == STOPPED
+        assert failed.status == FAILED and "modelType" in failed.error
+    asyncio.run(scenario())
+
+def test_finished_runs_are_pruned(dataset):
+    async def scenario():
+        scheduler = new_scheduler(max_concurrent=1, keep_finished=1)
+        jobs = [scheduler.submit(run_config(dataset)) for _ in range(3)]
+        for job in jobs:
+            scheduler.stop(job.run_id)
+            await scheduler.wait(job.run_id)
+        scheduler.submit(run_config(dataset))
+        assert jobs[0].run_id not in scheduler.jobs and jobs[2].run_id in scheduler.jobs
+        await scheduler.shutdown()
+    asyncio.run(scenario())
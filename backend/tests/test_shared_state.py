@@ -0,0 +1,142 @@
+import asyncio
+import json
+import multiprocessing
+import time
+import pytest
+from cluster import Cluster
+from config_store import ConfigError, VersionedConfig
+from scheduler import COMPLETED, JobScheduler
+from shared_state import LocalState, MemoryState, open_state
+from websocket_manager import WebSocketManager
+
+@pytest.fixture(params=["memory", "local"])
+def state(request, tmp_path):
+    state = MemoryState() if request.param == "memory" else LocalState(str(tmp_path))
+    yield state
+    asyncio.run(state.close())
+
+def test_values(state):
+    assert state.get("a") is None
+    state.set("job:1", "one")
+    state.set("job:2", "two")
+    state.set("worker:x", "3")
+    assert state.scan("job:") == {"job:1": "one", "job:2": "two"}
+    state.delete("job:1")
+    assert state.get("job:1") is None
+
+def test_compare_and_set(state):
+    assert state.compare_and_set("config", None, "v1")
+    assert not state.compare_and_set("config", None, "v2")
+    assert not state.compare_and_set("config", "v0", "v2")
+    assert state.compare_and_set("config", "v1", "v2")
+    assert state.get("config") == "v2"
+
+def _increment(directory: str, times: int):
+    state = LocalState(directory)
+    for _ in range(times):
+        while True:
+            raw = state.get("counter")
+            if state.compare_and_set("counter", raw, str(int(raw or 0) + 1)):
+                break
+    asyncio.run(state.close())
+
+def test_compare_and_set_is_atomic_across_processes(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_increment, args=(str(tmp_path), 20)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0] * 3
+    state = LocalState(str(tmp_path))
+    assert state.get("counter") == "60"
+    asyncio.run(state.close())
+
+def _run_broker(directory: str, ready, done):
+    async def serve():
+        state = LocalState(directory)
+        await state.subscribe("run:1")
+        ready.set()
+        await asyncio.to_thread(done.wait)
+    asyncio.run(serve())
+
+def test_local_pubsub_reaches_every_worker_and_survives_the_broker_leaving(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    ready, done = context.Event(), context.Event()
+    broker = context.Process(target=_run_broker, args=(str(tmp_path), ready, done))
+    broker.start()
+    assert ready.wait(60)
+
+    async def scenario():
+        first, second = LocalState(str(tmp_path)), LocalState(str(tmp_path))
+        on_first = await first.subscribe("run:1")
+        on_second = await second.subscribe("run:1")
+        await second.publish("run:1", "hello")
+        assert await asyncio.wait_for(on_first.get(), 5) == "hello"
+        assert await asyncio.wait_for(on_second.get(), 5) == "hello"
+        # The worker running the broker exits; one of the others takes over and both resubscribe
+        done.set()
+        await asyncio.to_thread(broker.join, 10)
+        deadline = time.time() + 10
+        while first._server is None and second._server is None or not (first._connected.is_set()
+                                                                         and second._connected.is_set()):
+            assert time.time() < deadline, "no worker took over the broker"
+            await asyncio.sleep(0.05)
+        await first.publish("run:1", "again")
+        assert await asyncio.wait_for(on_first.get(), 5) == "again"
+        assert await asyncio.wait_for(on_second.get(), 5) == "again"
+        await on_second.close()
+        for state in (first, second):
+            await state.close()
+    asyncio.run(scenario())
+
+def test_open_state():
+    assert isinstance(open_state("memory"), MemoryState)
+    with pytest.raises(ValueError):
+        open_state("postgres://db")
+
+def test_config_is_shared_between_workers(tmp_path):
+    async def scenario():
+        state = LocalState(str(tmp_path))
+        first = VersionedConfig({"learningRate": 0.01}, state)
+        second = VersionedConfig({"learningRate": 0.5}, state)
+        # The first worker seeded the config; the second adopts it
+        assert second.values["learningRate"] == 0.01 and second.version == first.version == 1
+        assert await first.update({"epochs": 3}) == 2
+        await second.refresh()
+        assert (second.version, second.values["epochs"]) == (2, 3)
+        with pytest.raises(ConfigError, match="changed meanwhile"):
+            await second.update({"epochs": 4}, expected_version=1)
+        # Updates without an expected version merge into whatever is current
+        assert await second.update({"batchSize": 8}) == 3
+        await first.refresh()
+        assert (first.values["epochs"], first.values["batchSize"]) == (3, 8)
+        await state.close()
+    asyncio.run(scenario())
+
+def test_run_slots_and_threads_are_split_between_server_workers(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 32)
+    single = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager())
+    split = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), server_workers=4)
+    assert (single.max_concurrent, single.threads_per_run) == (8, 4)
+    assert (split.max_concurrent, split.threads_per_run) == (2, 4)
+
+def test_jobs_are_recorded_for_other_workers(tmp_path, dataset):
+    async def scenario():
+        state = LocalState(str(tmp_path))
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        cluster = Cluster(state, scheduler, WebSocketManager(), lambda run_id: WebSocketManager())
+        await cluster.start()
+        # A record left by a worker that is gone is dropped on start, as it would be after a restart
+        state.set("job:stale", json.dumps({"runId": "stale", "status": "running", "worker": "gone-1",
+                                           "submittedAt": 0}))
+        assert (await cluster.job("stale"))["status"] == "failed"
+        job = scheduler.submit({"dataset": dataset, "epochs": 1, "batchSize": 20, "learningRate": 0.01,
+                                "optimizer": "adam", "modelType": "mlp"})
+        await scheduler.wait(job.run_id)
+        deadline = time.time() + 5
+        while json.loads(state.get(f"job:{job.run_id}") or "{}").get("status") != COMPLETED:
+            assert time.time() < deadline, "the finished run was never recorded"
+            await asyncio.sleep(0.05)
+        await cluster.close()
+    asyncio.run(scenario())
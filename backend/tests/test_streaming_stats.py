@@ -0,0 +1,80 @@
+import math
+import random
+import statistics
+import pytest
+from streaming_stats import MetricMonitor, RollingWindow
+
+def _slope(values):
+    n = len(values)
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    return sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values)) / sum((i - mean_x) ** 2 for i in range(n))
+
+def test_window_matches_a_full_recomputation():
+    rng = random.Random(0)
+    window = RollingWindow(7)
+    seen = []
+    for _ in range(100):
+        value = rng.uniform(-5, 5)
+        window.push(value)
+        seen.append(value)
+        expected = seen[-7:]
+        assert window.ordered() == expected
+        assert window.min == min(expected)
+        assert window.max == max(expected)
+        assert window.mean == pytest.approx(statistics.fmean(expected))
+        if len(expected) > 1:
+            assert window.variance == pytest.approx(statistics.variance(expected))
+            assert window.slope == pytest.approx(_slope(expected))
+
+def test_slope_of_a_line():
+    window = RollingWindow(10)
+    for i in range(25):
+        window.push(3.0 - 0.5 * i)
+    assert window.full
+    assert window.slope == pytest.approx(-0.5)
+    assert window.variance == pytest.approx(statistics.variance([3.0 - 0.5 * i for i in range(15, 25)]))
+
+def test_min_max_expire_with_the_window():
+    window = RollingWindow(3)
+    for value in (9, 1, 5, 4, 6):
+        window.push(value)
+    assert (window.min, window.max) == (4, 6)
+
+def test_empty_and_short_windows():
+    window = RollingWindow(4)
+    assert (window.min, window.max, window.mean, window.variance, window.slope) == (None, None, 0.0, 0.0, 0.0)
+    assert window.last() is None
+    window.push(2.0)
+    assert (window.variance, window.slope, window.last()) == (0.0, 0.0, 2.0)
+    with pytest.raises(ValueError):
+        RollingWindow(1)
+
+def test_monitor_detects_a_plateau():
+    monitor = MetricMonitor(window=20)
+    for i in range(30):
+        monitor.update(0.5 + 1.0 / (1 + i))
+    assert not monitor.plateaued
+    for _ in range(20):
+        monitor.update(0.5)
+    assert monitor.plateaued
+    assert not monitor.diverging
+
+def test_monitor_detects_divergence_and_explosions():
+    monitor = MetricMonitor(window=10)
+    for i in range(20):
+        monitor.update(1.0 - 0.04 * i)
+    for i in range(10):
+        monitor.update(0.3 * 1.3 ** i)
+    assert monitor.diverging
+    monitor.update(1000.0)
+    assert monitor.last_exploded
+
+def test_monitor_keeps_non_finite_losses_out_of_the_windows():
+    monitor = MetricMonitor(window=5)
+    monitor.update(1.0, 0.5)
+    monitor.update(math.nan, 0.9)
+    assert monitor.last_non_finite
+    assert monitor.non_finite == 1
+    assert monitor.loss.ordered() == [1.0]
+    assert monitor.accuracy.ordered() == [0.5]
+    assert monitor.summary()["nonFinite"] == 1
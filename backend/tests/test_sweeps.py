@@ -0,0 +1,72 @@
+import asyncio
+import math
+import pytest
+import dataset_cache
+from scheduler import JobScheduler
+from sweeps import RungPruner, Sweep, generate_trials, validate_space
+from websocket_manager import WebSocketManager
+
+def test_grid_is_the_full_product():
+    trials = generate_trials({"optimizer": {"values": ["adam", "sgd"]}, "batchSize": {"values": [16, 32, 64]}}, "grid", 1)
+    assert len(trials) == 6
+    assert {(t["optimizer"], t["batchSize"]) for t in trials} == {(o, b) for o in ("adam", "sgd") for b in (16, 32, 64)}
+
+def test_random_samples_stay_in_range_and_are_seeded():
+    space = {"learningRate": {"min": 1e-4, "max": 1e-1, "log": True}, "epochs": {"min": 1, "max": 5}}
+    trials = generate_trials(space, "random", 50, seed=7)
+    assert trials == generate_trials(space, "random", 50, seed=7)
+    assert all(1e-4 <= t["learningRate"] <= 1e-1 for t in trials)
+    assert all(isinstance(t["epochs"], int) and 1 <= t["epochs"] <= 5 for t in trials)
+    # Log sampling puts about as many trials in each decade
+    assert sum(t["learningRate"] < 1e-2 for t in trials) > 20
+
+@pytest.mark.parametrize("space, strategy", [
+    ({}, "random"),
+    ({"modelType": {"values": ["mlp"]}}, "random"),
+    ({"learningRate": {"min": 0.1, "max": 0.01}}, "random"),
+    ({"learningRate": {"min": 0, "max": 0.1, "log": True}}, "random"),
+    ({"learningRate": {"min": 0.01, "max": 0.1}}, "grid"),
+    ({"learningRate": {"values": [0.1]}}, "bayes"),
+])
+def test_invalid_spaces(space, strategy):
+    with pytest.raises(ValueError):
+        validate_space(space, strategy)
+
+def test_rungs_grow_by_eta():
+    pruner = RungPruner(min_epochs=2, eta=3)
+    assert [epoch for epoch in range(1, 20) if pruner.is_rung(epoch)] == [2, 6, 18]
+
+def test_only_the_best_third_continues_past_a_rung():
+    pruner = RungPruner(min_epochs=1, eta=3)
+    # Decisions wait for eta results at the rung
+    assert not pruner.should_prune(1, 0.9)
+    assert not pruner.should_prune(1, 0.8)
+    assert pruner.should_prune(1, 0.85)
+    assert not pruner.should_prune(1, 0.1)
+    assert not pruner.should_prune(2, 5.0)  # Not a rung
+    assert pruner.should_prune(3, math.nan)
+
+def test_a_sweep_runs_every_trial_on_one_cached_dataset(dataset):
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), max_concurrent=2,
+                                 use_processes=False)
+        base = {"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01, "optimizer": "adam",
+                "modelType": "mlp"}
+        sweep = Sweep(scheduler, base, {"optimizer": {"values": ["adam", "sgd"]}}, strategy="grid")
+        await sweep.launch()
+        assert dataset_cache.read_meta(sweep.base_config["dataset"]["sha256"])["rows"] == 200
+        for trial in sweep.trials:
+            await scheduler.wait(trial.run_id)
+        summary = sweep.to_dict()
+        assert summary["finished"] and summary["error"] is None
+        assert [trial["status"] for trial in summary["trials"]] == ["completed", "completed"]
+        assert summary["best"]["loss"] == min(trial["loss"] for trial in summary["trials"])
+    asyncio.run(scenario())
+
+def test_a_sweep_that_cannot_start_records_why():
+    async def scenario():
+        scheduler = JobScheduler(WebSocketManager(), lambda run_id: WebSocketManager(), use_processes=False)
+        sweep = Sweep(scheduler, {"dataset": {"path": "missing.csv"}}, {"epochs": {"values": [1]}}, strategy="grid")
+        await sweep.launch()
+        assert sweep.error and sweep.to_dict()["trials"][0]["status"] == "failed"
+    asyncio.run(scenario())
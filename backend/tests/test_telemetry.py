@@ -0,0 +1,74 @@
+import time
+from telemetry import STEP_PHASES, Counter, Gauge, Histogram, Registry, SampledLog, StepProfiler
+from trainer import ProfileSample, TrainingWorker, WorkerExit
+
+def test_counter_and_gauge_rendering():
+    registry = Registry()
+    sent = registry.register(Counter("frames_total", "Frames", ("kind",)))
+    sent.inc(kind="metrics")
+    sent.inc(2, kind="metrics")
+    sent.inc(kind="tip")
+    registry.register(Gauge("clients", "Clients", lambda: {(): 3}))
+    assert registry.render().splitlines() == [
+        "# HELP frames_total Frames",
+        "# TYPE frames_total counter",
+        'frames_total{kind="metrics"} 3',
+        'frames_total{kind="tip"} 1',
+        "# HELP clients Clients",
+        "# TYPE clients gauge",
+        "clients 3",
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        latency.observe(value)
+    latency.merge([1, 0, 2], 20.0)
+    assert latency._samples() == [
+        'latency_seconds_bucket{le="0.1"} 3',
+        'latency_seconds_bucket{le="1"} 4',
+        'latency_seconds_bucket{le="+Inf"} 7',
+        "latency_seconds_sum 25.65",
+        "latency_seconds_count 7",
+    ]
+
+def test_profiler_attributes_time_to_phases():
+    profiler = StepProfiler(buckets=(0.001, 1.0))
+    assert profiler.drain() is None
+    for _ in range(3):
+        profiler.restart()
+        time.sleep(0.002)
+        profiler.lap("data")
+        profiler.lap("forward")
+        profiler.lap("backward")
+        profiler.lap("optimizer")
+        profiler.end_step()
+    sample = profiler.drain()
+    assert sample["steps"] == 3
+    counts, total = sample["phases"]["data"]
+    assert counts == [0, 3, 0] and total >= 0.006
+    assert all(sum(sample["phases"][phase][0]) == 3 for phase in STEP_PHASES)
+    assert profiler.drain() is None
+
+def test_sampled_log_counts_what_it_suppresses(capsys):
+    log = SampledLog(interval=60)
+    for i in range(4):
+        log("step", f"step {i}")
+    log("epoch", "epoch 1")
+    log.interval = 0
+    log("step", "step 4")
+    assert capsys.readouterr().out.splitlines() == ["step 0", "epoch 1", "step 4 (+3 similar)"]
+
+def test_runs_ship_profile_samples(dataset):
+    worker = TrainingWorker({"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01,
+                             "optimizer": "adam", "modelType": "mlp", "profileEvery": 0})
+    worker.start()
+    samples = []
+    while True:
+        event = worker.events.get(timeout=60)
+        if isinstance(event, ProfileSample):
+            samples.append(event)
+        if isinstance(event, WorkerExit):
+            break
+    assert sum(sample.steps for sample in samples) == 20
+    assert set(samples[0].phases) == set(STEP_PHASES)
@@ -0,0 +1,45 @@
+import queue
+from schemas import TrainingMetric
+from trainer import TrainingWorker, WorkerExit, missing_config_keys
+
+def run_config(dataset: dict, **overrides) -> dict:
+    return {"dataset": dataset, "epochs": 2, "batchSize": 20, "learningRate": 0.01, "optimizer": "adam",
+            "modelType": "mlp", **overrides}
+
+def drain(worker: TrainingWorker, timeout: float = 60.0) -> list:
+    """Every event the worker puts on its queue, up to and including its WorkerExit."""
+    events = []
+    while not events or not isinstance(events[-1], WorkerExit):
+        try:
+            events.append(worker.events.get(timeout=timeout))
+        except queue.Empty:
+            raise AssertionError(f"worker sent no WorkerExit; got {events}") from None
+    return events
+
+def test_missing_config_keys():
+    assert missing_config_keys({"epochs": 1, "batchSize": 1, "learningRate": 0.1, "optimizer": "adam",
+                                "modelType": "mlp", "dataset": {"path": "a.csv"}}) == []
+    missing = missing_config_keys({"modelType": "custom", "modelName": None, "dataset": {}})
+    assert [entry.split()[0] for entry in missing] == ["dataset", "epochs", "batchSize", "learningRate", "optimizer",
+                                                       "modelName"]
+
+def test_worker_streams_every_step_and_completes(dataset):
+    worker = TrainingWorker(run_config(dataset))
+    worker.start()
+    events = drain(worker)
+    assert events[-1] == WorkerExit(None, 0)
+    metrics = [event for event in events if isinstance(event, TrainingMetric)]
+    # 200 rows in batches of 20: ten steps an epoch, each reported as it happens
+    assert [m.step for m in metrics if m.step is not None and m.status == "Ongoing"] == list(range(1, 21))
+    assert [m.epoch for m in metrics if m.step is None and m.status == "Ongoing"] == [1, 2]
+    assert metrics[-1].status == "Completed"
+
+def test_stop_is_cooperative(dataset):
+    worker = TrainingWorker(run_config(dataset, epochs=100))
+    worker.stop()
+    worker.start()
+    events = drain(worker)
+    assert events[-1] == WorkerExit(None, 0)
+    metrics = [event for event in events if isinstance(event, TrainingMetric)]
+    assert metrics[-1].status == "Idle"
+    assert not any(m.step for m in metrics)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from schemas import TrainingMetric
+from websocket_manager import ClientConnection, WebSocketManager
+
+class FakeSocket:
+    """Records what the manager sends; ``gate`` holds every send until it is set."""
+
+    def __init__(self, gate: asyncio.Event = None):
+        self.sent = []
+        self.gate = gate
+        self.client = "fake"
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append(json.loads(frame))
+
+    async def send_bytes(self, frame: bytes):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append(frame)
+
+    async def close(self):
+        pass
+
+def kinds(client: ClientConnection) -> list:
+    return [entry[0] for entry in client.pending]
+
+def test_drop_oldest_keeps_the_queue_bounded_and_the_handshake():
+    client = ClientConnection(FakeSocket(), max_queue=3, overflow="drop_oldest")
+    client.enqueue("hello", "h")
+    for i in range(5):
+        assert client.enqueue("metrics", f"m{i}")
+    assert [entry[1] for entry in client.pending] == ["h", "m3", "m4"]
+    assert client.dropped == 3
+
+def test_coalesce_keeps_only_the_newest_metrics():
+    client = ClientConnection(FakeSocket(), max_queue=3, overflow="coalesce")
+    client.enqueue("metrics", "m0")
+    client.enqueue("tip", "t")
+    client.enqueue("metrics", "m1")
+    client.enqueue("metrics", "m2")
+    assert [entry[1] for entry in client.pending] == ["t", "m2"]
+
+def test_disconnect_policy_rejects_a_full_queue():
+    client = ClientConnection(FakeSocket(), max_queue=1, overflow="disconnect")
+    assert client.enqueue("tip", "a")
+    assert not client.enqueue("tip", "b")
+
+def test_a_slow_client_does_not_hold_back_the_others():
+    async def scenario():
+        manager = WebSocketManager(max_queue=4)
+        fast, slow = FakeSocket(), FakeSocket(gate=asyncio.Event())
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(10):
+            await manager.broadcast({"type": "tip", "payload": i})
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        slow_client = manager.clients[slow]
+        assert [frame["payload"] for frame in fast.sent if frame["type"] == "tip"] == list(range(10))
+        assert len(slow_client.pending) <= 4 and slow_client.dropped > 0
+        for websocket in (fast, slow):
+            await manager.disconnect(websocket)
+    asyncio.run(scenario())
+
+def metric(step: int) -> TrainingMetric:
+    return TrainingMetric(epoch=1, loss=1.0, accuracy=0.5, step=step, status="Ongoing")
+
+def resync(manager: WebSocketManager, **kwargs) -> list:
+    """Frames a client connecting with ``kwargs`` receives."""
+    async def scenario():
+        websocket = FakeSocket()
+        await manager.connect(websocket, **kwargs)
+        await asyncio.sleep(0.01)
+        await manager.disconnect(websocket)
+        return websocket.sent
+    return asyncio.run(scenario())
+
+def filled_manager(ring_size: int = 4096) -> WebSocketManager:
+    manager = WebSocketManager(ring_size=ring_size)
+    async def history():
+        for step in range(1, 6):
+            await manager.send_metric(metric(step))
+        await manager.send_agent_tip("halfway")
+    asyncio.run(history())
+    return manager
+
+def test_reconnect_replays_what_the_ring_holds():
+    manager = filled_manager()
+    frames = resync(manager, since=3, session=manager.session)
+    assert frames[0] == {"type": "hello", "session": manager.session, "seq": 6}
+    assert frames[1]["type"] == "metrics_batch"
+    assert frames[1]["payload"]["seq"] == [4, 5] and frames[1]["payload"]["step"] == [4, 5]
+    assert frames[2]["type"] == "tip" and frames[2]["seq"] == 6
+    assert resync(manager, since=6, session=manager.session) == [frames[0]]
+
+def test_a_gap_older_than_the_ring_gets_a_snapshot():
+    manager = filled_manager(ring_size=2)
+    manager.snapshot_provider = lambda: {"step": [1, 5]}
+    frames = resync(manager, since=1, session=manager.session)
+    assert frames[1] == {"type": "snapshot", "seq": 6, "payload": {"step": [1, 5]}}
+    # Another server session's sequence numbers mean nothing here
+    assert resync(manager, since=100, session="other")[1]["type"] == "snapshot"
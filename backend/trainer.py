@@ -1,28 +1,60 @@
 import asyncio
-import random
+import copy
+import functools
+import io
+import itertools
+import math
+import multiprocessing
 import os
+import queue
 import sys
-from typing import List
-import pandas as pd  # Example: for CSV dataset loading
+import threading
+import time
+import uuid
+from typing import List, NamedTuple, Optional
+from autopilot import ABORT, EARLY_STOP, REDUCE_LR, Autopilot, autopilot_options
+from autotune import autotune_options, tune_loader, uses_workers
+from autotune import describe as describe_autotune
+from checkpoints import CheckpointWriter, latest_checkpoint, load_checkpoint, read_index, snapshot
+from config_store import live_changes
+from data_pipeline import configure_loader, open_training_data, preprocess_for_ranks, set_batch_size
+from distributed import ProcessGroup, distributed_options, free_port, shuffle_seed, world_size
+from evaluation import ValidationResult, finish, run_evaluator, submit, validation_options
+from metric_store import RUNS_DIR, MetricStore
+from performance import autocast, configure_threads, describe, performance_options, tune
+from streaming_stats import MetricMonitor, RollingWindow
+from telemetry import StepProfiler, counter, histogram, log_sampled
 from schemas import TrainingMetric
 from websocket_manager import WebSocketManager
-import main
-from torchvision.models import resnet50
-from transformers import BertForSequenceClassification, GPT2LMHeadModel, ViTForImageClassification
+from model_factory import build_model
 import torch
 import torch.nn as nn
 import torch.optim as optim
 sys.path.append(os.path.abspath('..'))
 
 class TrainingAgent:
-    def __init__(self):
-        self.metric_history: List[TrainingMetric] = []
+    """Rule-based tips from a run's metrics.
+
+    Epoch summaries drive the training-progress rules; every step feeds the
+    NaN/explosion/divergence guards. All state lives in fixed-size windows, so
+    each update is O(1) no matter how long the run is.
+    """
+
+    def __init__(self, epoch_window: int = 20, step_window: int = 200):
+        self.epochs = MetricMonitor(window=epoch_window)
+        self.steps = MetricMonitor(window=step_window)
+        self.recent_accuracy = RollingWindow(5)
         self.last_action: str = ""
+        # Step guards fire once per incident instead of on every step
+        self._alerted = set()
 
     def observe(self, metric: TrainingMetric, epoch: int):
-        self.metric_history.append(metric)
-        if len(self.metric_history) > 20:
-            self.metric_history.pop(0)  # Keep history manageable
+        if metric.step is not None:
+            self.steps.update(metric.loss, metric.accuracy)
+        else:
+            self.epochs.update(metric.loss, metric.accuracy)
+            if math.isfinite(metric.accuracy):
+                self.recent_accuracy.push(metric.accuracy)
 
     @staticmethod
     def severity_label(score: float) -> str:
@@ -33,202 +65,837 @@ class TrainingAgent:
         else:
             return "critical"
 
-    def process_metric(self, metric: TrainingMetric) -> dict:
+    def _tip(self, content: str, severity: str) -> dict:
+        self.last_action = content  # Save most recent action
+        return {
+            "type": "tip",
+            "severity": severity,
+            "content": content,
+            "id": str(int(time.time() * 1000)),
+            "message": content,
+            "timestamp": str(time.time()),
+        }
+
+    def _step_alert(self, key: str, active: bool) -> bool:
+        """True the first time ``key`` becomes active; re-arms once it clears."""
+        if not active:
+            self._alerted.discard(key)
+            return False
+        if key in self._alerted:
+            return False
+        self._alerted.add(key)
+        return True
+
+    def process_step(self, metric: TrainingMetric) -> Optional[dict]:
+        steps = self.steps
+        if self._step_alert("nan", steps.last_non_finite):
+            return self._tip(f"Loss became {metric.loss} at step {metric.step}. Lower the learning rate or check the data for bad values.", "critical")
+        if self._step_alert("explosion", steps.last_exploded):
+            return self._tip(f"Loss spiked to {metric.loss:.4g} at step {metric.step}. Gradients may be exploding; consider a lower learning rate.", "critical")
+        if self._step_alert("diverging", steps.diverging):
+            return self._tip("Loss is diverging from its best level. Consider reducing the learning rate.", "warning")
+        return None
+
+    def process_metric(self, metric: TrainingMetric) -> Optional[dict]:
+        if metric.step is not None:
+            return self.process_step(metric)
         tips = []
         severity = "info"
-
-        # Retrieve recent metric history if available
-        history = self.metric_history
+        losses = self.epochs.loss
 
         # 1. Loss increasing trend (check last 3 losses)
-        if len(history) >= 4:
-            recent_losses = [m.loss for m in history[-4:]]
-            if recent_losses[-1] > recent_losses[-2] > recent_losses[-3]:
-                tips.append("Loss has been consistently increasing. Consider reducing the learning rate.")
-                severity = "warning"
+        if len(losses) >= 4 and losses.last(0) > losses.last(1) > losses.last(2):
+            tips.append("Loss has been consistently increasing. Consider reducing the learning rate.")
+            severity = "warning"
 
         # 2. Accuracy stagnation (check last 5 epochs)
-        if len(history) >= 5:
-            recent_accuracies = [m.accuracy for m in history[-5:]]
-            if max(recent_accuracies) - min(recent_accuracies) < 0.1:
-                tips.append("Accuracy has stagnated. Try changing optimizer or model capacity.")
-                severity = "info"
+        if self.recent_accuracy.full and self.recent_accuracy.max - self.recent_accuracy.min < 0.1:
+            tips.append("Accuracy has stagnated. Try changing optimizer or model capacity.")
+            severity = "info"
+
+        # 3. Loss plateau over the whole epoch window
+        if self.epochs.plateaued:
+            tips.append("Loss has plateaued. Try lowering the learning rate or stopping early.")
+            severity = "info"
 
-        # 3. Poor performance despite multiple epochs
+        # 4. Poor performance despite multiple epochs
         if metric.epoch > 10 and metric.accuracy < 0.8:
             tips.append("Model is underperforming. You may need better features or more training data.")
             severity = "critical"
 
-        # 4. Recovery suggestion after loss drop
-        if len(history) >= 3:
-            prev_losses = [m.loss for m in history[-3:]]
-            if prev_losses[-1] < prev_losses[-2] < prev_losses[-3]:
-                tips.append("Loss is decreasing steadily. Keep current settings consistent.")
-                severity = "info"
+        # 5. Recovery suggestion after loss drop
+        if len(losses) >= 3 and losses.last(0) < losses.last(1) < losses.last(2):
+            tips.append("Loss is decreasing steadily. Keep current settings consistent.")
+            severity = "info"
+
+        # 6. Divergence or non-finite loss outranks everything else
+        if self.epochs.last_non_finite or self.epochs.diverging:
+            tips.append("Loss is diverging. Reduce the learning rate or restart from an earlier checkpoint.")
+            severity = "critical"
 
         if tips:
-            self.last_action = tips[-1]  # Save most recent action
-            import time
-            return {
-                "type": "tip",
-                "severity": severity,
-                "content": tips[-1],
-                "id": str(int(time.time() * 1000)),
-                "message": tips[-1],
-                "timestamp": str(time.time()),
-            }
+            return self._tip(tips[-1], severity)
 
         return None
 
-# Initialize and attach a persistent instance
-TrainingAgent.instance = TrainingAgent()
-
-# Example model architectures
-class SimpleMLP(nn.Module):
-    def __init__(self, input_dim, output_dim):
-        super().__init__()
-        self.net = nn.Sequential(
-            nn.Linear(input_dim, 64),
-            nn.ReLU(),
-            nn.Linear(64, output_dim)
-        )
-    def forward(self, x):
-        return self.net(x)
-
-class SimpleCNN(nn.Module):
-    def __init__(self, input_channels, num_classes):
-        super().__init__()
-        self.conv = nn.Sequential(
-            nn.Conv2d(input_channels, 8, 3, 1),
-            nn.ReLU(),
-            nn.Flatten()
-        )
-        self.fc = nn.Linear(8*26*26, num_classes)  # assuming 28x28 input
-    def forward(self, x):
-        x = self.conv(x)
-        return self.fc(x)
-
-class LogisticRegression(nn.Module):
-    def __init__(self, input_dim, output_dim):
-        super().__init__()
-        self.linear = nn.Linear(input_dim, output_dim)
-    def forward(self, x):
-        return self.linear(x)
-
-class TinyResNet(nn.Module):
-    def __init__(self, input_dim, output_dim):
-        super().__init__()
-        self.fc1 = nn.Linear(input_dim, 32)
-        self.fc2 = nn.Linear(32, output_dim)
-    def forward(self, x):
-        out = torch.relu(self.fc1(x))
-        out = self.fc2(out) + self.fc1(x)  # simple residual
-        return out
-
-async def train_model(ws_manager: WebSocketManager):
-    """Train a model using the dataset path from config and send metrics to WebSocket clients."""
-    print("Starting training...")
-    config = getattr(main, 'CONFIG', {})
-    # List all required config keys
-    required_keys = [
-        ('dataset', 'object with a path field'),
-        ('epochs', 'int'),
-        ('batchSize', 'int'),
-        ('learningRate', 'float'),
-        ('optimizer', 'str'),
-        ('modelType', 'str'),  # modelType is now required
-    ]
+# Model types that can be trained directly on the rows of a tabular CSV.
+# Conv models expect square, single-channel images flattened into the feature columns.
+TABULAR_MODEL_TYPES = ("mlp", "logreg", "tiny-resnet", "simple-cnn", "resnet50")
+IMAGE_MODEL_TYPES = ("simple-cnn", "resnet50")
+
+REQUIRED_CONFIG_KEYS = [
+    ('dataset', 'object with a path field'),
+    ('epochs', 'int'),
+    ('batchSize', 'int'),
+    ('learningRate', 'float'),
+    ('optimizer', 'str'),
+    ('modelType', 'str'),  # modelType is now required
+]
+
+def missing_config_keys(config: dict) -> List[str]:
+    """Return a description of every required config value that is missing."""
     missing = []
-    for key, desc in required_keys:
-        if key not in config or (key == 'dataset' and (not config['dataset'] or not config['dataset'].get('path'))):
+    for key, desc in REQUIRED_CONFIG_KEYS:
+        if config.get(key) is None or (key == 'dataset' and (not config['dataset'] or not config['dataset'].get('path'))):
             missing.append(f"{key} ({desc})")
     # If modelType is 'custom', require modelName
     if config.get('modelType') == 'custom' and not config.get('modelName'):
         missing.append('modelName (str, required if modelType is "custom")')
-    if missing:
-        print(f"ERROR: Missing required config values: {', '.join(missing)}. Please update /config to include these.")
-        return
-    dataset_filename = config['dataset']['path']
-    dataset_path = os.path.normpath(os.path.join("../", dataset_filename))
-    print(f"Loading dataset from: {dataset_path}")
-    # Example: Load CSV dataset (customize for your data type)
+    return missing
+
+def check_input_shape(model_type: str, input_dim: int):
+    """Reject feature counts a model cannot consume before any work is done."""
+    if model_type not in TABULAR_MODEL_TYPES and model_type != 'custom':
+        raise ValueError(
+            f"modelType '{model_type}' needs tokenized text or image inputs; "
+            f"CSV datasets can be trained with: {', '.join(TABULAR_MODEL_TYPES)}"
+        )
+    if model_type == 'simple-cnn' and input_dim != 28 * 28:
+        raise ValueError(f"simple-cnn expects 784 pixel columns (28x28), got {input_dim}")
+    if model_type in IMAGE_MODEL_TYPES and math.isqrt(input_dim) ** 2 != input_dim:
+        raise ValueError(f"{model_type} expects square images flattened into columns, got {input_dim} features")
+
+def prepare_inputs(model_type: str, x: torch.Tensor, channels_last: bool = False) -> torch.Tensor:
+    """Reshape a batch of flat feature rows into the layout the model expects."""
+    if model_type in IMAGE_MODEL_TYPES:
+        side = math.isqrt(x.shape[1])
+        x = x.view(-1, 1, side, side)
+        if model_type == 'resnet50':
+            x = x.expand(-1, 3, -1, -1)
+        if channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+    return x
+
+def build_optimizer(name: str, params, learning_rate: float) -> optim.Optimizer:
+    optimizers = {
+        "adam": optim.Adam,
+        "sgd": optim.SGD,
+        "rmsprop": optim.RMSprop,
+        "adagrad": optim.Adagrad,
+    }
+    key = (name or "adam").lower()
+    if key not in optimizers:
+        raise ValueError(f"Unknown optimizer: {name}")
+    return optimizers[key](params, lr=learning_rate)
+
+def new_run_id() -> str:
+    """Sortable, unique ID for a training run, e.g. 20250101-120000-1a2b3c."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+MODEL_FILE = "model.pt"  # Final weights in the run directory; the export stage starts from it
+
+def save_model(model: nn.Module, run_dir: str, model_info: dict):
+    """Save the trained weights, with what's needed to rebuild the model, into the run directory."""
+    path = os.path.join(run_dir, MODEL_FILE)
     try:
-        data = pd.read_csv(dataset_path)
+        os.makedirs(run_dir, exist_ok=True)
+        torch.save({"model": model.state_dict(), "modelInfo": model_info}, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        print(f"Model saved to: {path}")
     except Exception as e:
-        print(f"Failed to load dataset: {e}")
-        return
-    epochs = int(config.get('epochs', 10))
-    batch_size = int(config.get('batchSize', 32))
-    learning_rate = float(config.get('learningRate', 0.001))
-    optimizer = config.get('optimizer', 'adam')
-    model_type = config.get('modelType')
-    model_name = config.get('modelName', None)
-    print(f"Model type: {model_type}")
-    if model_type == 'custom':
-        print(f"Custom model name: {model_name}")
-    # Model selection logic matching dropdown
-    input_dim = data.shape[1] - 1  # last column is label
-    output_dim = len(set(data.iloc[:, -1]))
-    if model_type == 'resnet50':
-        model = resnet50(num_classes=output_dim)
-    elif model_type == 'bert-base-uncased':
-        model = BertForSequenceClassification.from_pretrained('bert-base-uncased', num_labels=output_dim)
-    elif model_type == 'gpt2':
-        model = GPT2LMHeadModel.from_pretrained('gpt2')
-    elif model_type == 'vit-base':
-        model = ViTForImageClassification.from_pretrained('google/vit-base-patch16-224', num_labels=output_dim)
-    elif model_type == 'custom':
-        # === USER CUSTOM MODEL CODE GOES HERE ===
-        print("""
-[Custom Model Selected]
-To add your custom model logic, edit the following block in backend/trainer.py:
-
-    elif model_type == 'custom':
-        # Example:
-        # from my_custom_models import MyCustomModel
-        # model = MyCustomModel(input_dim, output_dim, ...)
-        # Optionally, use model_name for experiment tracking or logic:
-        # if model_name == 'model-11':
-        #     ... # your custom logic here
-
-Your provided model name: '{}'
-""".format(model_name))
-        return
-    else:
-        print(f"Unknown modelType: {model_type}. Aborting training.")
+        print(f"Failed to save model: {e}")
+
+def run_dir(run_id: str) -> str:
+    return os.path.join(RUNS_DIR, run_id)
+
+def checkpoint_dir(run_id: str) -> str:
+    return os.path.join(run_dir(run_id), "checkpoints")
+
+def resume_config(run_id: str, config: dict) -> dict:
+    """``config`` set up to continue ``run_id`` from its latest checkpoint."""
+    latest = latest_checkpoint(checkpoint_dir(run_id))
+    if latest is None:
+        raise ValueError(f"Run '{run_id}' has no checkpoints to resume from.")
+    return {**config, "resumeFrom": latest["file"]}
+
+STEP_PHASE_SECONDS = histogram("training_step_phase_seconds", "Time per training step spent in each phase", labelnames=("phase",))
+TRAINING_STEPS = counter("training_steps_total", "Optimizer steps taken across all runs")
+
+class WorkerExit(NamedTuple):
+    """Last event a worker puts on its queue. Data-parallel ranks other than 0 only send one on failure."""
+    error: Optional[str] = None
+    rank: int = 0
+
+class ConfigApplied(NamedTuple):
+    """Live config changes the loop has taken over, at the step after ``step``, and the reasons for any it couldn't."""
+    version: int
+    changes: dict
+    step: int
+    rejected: Optional[dict] = None
+
+class ProfileSample(NamedTuple):
+    """Step-phase timings aggregated over ``seconds`` (see telemetry.StepProfiler)."""
+    steps: int
+    seconds: float
+    phases: dict  # phase -> (histogram bucket counts, total seconds)
+
+class PerformanceReport(NamedTuple):
+    """Settings the performance tuner kept and the step speedup it measured (see performance.tune)."""
+    report: dict
+
+class AutotuneReport(NamedTuple):
+    """Batch size and loader settings the autotuner picked and the throughput it measured (see autotune.tune_loader)."""
+    report: dict
+
+class AgentAction(NamedTuple):
+    """An action the autopilot took on the running job, relayed as a tip.
+
+    ``changes`` are config fields the action changed; the relay records them as a live config change.
+    """
+    kind: str
+    message: str
+    changes: Optional[dict] = None
+
+class TrainingLoop:
+    """The training loop itself, independent of where it runs.
+
+    Metrics go onto ``events``; ``stop_event`` and the optional ``control``
+    queue of live config changes are checked between optimizer steps. All are
+    plain queue/event objects, so the loop runs unchanged on a thread
+    (queue.Queue, threading.Event) or in a child process
+    (multiprocessing.Queue, multiprocessing.Event).
+
+    With a ``distributed`` config the loop is one ``rank`` of a data-parallel
+    group: it trains on its shard of the data, and rank 0 alone reports
+    metrics, takes config changes, checkpoints and saves the model.
+
+    With a ``validation`` config, weight snapshots go onto the ``evaluations``
+    queue for the run's evaluator (see evaluation.run_evaluator).
+    """
+
+    def __init__(self, config: dict, events, stop_event, num_threads: Optional[int] = None, control=None,
+                 run_dir: Optional[str] = None, rank: int = 0, evaluations=None):
+        self.config = config
+        self.events = events
+        self.stop_event = stop_event
+        self.num_threads = num_threads
+        self.control = control
+        self.evaluations = evaluations
+        self.validated_step: Optional[int] = None  # Step of the last snapshot handed to the evaluator
+        self.run_dir = run_dir
+        self.rank = rank
+        self.group: Optional[ProcessGroup] = None
+        self.checkpoint_dir = os.path.join(run_dir, "checkpoints") if run_dir else None
+        self.checkpoints: Optional[CheckpointWriter] = None
+        self.model_info: dict = {}
+        # Batches whose gradients add up to one optimizer step, and their size, once autotuned to keep batchSize
+        self.accumulate = 1
+        self.micro_batch: Optional[int] = None
+
+    def _emit(self, metric: TrainingMetric):
+        if self.rank == 0:
+            self.events.put(metric)
+
+    def _batches(self, loader):
+        """Yield (inputs, targets, stop requested, config changes pending) for each step.
+
+        Ranks of a data-parallel run must make the same call at the same step,
+        and stop the epoch together when any shard runs out, so they agree on
+        these with one small all-reduce per step.
+        """
+        for batch in itertools.chain(loader, [None]) if self.group else loader:
+            stop = self.stop_event.is_set()
+            changes = self.control is not None and not self.control.empty()
+            if self.group is not None:
+                exhausted, stop, changes = self.group.any(batch is None, stop, changes)
+                if exhausted:
+                    return
+            yield batch[0], batch[1], stop, changes
+
+    def _emit_profile(self, profiler: StepProfiler):
+        sample = profiler.drain()
+        if sample is not None:
+            self._emit(ProfileSample(**sample))
+
+    def _tune(self, model: nn.Module, model_type: str, criterion, loader, options: dict):
+        """Pick the fastest supported step settings on the first batch; returns (step model, bf16, channels_last)."""
+        threads, threads_fallback = configure_threads(options)
+        inputs, targets = next(iter(loader))
+
+        def trial(forward_model: nn.Module, bf16: bool, channels_last: bool):
+            with autocast(bf16):
+                loss = criterion(forward_model(prepare_inputs(model_type, inputs, channels_last)), targets)
+            loss.backward()
+            model.zero_grad(set_to_none=True)
+
+        step_model, report = tune(model, model_type, options, trial)
+        report.update(threads)
+        if threads_fallback:
+            report["fallbacks"]["interopThreads"] = threads_fallback
+        print(describe(report))
+        self._emit(PerformanceReport(report))
+        return step_model, "bf16" in report["active"], "channelsLast" in report["active"]
+
+    def _autotune(self, model: nn.Module, model_type: str, criterion, loader, batch_size: int, options: dict):
+        """Pick the fastest batch size and loader settings on a throwaway copy of the model; returns the loader to use."""
+        trial_model = copy.deepcopy(model)
+        trial_optimizer = build_optimizer(self.config.get('optimizer', 'adam'), trial_model.parameters(),
+                                          float(self.config.get('learningRate', 0.001)))
+
+        def step(inputs, targets):
+            trial_optimizer.zero_grad(set_to_none=True)
+            criterion(trial_model(prepare_inputs(model_type, inputs)), targets).backward()
+            trial_optimizer.step()
+
+        def loader_for(size: int, workers: int, prefetch: int, pin_memory: bool):
+            return configure_loader(loader, size, workers, prefetch, pin_memory, shuffle_buffer=int(options["sampleRows"]))
+
+        report = tune_loader(options, batch_size, loader_for, step)
+        print(describe_autotune(report))
+        self._emit(AutotuneReport(report))
+        self.accumulate = report["accumulate"]
+        self.micro_batch = report["batchSize"] if options["preserveBatch"] else None
+        return configure_loader(loader, report["batchSize"], report["workers"], report["prefetch"] or 2,
+                                report["pinMemory"])
+
+    def _evaluate(self, model: nn.Module, step: int, epoch: int, final: bool = False):
+        """Hand a serialized copy of the weights to the evaluator; skipped while it's busy, unless ``final``."""
+        if self.evaluations is None or step == self.validated_step or (not final and self.evaluations.full()):
+            return
+        # Bytes rather than tensors: tensors cross a process queue as shared-memory handles that only
+        # resolve while the sender is alive, and a run process exits right after its final snapshot
+        weights = io.BytesIO()
+        torch.save({k: v.detach().cpu() for k, v in model.state_dict().items()}, weights)
+        if submit(self.evaluations, {"step": step, "epoch": epoch, "modelInfo": self.model_info, "model": weights.getvalue()},
+                  wait=final):
+            self.validated_step = step
+        else:
+            print(f"Evaluator busy; step {step} was not validated")
+
+    def _apply_changes(self, step: int, optimizer: optim.Optimizer, loader, pilot: Optional[Autopilot]):
+        """Take over config changes pushed since the last step (see config_store.MUTABLE_FIELDS)."""
+        pending = []
+        while self.control is not None:
+            try:
+                pending.append(self.control.get_nowait())
+            except queue.Empty:
+                break
+        if self.group is not None:
+            pending = self.group.broadcast(pending)  # rank 0 owns the control queue
+        for version, changes in pending:
+            changes, rejected = dict(changes), {}
+            if 'learningRate' in changes:
+                for group in optimizer.param_groups:
+                    group['lr'] = float(changes['learningRate'])
+                if pilot is not None:
+                    pilot.learning_rate = float(changes['learningRate'])
+            if 'batchSize' in changes:
+                batch_size = int(changes['batchSize'])
+                if self.micro_batch and batch_size % self.micro_batch == 0:
+                    # Keep the tuned batches and change how many make up a step
+                    self.accumulate = batch_size // self.micro_batch
+                elif set_batch_size(loader, batch_size):
+                    self.accumulate, self.micro_batch = 1, None
+                else:
+                    del changes['batchSize']
+                    rejected['batchSize'] = "the dataset is streamed by loader workers, which keep their batch size"
+            if 'metricsEvery' in changes:
+                self.metrics_every = max(1, int(changes['metricsEvery']))
+            if 'epochs' in changes:
+                self.epochs = int(changes['epochs'])
+            self.config.update(changes)
+            print(f"Applied config version {version}: {changes}" + (f"; not applied: {rejected}" if rejected else ""))
+            self._emit(ConfigApplied(version, changes, step, rejected or None))
+
+    def run(self):
+        error = None
+        try:
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            options = distributed_options(self.config.get('distributed'))
+            if options:
+                self.group = ProcessGroup(options, self.rank)
+                print(f"Rank {self.rank} of {self.group.world_size} joined the process group")
+            self.train()
+        except Exception as e:
+            error = str(e)
+            print(f"Training failed{f' on rank {self.rank}' if self.group else ''}: {e}")
+        finally:
+            if self.checkpoints is not None:
+                self.checkpoints.close()  # Pending checkpoints are on disk before we report the exit
+            if self.group is not None:
+                self.group.close()
+            if self.evaluations is not None:
+                # The evaluator exits after the snapshots it has; a stopped or failed run drops a queued one instead of waiting
+                finish(self.evaluations, wait=error is None and not self.stop_event.is_set())
+            if self.rank == 0 or error:
+                self.events.put(WorkerExit(error, self.rank))
+
+    def _checkpoint(self, model: nn.Module, optimizer: optim.Optimizer, step: int, epoch: int,
+                    epoch_complete: bool, loss: Optional[float] = None):
+        """Snapshot to CPU now; the writer thread serializes it. Only epoch losses rank checkpoints."""
+        if self.checkpoints is None:
+            return
+        if loss is not None and not math.isfinite(loss):
+            loss = None
+        self.checkpoints.save(snapshot(model, optimizer, step=step, epoch=epoch, loss=loss,
+                                       epochComplete=epoch_complete, modelInfo=self.model_info))
+
+    def train(self):
+        config = self.config
+        self.epochs = int(config.get('epochs', 10))
+        batch_size = int(config.get('batchSize', 32))
+        shard = {}
+        if self.group is not None:
+            # batchSize is per rank; each epoch every rank sees its own share of the rows
+            shard = {"rank": self.rank, "world_size": self.group.world_size,
+                     "seed": shuffle_seed(os.path.basename(self.run_dir or ""))}
+        val_options = validation_options(config.get('validation'))
+        if val_options:
+            # Every rank leaves out the same rows; the evaluator reads them (see data_pipeline.load_holdout)
+            shard.update(holdout=float(val_options["split"]), holdout_seed=int(val_options["seed"]))
+        dataset = config['dataset']
+        if self.group is not None:
+            # Rank 0 caches a CSV the ranks would each load into memory; the others wait for it, and ranks
+            # on another node build their own copy
+            if self.rank == 0:
+                dataset = preprocess_for_ranks(dataset, config.get('streaming'))
+            dataset = self.group.broadcast(dataset)
+            if self.rank != 0:
+                dataset = preprocess_for_ranks(dataset, config.get('streaming'))
+        data = open_training_data(
+            dataset, batch_size,
+            streaming=config.get('streaming'),
+            shuffle_buffer=int(config.get('shuffleBuffer', 200_000)),
+            **shard,
+        )
+        learning_rate = float(config.get('learningRate', 0.001))
+        model_type = config.get('modelType')
+        self.metrics_every = max(1, int(config.get('metricsEvery', 1)))
+        pilot_options = autopilot_options(config.get('autopilot'))
+        perf_options = performance_options(config.get('performance'))
+        tune_options = autotune_options(config.get('autotune'))
+        print(f"Model type: {model_type}")
+        input_dim = data.input_dim
+        check_input_shape(model_type, input_dim)
+        model = build_model(model_type, input_dim, data.num_classes, config.get('modelName'))
+        self.model_info = {"modelType": model_type, "modelName": config.get('modelName'),
+                           "inputDim": input_dim, "numClasses": data.num_classes}
+        print(f"Selected model: {model.__class__.__name__}")
+        optimizer = build_optimizer(config.get('optimizer', 'adam'), model.parameters(), learning_rate)
+        criterion = nn.CrossEntropyLoss()
+        loader = data.loader
+        pilot = Autopilot(pilot_options, learning_rate) if pilot_options else None
+        best_state = None  # CPU copy of the best epoch's weights, kept only under autopilot
+        checkpoint_every = int(config.get('checkpointEvery', 0))  # steps; 0 checkpoints once per epoch
+        validate_every = int(val_options["every"]) if val_options else 0  # steps; 0 validates once per epoch
+        if self.checkpoint_dir and self.rank == 0:
+            self.checkpoints = CheckpointWriter(self.checkpoint_dir, keep_last=int(config.get('keepCheckpoints', 3)))
+
+        step, loss, accuracy, last_epoch = 0, 0.0, 0.0, 0
+        if config.get('resumeFrom'):
+            # Only rank 0's node is sure to have the checkpoint; the other ranks get it from there
+            state = load_checkpoint(self.checkpoint_dir, {"file": config['resumeFrom']}) if self.rank == 0 else None
+            if self.group is not None:
+                state = self.group.broadcast(state)
+            model.load_state_dict(state["model"])
+            optimizer.load_state_dict(state["optimizer"])
+            step = state["step"]
+            # An interrupted epoch is run again from its start
+            last_epoch = state["epoch"] if state["epochComplete"] else state["epoch"] - 1
+            print(f"Resumed from {config['resumeFrom']} (step {step}, epoch {last_epoch} complete)")
+        self._emit(TrainingMetric(epoch=last_epoch, loss=0, accuracy=0, status="Idle"))
+        model.train()
+        if tune_options and self.group is not None:
+            print("Data-parallel run: autotuning skipped")
+        elif tune_options:
+            loader = self._autotune(model, model_type, criterion, loader, batch_size, tune_options)
+        # Training steps call step_model, which may be a compiled wrapper sharing model's parameters
+        step_model, bf16, channels_last = model, False, False
+        if self.group is not None:
+            if perf_options:
+                configure_threads(perf_options)
+                print("Data-parallel run: performance options only size the thread pools")
+            step_model = self.group.wrap(model)
+        elif perf_options:
+            step_model, bf16, channels_last = self._tune(model, model_type, criterion, loader, perf_options)
+        epoch = last_epoch
+        # Where step time goes, shipped to the server about once per profile_every seconds
+        profiler = StepProfiler()
+        profile_every = float(config.get('profileEvery', 1.0))
+        # Batches since the last optimizer step and their totals; a step may span the end of an epoch
+        micro, window_loss, window_correct, window_rows = 0, 0.0, 0, 0
+        while epoch < self.epochs:  # epochs may change while training
+            epoch += 1
+            total_loss, correct, seen = 0.0, 0, 0
+            profiler.restart()
+            for inputs, targets, stop, changes in self._batches(loader):
+                profiler.lap("data")
+                if changes:
+                    self._apply_changes(step, optimizer, loader, pilot)
+                if stop:
+                    print("Training stopped by user.")
+                    self._checkpoint(model, optimizer, step, epoch, epoch_complete=False)
+                    self._emit_profile(profiler)
+                    self._emit(TrainingMetric(epoch=epoch, loss=loss, accuracy=accuracy, step=step, status="Idle"))
+                    return
+                if micro == 0:
+                    optimizer.zero_grad(set_to_none=True)
+                with autocast(bf16):
+                    logits = step_model(prepare_inputs(model_type, inputs, channels_last))
+                    batch_loss = criterion(logits, targets)
+                profiler.lap("forward")
+                # Accumulated gradients of the scaled losses match one batch of all their rows
+                (batch_loss / self.accumulate if self.accumulate > 1 else batch_loss).backward()
+                profiler.lap("backward")
+                n = targets.size(0)
+                batch_correct = (logits.argmax(dim=1) == targets).sum().item()
+                loss_value = batch_loss.item()
+                total_loss += loss_value * n
+                correct += batch_correct
+                seen += n
+                micro += 1
+                if micro < self.accumulate:
+                    window_loss += loss_value * n
+                    window_correct += batch_correct
+                    window_rows += n
+                    continue
+                optimizer.step()
+                profiler.lap("optimizer")
+                step += 1
+                if micro > 1:
+                    # Report the whole optimizer step
+                    loss_value = (window_loss + loss_value * n) / (window_rows + n)
+                    batch_correct, n = window_correct + batch_correct, window_rows + n
+                micro, window_loss, window_correct, window_rows = 0, 0.0, 0, 0
+                if self.group is not None and (step % self.metrics_every == 0 or pilot is not None):
+                    # Report (and let the autopilot judge) the whole step across ranks
+                    loss_sum, batch_correct, n = self.group.sum(loss_value * n, batch_correct, n)
+                    loss_value = loss_sum / n
+                if step % self.metrics_every == 0:
+                    self._emit(TrainingMetric(epoch=epoch, loss=loss_value, accuracy=batch_correct / n, step=step, status="Ongoing"))
+                if checkpoint_every and step % checkpoint_every == 0:
+                    self._checkpoint(model, optimizer, step, epoch, epoch_complete=False)
+                if validate_every and step % validate_every == 0:
+                    self._evaluate(model, step, epoch)
+                if pilot is not None:
+                    action = pilot.on_step(loss_value)
+                    if action is not None and action.kind == ABORT:
+                        self._emit(AgentAction(action.kind, action.message))
+                        self._emit(TrainingMetric(epoch=epoch, loss=loss_value, accuracy=accuracy, step=step, status="Idle"))
+                        raise RuntimeError(action.message)
+                profiler.end_step()
+                if profiler.mark - profiler.started >= profile_every:
+                    self._emit_profile(profiler)
+            if self.group is not None:
+                total_loss, correct, seen = self.group.sum(total_loss, correct, seen)
+            loss = total_loss / max(seen, 1)
+            accuracy = correct / max(seen, 1)
+            last_epoch = epoch
+            log_sampled("epoch", f"Epoch {epoch}: Loss = {loss:.4f}, Accuracy = {accuracy:.4f}")
+            self._emit(TrainingMetric(epoch=epoch, loss=loss, accuracy=accuracy, status="Ongoing"))
+            self._checkpoint(model, optimizer, step, epoch, epoch_complete=True, loss=loss)
+            if val_options and not validate_every:
+                self._evaluate(model, step, epoch)
+            if pilot is None:
+                continue
+            action = pilot.on_epoch(epoch, loss)
+            if pilot.improved and pilot_options["restoreBest"]:
+                best_state = {k: v.detach().to("cpu", copy=True) for k, v in model.state_dict().items()}
+                best_metrics = (loss, accuracy)
+            if action is None:
+                continue
+            if action.kind == REDUCE_LR:
+                # Takes effect now; the relay pushes it back as a config change so the run's config follows
+                for group in optimizer.param_groups:
+                    group['lr'] = action.learning_rate
+                self._emit(AgentAction(action.kind, action.message, {'learningRate': action.learning_rate}))
+                continue
+            self._emit(AgentAction(action.kind, action.message))
+            if action.kind == EARLY_STOP:
+                if best_state is not None:
+                    model.load_state_dict(best_state)
+                    loss, accuracy = best_metrics
+                    self.validated_step = None  # Same step, different weights
+                break
+        self._emit_profile(profiler)
+        self._emit(TrainingMetric(epoch=last_epoch, loss=loss, accuracy=accuracy, step=step, status="Completed"))
+        print("Training complete!")
+        if self.run_dir and self.rank == 0:
+            save_model(model, self.run_dir, self.model_info)
+        self._evaluate(model, step, last_epoch, final=True)
+
+
+def _run_in_process(config: dict, events, stop_event, num_threads: Optional[int], control, run_dir: str,
+                    rank: int = 0, evaluations=None):
+    TrainingLoop(config, events, stop_event, num_threads, control, run_dir, rank, evaluations).run()
+
+def launch_ranks(ctx, config: dict, options: dict, events, stop_event, num_threads: Optional[int], control,
+                 run_dir: str, name: str, evaluations=None) -> list:
+    """Processes for this node's ranks of a data-parallel run (see distributed.DEFAULTS), not yet started.
+
+    Ranks are numbered node by node; ``control`` and ``evaluations`` only go
+    to rank 0, which shares config changes with the others.
+    """
+    first = int(options["nodeRank"]) * int(options["processes"])
+    # Every rank must dial the same address, so a free port is picked once, here
+    config = {**config, "distributed": {**options, "masterPort": options["masterPort"] or free_port()}}
+    per_rank = max(1, num_threads // int(options["processes"])) if num_threads else None
+    return [
+        ctx.Process(
+            target=_run_in_process,
+            args=(config, events, stop_event, per_rank, control if rank == 0 else None, run_dir, rank,
+                  evaluations if rank == 0 else None),
+            name=f"{name}-rank{rank}",
+            daemon=True,
+        )
+        for rank in range(first, first + int(options["processes"]))
+    ]
+
+class TrainingWorker:
+    """Runs a TrainingLoop on a dedicated thread or in a child process.
+
+    Metrics arrive on ``events`` (a thread/process-safe queue) and are relayed
+    to WebSocket clients by ``train_model`` on the event loop, so forward and
+    backward passes never block HTTP or WebSocket handlers. ``stop()`` and
+    ``update_config()`` are cooperative: the loop checks them between optimizer steps.
+    A config with ``distributed`` set always runs as processes, one per rank.
+    With ``validation`` set, an evaluator runs next to the loop the same way (its
+    own process or thread) and puts its results on ``events`` as well.
+    """
+
+    def __init__(self, config: dict, run_id: Optional[str] = None, use_process: bool = False,
+                 num_threads: Optional[int] = None):
+        self.config = copy.deepcopy(config)  # Snapshot so PUT /config can't change a running job
+        self.run_id = run_id or new_run_id()
+        self.error: Optional[str] = None
+        self.config_version = 0  # Last live config version the loop has applied
+        self.performance: Optional[dict] = None  # The performance tuner's report, once it ran
+        self.validation: Optional[dict] = None  # The evaluator's latest scores
+        self.autotune: Optional[dict] = None  # The autotuner's report, once it ran
+        self._pushed_version = 0
+        self.run_dir = run_dir(self.run_id)
+        options = distributed_options(self.config.get('distributed'))
+        self.world_size = world_size(options) if options else 1
+        val_options = validation_options(self.config.get('validation'))
+        if options and int(options["nodeRank"]) > 0:
+            val_options = None  # Rank 0, on the first node, is the one that validates
+        self._evaluations = None
+        self._evaluator = None
+        if use_process or options:
+            # spawn, not fork: forking a process that already runs torch and an event loop is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            self.events = ctx.Queue()
+            self._stop_event = ctx.Event()
+            self._control = ctx.Queue()
+            if val_options:
+                # One snapshot waits at most; the loop skips evaluations while it's there
+                self._evaluations = ctx.Queue(maxsize=1)
+                self._evaluator = ctx.Process(
+                    target=run_evaluator,
+                    args=(self.config, val_options, self._evaluations, self.events),
+                    name=f"evaluator-{self.run_id}",
+                    daemon=True,
+                )
+            if options:
+                self._runners = launch_ranks(ctx, self.config, options, self.events, self._stop_event, num_threads,
+                                             self._control, self.run_dir, f"training-{self.run_id}", self._evaluations)
+            else:
+                self._runners = [ctx.Process(
+                    target=_run_in_process,
+                    args=(self.config, self.events, self._stop_event, num_threads, self._control, self.run_dir, 0,
+                          self._evaluations),
+                    name=f"training-{self.run_id}",
+                    # A daemonic process can't start DataLoader workers; scheduler.shutdown stops runs either way
+                    daemon=not uses_workers(autotune_options(self.config.get('autotune'))),
+                )]
+        else:
+            self.events = queue.Queue()
+            self._stop_event = threading.Event()
+            self._control = queue.Queue()
+            if val_options:
+                self._evaluations = queue.Queue(maxsize=1)
+                self._evaluator = threading.Thread(
+                    target=run_evaluator,
+                    args=(self.config, val_options, self._evaluations, self.events, False),
+                    name=f"evaluator-{self.run_id}",
+                    daemon=True,
+                )
+            # The loop gets its own copy; train_model merges in changes once they're applied. Torch's thread
+            # pool is shared by every run on threads, so one run doesn't resize it for the others.
+            training_loop = TrainingLoop(copy.deepcopy(self.config), self.events, self._stop_event, None,
+                                         self._control, self.run_dir, evaluations=self._evaluations)
+            self._runners = [threading.Thread(target=training_loop.run, name=f"training-{self.run_id}", daemon=True)]
+
+    def start(self):
+        for runner in self._runners:
+            runner.start()
+        if self._evaluator is not None:
+            self._evaluator.start()
+
+    def stop(self):
+        """Ask the worker to stop at the next step boundary."""
+        self._stop_event.set()
+
+    def update_config(self, changes: dict) -> int:
+        """Push validated live-editable changes (see config_store.live_changes) to the loop.
+
+        Returns the run's new config version; ``config_version`` reaches it once applied.
+        """
+        self._pushed_version += 1
+        self._control.put((self._pushed_version, dict(changes)))
+        return self._pushed_version
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def is_alive(self) -> bool:
+        return any(runner.is_alive() for runner in self._runners)
+
+    @property
+    def validating(self) -> bool:
+        """Whether the evaluator may still report, e.g. the final model's scores after training exited."""
+        return self._evaluator is not None and self._evaluator.is_alive()
+
+    def terminate(self, evaluator_only: bool = False):
+        """Kill worker processes outright, e.g. the surviving ranks after one failed."""
+        runners = [] if evaluator_only else list(self._runners)
+        if self._evaluator is not None:
+            runners.append(self._evaluator)
+        for runner in runners:
+            if isinstance(runner, multiprocessing.process.BaseProcess) and runner.is_alive():
+                runner.terminate()
+
+def record_profile(run_id: str, sample: ProfileSample) -> dict:
+    """Fold a worker's step timings into /metrics and summarize them for the dashboard."""
+    TRAINING_STEPS.inc(sample.steps)
+    for phase, (counts, total) in sample.phases.items():
+        STEP_PHASE_SECONDS.merge(counts, total, phase=phase)
+    return {
+        "runId": run_id,
+        "steps": sample.steps,
+        "stepsPerSec": sample.steps / sample.seconds if sample.seconds > 0 else None,
+        # Mean milliseconds per step spent in each phase
+        "phasesMs": {phase: total * 1000 / sample.steps for phase, (_, total) in sample.phases.items()},
+    }
+
+async def train_model(ws_manager: WebSocketManager, worker: TrainingWorker):
+    """Run a TrainingWorker and relay its metrics and agent tips to WebSocket clients."""
+    print("Starting training...")
+    missing = missing_config_keys(worker.config)
+    if missing:
+        worker.error = f"Missing required config values: {', '.join(missing)}. Please update /config to include these."
+        print(f"ERROR: {worker.error}")
         return
-    print(f"Selected model: {model.__class__.__name__}")
-
-    # Before training loop, send Idle status if no training is running
-    await ws_manager.send_metric(TrainingMetric(epoch=0, loss=0, accuracy=0, status="Idle"))
-    for epoch in range(1, epochs + 1):
-        if not getattr(main, 'TRAINING_RUNNING', True):
-            print("Training stopped by user.")
-            # Send Idle status if stopped
-            await ws_manager.send_metric(TrainingMetric(epoch=epoch, loss=loss, accuracy=accuracy, status="Idle"))
-            break
-        # Dummy metric calculation (replace with your model's logic)
-        loss = max(0, 0.5 - (epoch / (2 * epochs)) + random.uniform(-0.05, 0.05))
-        accuracy = min(1, (epoch / epochs) + random.uniform(-0.05, 0.05))
-        metric = TrainingMetric(epoch=epoch, loss=loss, accuracy=accuracy, status="Ongoing")
-        print(f"Epoch {epoch}: Loss = {loss:.4f}, Accuracy = {accuracy:.4f}")
-        await ws_manager.send_metric(metric)
-        print(f"Sent metric: {metric}")
-        TrainingAgent.instance.observe(metric, epoch)
-        tip = TrainingAgent.instance.process_metric(metric)
-        if tip:
-            await ws_manager.send_agent_tip(tip["content"])
-            print(f"Sent tip: {tip['content']}")
-        await asyncio.sleep(0.5)  # Simulate training time
-    # After training loop, send Completed status
-    await ws_manager.send_metric(TrainingMetric(epoch=epochs, loss=loss, accuracy=accuracy, status="Completed"))
-    print("Training complete!")
-    # === Save model to Downloads folder ===
-    downloads_dir = os.path.join(os.path.expanduser("~"), "Downloads")
-    os.makedirs(downloads_dir, exist_ok=True)
-    model_save_path = os.path.join(downloads_dir, f"trained_model_{model_type if model_type != 'custom' else model_name}.pt")
+    # Each run gets its own agent so concurrent runs don't mix their histories
+    agent = TrainingAgent()
+    store = MetricStore(worker.run_id)
+    store.save_config(worker.config)
+    if worker.config.get('resumeFrom'):
+        # The steps after the checkpoint are trained and reported again
+        entry = next((e for e in read_index(checkpoint_dir(worker.run_id)) if e["file"] == worker.config['resumeFrom']), None)
+        if entry is not None:
+            last_epoch = entry["epoch"] if entry.get("epochComplete", True) else entry["epoch"] - 1
+            await asyncio.to_thread(store.truncate, entry["step"], last_epoch)
+    print(f"Run {worker.run_id}: metrics stored in {store.path}")
+    worker.start()
+    if worker.world_size > 1:
+        await ws_manager.send_agent_tip(f"Training data-parallel over {worker.world_size} processes.")
+    loop = asyncio.get_running_loop()
+    wait_for_event = functools.partial(worker.events.get, timeout=0.5)
     try:
-        torch.save(model.state_dict(), model_save_path)
-        print(f"Model saved to: {model_save_path}")
-    except Exception as e:
-        print(f"Failed to save model: {e}")
+        done = exited = False
+        while not done:
+            try:
+                batch = [await loop.run_in_executor(None, wait_for_event)]
+            except queue.Empty:
+                if exited:
+                    # The evaluator scores the final model after training exits
+                    done = not worker.validating and worker.events.empty()
+                    continue
+                if not worker.is_alive() and worker.events.empty():
+                    # Crashed without reporting (e.g. a killed child process)
+                    worker.error = "Training worker exited unexpectedly."
+                    break
+                continue
+            # Drain whatever else the worker produced meanwhile without another executor hop
+            while not isinstance(batch[-1], WorkerExit):
+                try:
+                    batch.append(worker.events.get_nowait())
+                except queue.Empty:
+                    break
+            # A SQLite insert and commit; off the event loop so it never delays other runs or clients
+            await asyncio.to_thread(store.append, [metric for metric in batch if isinstance(metric, TrainingMetric)])
+            for metric in batch:
+                if isinstance(metric, WorkerExit):
+                    worker.error = f"Rank {metric.rank} failed: {metric.error}" if metric.rank else metric.error
+                    if worker.error and worker.world_size > 1:
+                        # The other ranks would block in their next all-reduce until the group times out
+                        worker.terminate()
+                    elif worker.error or worker.stopping:
+                        worker.terminate(evaluator_only=True)
+                    exited = True
+                    done = not worker.validating or bool(worker.error) or worker.stopping
+                    break
+                if isinstance(metric, ValidationResult):
+                    if metric.error:
+                        await ws_manager.send_agent_tip(f"Validation failed: {metric.error}")
+                        continue
+                    worker.validation = metric.metrics
+                    await ws_manager.broadcast({"type": "val_metrics", "payload": {"runId": worker.run_id, **metric.metrics}})
+                    continue
+                if isinstance(metric, ProfileSample):
+                    await ws_manager.broadcast({"type": "profile", "payload": record_profile(worker.run_id, metric)})
+                    continue
+                if isinstance(metric, ConfigApplied):
+                    worker.config.update(metric.changes)
+                    worker.config_version = metric.version
+                    store.save_config(worker.config)
+                    changes = ", ".join(f"{key}={value}" for key, value in metric.changes.items())
+                    if changes:
+                        await ws_manager.send_agent_tip(f"Applied config v{metric.version} at step {metric.step}: {changes}")
+                    for key, reason in (metric.rejected or {}).items():
+                        await ws_manager.send_agent_tip(f"Config v{metric.version}: {key} was not applied ({reason})")
+                    continue
+                if isinstance(metric, PerformanceReport):
+                    worker.performance = metric.report
+                    await ws_manager.broadcast({"type": "performance", "payload": {"runId": worker.run_id, **metric.report}})
+                    await ws_manager.send_agent_tip(describe(metric.report))
+                    continue
+                if isinstance(metric, AutotuneReport):
+                    worker.autotune = metric.report
+                    await ws_manager.broadcast({"type": "autotune", "payload": {"runId": worker.run_id, **metric.report}})
+                    await ws_manager.send_agent_tip(describe_autotune(metric.report))
+                    continue
+                if isinstance(metric, AgentAction):
+                    print(f"Run {worker.run_id}: {metric.message}")
+                    await ws_manager.send_agent_tip(metric.message)
+                    if metric.changes:
+                        # Same path as a PATCH: the loop re-applies it and ConfigApplied bumps the version
+                        worker.update_config(live_changes(worker.config, metric.changes))
+                    continue
+                await ws_manager.send_metric(metric)
+                if metric.step is not None or metric.status == "Ongoing":
+                    # Steps feed the divergence guards, epoch summaries the progress rules
+                    agent.observe(metric, metric.epoch)
+                    tip = agent.process_metric(metric)
+                    if tip:
+                        await ws_manager.send_agent_tip(tip["content"])
+                        log_sampled("tip", f"Sent tip: {tip['content']}")
+    finally:
+        # If the relay is cancelled (e.g. on shutdown) don't leave the worker running
+        worker.stop()
+        store.close()
+    if worker.error:
+        await ws_manager.send_agent_tip(f"Training failed: {worker.error}")
@@ -1,61 +1,276 @@
 import asyncio
-from typing import List
+import time
+import uuid
+import weakref
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
 from fastapi.websockets import WebSocket
+from metric_frames import BATCH_ENCODINGS, MetricBatch, dumps
 from schemas import TrainingMetric
+from telemetry import SIZE_BUCKETS, counter, gauge, histogram, log_sampled
+
+# What to do when a client's outbound queue is full:
+#   drop_oldest - discard the oldest queued frame to make room
+#   coalesce    - collapse queued metric frames down to the newest one
+#   disconnect  - close the client; it is too slow to keep up
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# How a client receives metrics:
+#   stream - one JSON "metrics" frame per metric (default, what older clients expect)
+#   batch  - metrics coalesced per tick into one columnar "metrics_batch" frame
+STREAM_MODES = ("stream", "batch")
+
+# Frames a client can't recover from losing: the session/seq handshake and the resync snapshot.
+# Overflow never drops these; the queue may run over its bound until they are sent.
+PINNED_KINDS = ("hello", "snapshot")
+
+# Fan-out instrumentation, exported at /metrics
+_managers: "weakref.WeakSet[WebSocketManager]" = weakref.WeakSet()
+SEND_SECONDS = histogram("ws_send_seconds", "Time to hand one frame to a client socket")
+QUEUE_WAIT_SECONDS = histogram("ws_queue_wait_seconds", "Time frames wait in a client's send queue")
+QUEUE_DEPTH = histogram("ws_queue_depth", "Client send queue depth when a frame is sent", SIZE_BUCKETS)
+FRAMES_SENT = counter("ws_frames_sent_total", "Frames sent to clients", ("kind",))
+FRAMES_DROPPED = counter("ws_dropped_frames_total", "Frames dropped by the overflow policy", ("policy",))
+SLOW_DISCONNECTS = counter("ws_slow_client_disconnects_total", "Clients disconnected for a full send queue")
+
+def _connection_stats() -> dict:
+    managers = list(_managers)
+    return {
+        ("clients",): sum(len(m.clients) for m in managers),
+        ("queued_frames",): sum(len(c.pending) for m in managers for c in m.clients.values()),
+        ("max_queue_depth",): max((len(c.pending) for m in managers for c in m.clients.values()), default=0),
+    }
+
+gauge("ws_connections", "WebSocket clients and their queued frames across all channels", _connection_stats, ("stat",))
+
+class ClientConnection:
+    """A connected client with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, overflow: str, mode: str = "stream", encoding: str = "json"):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.mode = mode
+        self.encoding = encoding
+        # Entries are (message type, serialized frame, enqueue time); frames are str or bytes
+        self.pending: Deque[tuple] = deque()
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, kind: str, frame: str) -> bool:
+        """Queue a frame without blocking. Returns False if the client should be dropped."""
+        if len(self.pending) >= self.max_queue:
+            if self.overflow == "disconnect":
+                return False
+            if self.overflow == "coalesce" and kind == "metrics":
+                kept = deque(entry for entry in self.pending if entry[0] != "metrics")
+                self.dropped += len(self.pending) - len(kept)
+                FRAMES_DROPPED.inc(len(self.pending) - len(kept), policy=self.overflow)
+                self.pending = kept
+            if len(self.pending) >= self.max_queue:
+                self._drop_oldest()
+        self.pending.append((kind, frame, time.perf_counter()))
+        self.wakeup.set()
+        return True
+
+    def _drop_oldest(self):
+        for index, entry in enumerate(self.pending):
+            if entry[0] not in PINNED_KINDS:
+                del self.pending[index]
+                self.dropped += 1
+                FRAMES_DROPPED.inc(policy=self.overflow)
+                return
 
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, max_queue: int = 256, overflow: str = "drop_oldest", tick_hz: float = 10.0,
+                 ring_size: int = 4096):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}'. Use one of: {', '.join(OVERFLOW_POLICIES)}")
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.tick_hz = tick_hz
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self._batch = MetricBatch()
+        self._ticker: Optional[asyncio.Task] = None
+        # Every broadcast gets the next sequence number and is kept in a bounded ring so
+        # reconnecting clients can be sent just what they missed. Sequence numbers are only
+        # meaningful within one server session.
+        self.session = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.ring: Deque[tuple] = deque(maxlen=ring_size)  # (seq, kind, frame, metric or None)
+        # Returns a downsampled view of the current run for clients whose gap is outside the ring
+        self.snapshot_provider: Optional[Callable[[], Optional[dict]]] = None
+        # Clients accepted but still being resynced, not yet in ``clients``
+        self.joining = 0
+        _managers.add(self)
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
 
-    async def connect(self, websocket: WebSocket):
-        """Accept and add a new WebSocket connection."""
+    def _clients_in(self, mode: str) -> List[ClientConnection]:
+        return [client for client in self.clients.values() if client.mode == mode]
+
+    async def connect(self, websocket: WebSocket, mode: str = "stream", encoding: str = "json",
+                      since: Optional[int] = None, session: Optional[str] = None):
+        """Accept a new WebSocket connection and start its writer task.
+
+        Clients that pass ``since`` (the last sequence number they saw) and the
+        ``session`` it came from are resynced: sent the missed messages from the
+        ring buffer, or a downsampled snapshot if the gap is too old.
+        """
+        if mode not in STREAM_MODES:
+            raise ValueError(f"Unknown stream mode '{mode}'. Use one of: {', '.join(STREAM_MODES)}")
+        if encoding not in BATCH_ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}'. Use one of: {', '.join(BATCH_ENCODINGS)}")
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.max_queue, self.overflow, mode, encoding)
+        client.writer = asyncio.create_task(self._write_loop(client))
+        self._enqueue(client, "hello", dumps({"type": "hello", "session": self.session, "seq": self.seq}))
+        if since is not None:
+            self.joining += 1
+            try:
+                await self._resync(client, since, session)
+            finally:
+                self.joining -= 1
+        # Live frames only start once the resync is queued, so they can't overtake it
+        self.clients[websocket] = client
+        if mode == "batch" and (self._ticker is None or self._ticker.done()):
+            self._ticker = asyncio.create_task(self._tick_loop())
         print("New connection established!")
 
+    async def _resync(self, client: ClientConnection, since: int, session: Optional[str]):
+        if session == self.session and since >= self.seq:
+            return
+        if session == self.session and self.ring and self.ring[0][0] <= since + 1:
+            self._replay_ring(client, since)
+            return
+        if self.snapshot_provider is None:
+            return
+        # The snapshot holds at least what was sent up to here; the rest is replayed after it
+        seq = self.seq
+        snapshot = await asyncio.to_thread(self.snapshot_provider)
+        if snapshot is not None:
+            self._enqueue(client, "snapshot", dumps({"type": "snapshot", "seq": seq, "payload": snapshot}))
+            self._replay_ring(client, seq)
+
+    def _replay_ring(self, client: ClientConnection, since: int):
+        """Queue what the ring buffer holds after ``since``; the client drops sequence numbers it has seen."""
+        missed = [entry for entry in self.ring if entry[0] > since]
+        # Missed metrics go out as one batch frame; resyncing clients understand batches
+        batch = MetricBatch()
+        for seq, _, _, metric in missed:
+            if metric is not None:
+                batch.append(metric, seq)
+        if batch:
+            self._enqueue(client, "metrics_batch", batch.encode(client.encoding))
+        for _, kind, frame, metric in missed:
+            if metric is None:
+                self._enqueue(client, kind, frame)
+
     async def disconnect(self, websocket: WebSocket, force: bool = False):
         """Remove a WebSocket connection and optionally close it."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            if force:
-                try:
-                    await websocket.close()
-                except Exception:
-                    pass
-            print("Connection closed!")
-
-    async def broadcast(self, message: dict):
-        """Broadcast a message to all active WebSocket connections."""
-        disconnected = []
-        for connection in self.active_connections:
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        if self._ticker and not self._clients_in("batch"):
+            self._ticker.cancel()
+            self._ticker = None
+            self._batch = MetricBatch()
+        if force:
             try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error sending message to {getattr(connection, 'client', 'unknown')}: {e}")
-                disconnected.append(connection)
-        for connection in disconnected:
+                await websocket.close()
+            except Exception:
+                pass
+        print("Connection closed!")
+
+    async def _write_loop(self, client: ClientConnection):
+        """Drain one client's queue so a slow socket only ever delays itself."""
+        try:
+            while True:
+                while not client.pending:
+                    client.wakeup.clear()
+                    await client.wakeup.wait()
+                QUEUE_DEPTH.observe(len(client.pending))
+                kind, frame, enqueued = client.pending.popleft()
+                started = time.perf_counter()
+                QUEUE_WAIT_SECONDS.observe(started - enqueued)
+                if isinstance(frame, bytes):
+                    await client.websocket.send_bytes(frame)
+                else:
+                    await client.websocket.send_text(frame)
+                SEND_SECONDS.observe(time.perf_counter() - started)
+                FRAMES_SENT.inc(kind=kind)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending message to {getattr(client.websocket, 'client', 'unknown')}: {e}")
             # Only remove, do not call close again
-            await self.disconnect(connection, force=False)
+            await self.disconnect(client.websocket, force=False)
+
+    async def _tick_loop(self):
+        """Flush buffered metrics to batch-mode clients at a fixed rate."""
+        interval = 1.0 / self.tick_hz
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+    def flush(self):
+        """Send everything buffered since the last tick as one frame per encoding."""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, MetricBatch()
+        frames = {}
+        for client in self._clients_in("batch"):
+            if client.encoding not in frames:
+                frames[client.encoding] = batch.encode(client.encoding)
+            # Batches are not supersets of each other, so they must never be coalesced away
+            self._enqueue(client, "metrics_batch", frames[client.encoding])
+
+    def _enqueue(self, client: ClientConnection, kind: str, frame):
+        if not client.enqueue(kind, frame):
+            SLOW_DISCONNECTS.inc()
+            print(f"Disconnecting slow client {getattr(client.websocket, 'client', 'unknown')}: send queue full")
+            asyncio.create_task(self.disconnect(client.websocket, force=True))
+
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    async def broadcast(self, message: dict):
+        """Queue a message for all active WebSocket connections."""
+        # Flush pending batches first so batch clients see messages in sequence order
+        self.flush()
+        kind = message.get("type", "")
+        message = {**message, "seq": self._next_seq()}
+        frame = dumps(message)
+        self.ring.append((message["seq"], kind, frame, None))
+        for client in list(self.clients.values()):
+            self._enqueue(client, kind, frame)
 
     async def send_metric(self, metric: TrainingMetric):
-        """Send training metrics to all active WebSocket connections."""
-        print(f"Sending metric: {metric}")
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json({
-                    "type": "metrics",
-                    "payload": metric.model_dump() if hasattr(metric, 'model_dump') else metric.dict()
-                })
-            except Exception as e:
-                print(f"Error sending metric to {getattr(connection, 'client', 'unknown')}: {e}")
-                disconnected.append(connection)
-        for connection in disconnected:
-            # Only remove, do not call close again
-            await self.disconnect(connection, force=False)
+        """Queue training metrics for all active WebSocket connections."""
+        log_sampled("send_metric", f"Sending metric: {metric}")
+        seq = self._next_seq()
+        # Replays re-encode from the metric itself, so the ring doesn't need the JSON frame
+        self.ring.append((seq, "metrics", None, metric))
+        if self._ticker is not None:
+            self._batch.append(metric, seq)
+        streaming = self._clients_in("stream")
+        if streaming:
+            frame = dumps({
+                "type": "metrics",
+                "seq": seq,
+                "payload": metric.model_dump() if hasattr(metric, 'model_dump') else metric.dict()
+            })
+            for client in streaming:
+                self._enqueue(client, "metrics", frame)
 
     async def send_agent_tip(self, tip: dict):
         """Send an agent tip to all active WebSocket connections."""
         message = {"type": "tip", "payload": tip}
-        print(f"Sending agent tip: {tip}")
+        log_sampled("send_agent_tip", f"Sending agent tip: {tip}")
         await self.broadcast(message)
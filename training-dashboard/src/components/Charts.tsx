@@ -25,7 +25,7 @@ import {
 import { ZoomIn, ZoomOut, RefreshCw } from "lucide-react"
 
 export const Charts: React.FC = () => {
-  const { metricsHistory } = useDashboard()
+  const { metricsHistory, validationHistory } = useDashboard()
   const { theme } = useTheme()
 
   // State for zooming and panning
@@ -81,8 +81,11 @@ export const Charts: React.FC = () => {
     accuracy: "#10B981", // green
     loss: "#EF4444", // red
     radar: "#3B82F6", // blue
+    f1: "#8B5CF6", // purple
   }
 
+  const latestValidation = validationHistory.length > 0 ? validationHistory[validationHistory.length - 1] : null
+
   // Zoom handling functions
   const handleZoomIn = () => {
     if (!lineChartState.refAreaLeft || !lineChartState.refAreaRight) {
@@ -359,6 +362,71 @@ export const Charts: React.FC = () => {
           </ResponsiveContainer>
         </div>
       </div>
+
+      {latestValidation && (
+        <div className="bg-white dark:bg-gray-800 p-4 rounded-lg shadow-md lg:col-span-5">
+          <div className="flex justify-between items-center mb-4">
+            <h3 className="text-lg font-medium dark:text-white">Validation</h3>
+            <span className="text-sm text-gray-500 dark:text-gray-400">
+              {latestValidation.rows.toLocaleString()} held-out rows, step {latestValidation.step} (
+              {latestValidation.seconds.toFixed(1)}s)
+            </span>
+          </div>
+          <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
+            <div className="h-[300px] lg:col-span-2">
+              <ResponsiveContainer width="100%" height="100%">
+                <LineChart data={validationHistory} margin={{ top: 5, right: 30, left: 20, bottom: 5 }}>
+                  <CartesianGrid strokeDasharray="3 3" stroke={colors.grid} />
+                  <XAxis
+                    dataKey="step"
+                    label={{ value: "Steps", position: "insideBottomRight", offset: -10, fill: colors.text }}
+                    stroke={colors.text}
+                    allowDecimals={false}
+                  />
+                  <YAxis yAxisId="left" domain={[0, 1]} stroke={colors.text} tickFormatter={(value) => value.toFixed(2)} />
+                  <YAxis
+                    yAxisId="right"
+                    orientation="right"
+                    domain={[0, "dataMax + 0.5"]}
+                    stroke={colors.text}
+                    tickFormatter={(value) => value.toFixed(2)}
+                  />
+                  <Tooltip
+                    contentStyle={{
+                      backgroundColor: colors.tooltip.bg,
+                      borderColor: colors.tooltip.border,
+                      color: colors.tooltip.text,
+                    }}
+                    labelStyle={{ color: colors.tooltip.text }}
+                    labelFormatter={(step) => `Step ${step}`}
+                    formatter={(value: number) => value.toFixed(4)}
+                  />
+                  <Legend />
+                  <Line yAxisId="left" type="monotone" dataKey="accuracy" stroke={colors.accuracy} name="Val accuracy" dot={{ r: 2 }} />
+                  <Line yAxisId="left" type="monotone" dataKey="macroF1" stroke={colors.f1} name="Val macro F1" dot={{ r: 2 }} />
+                  <Line yAxisId="right" type="monotone" dataKey="loss" stroke={colors.loss} name="Val loss" dot={{ r: 2 }} />
+                </LineChart>
+              </ResponsiveContainer>
+            </div>
+            <div>
+              <h4 className="text-sm font-medium mb-2 dark:text-white">F1 per class</h4>
+              <div className="space-y-1 max-h-[270px] overflow-y-auto">
+                {latestValidation.f1.map((value, i) => (
+                  <div key={i} className="flex items-center text-xs text-gray-600 dark:text-gray-300">
+                    <span className="w-24 truncate" title={latestValidation.classes[i]}>
+                      {latestValidation.classes[i] ?? i}
+                    </span>
+                    <div className="flex-1 mx-2 h-2 bg-gray-200 dark:bg-gray-700 rounded">
+                      <div className="h-2 rounded" style={{ width: `${value * 100}%`, backgroundColor: colors.f1 }} />
+                    </div>
+                    <span className="w-10 text-right">{value.toFixed(2)}</span>
+                  </div>
+                ))}
+              </div>
+            </div>
+          </div>
+        </div>
+      )}
     </div>
   )
 }
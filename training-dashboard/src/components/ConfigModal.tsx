@@ -30,7 +30,7 @@ export const ConfigModal: React.FC = () => {
 
     setFormData((prev) => ({
       ...prev,
-      [name]: type === "number" ? Number.parseFloat(value) : value,
+      [name]: type === "number" ? Number.parseFloat(value) : type === "checkbox" ? (e.target as HTMLInputElement).checked : value,
     }))
   }
 
@@ -164,6 +164,10 @@ export const ConfigModal: React.FC = () => {
                 onChange={handleChange}
                 className="w-full px-3 py-2 border rounded-md dark:bg-gray-700 dark:border-gray-600 text-gray-900 dark:text-white transition-colors duration-200"
               >
+                <option value="mlp">Simple MLP</option>
+                <option value="logreg">Logistic Regression</option>
+                <option value="tiny-resnet">Tiny ResNet</option>
+                <option value="simple-cnn">Simple CNN (28x28)</option>
                 <option value="resnet50">ResNet50</option>
                 <option value="bert-base-uncased">BERT Base Uncased</option>
                 <option value="gpt2">GPT-2</option>
@@ -188,6 +192,55 @@ export const ConfigModal: React.FC = () => {
               </div>
             )}
 
+            <div className="flex items-center gap-2">
+              <input
+                type="checkbox"
+                id="autopilot"
+                name="autopilot"
+                checked={Boolean(formData.autopilot)}
+                onChange={handleChange}
+              />
+              <label htmlFor="autopilot" className="text-sm font-medium text-gray-700 dark:text-gray-300">
+                Autopilot (stop early, lower the learning rate on plateaus, abort on divergence)
+              </label>
+            </div>
+
+            <div className="flex items-center gap-2">
+              <input
+                type="checkbox"
+                id="performance"
+                name="performance"
+                checked={Boolean(formData.performance)}
+                onChange={handleChange}
+              />
+              <label htmlFor="performance" className="text-sm font-medium text-gray-700 dark:text-gray-300">
+                Performance tuning (thread pools, bfloat16, torch.compile, channels_last; kept only if faster)
+              </label>
+            </div>
+
+            <div>
+              <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1 transition-colors duration-200">
+                Data-parallel processes (1 = off)
+              </label>
+              <input
+                type="number"
+                name="distributed"
+                value={
+                  typeof formData.distributed === "number"
+                    ? formData.distributed
+                    : typeof formData.distributed === "object" && formData.distributed
+                      ? Number(formData.distributed.processes ?? 2)
+                      : formData.distributed
+                        ? 2
+                        : 1
+                }
+                onChange={handleChange}
+                min="1"
+                max="256"
+                className="w-full px-3 py-2 border rounded-md dark:bg-gray-700 dark:border-gray-600 text-gray-900 dark:text-white transition-colors duration-200"
+              />
+            </div>
+
             <div className="border-t pt-4 dark:border-gray-700">
               <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1">
                 Dataset Selection
@@ -3,9 +3,11 @@
 import type React from "react"
 
 import { useState, useRef, useEffect } from "react"
-import { Upload, FileText, ImageIcon, Database, Loader2, AlertCircle } from "lucide-react"
+import { Upload, FileText, ImageIcon, Database, Loader2, AlertCircle, AlertTriangle } from "lucide-react"
 import { TrainingAPI } from "../services/api"
-import type { Config } from "../types"
+import type { Config, DatasetProfile, DatasetProfilePending } from "../types"
+
+const PROFILE_POLL_MS = 2000
 
 interface DatasetSelectorProps {
   config: Config
@@ -27,6 +29,9 @@ export const DatasetSelector: React.FC<DatasetSelectorProps> = ({ config, onChan
   const [isBackendConnected, setIsBackendConnected] = useState<boolean | null>(null)
   const [isDemoMode, setIsDemoMode] = useState(false)
 
+  const [profile, setProfile] = useState<DatasetProfile | DatasetProfilePending | null>(null)
+  const [profileError, setProfileError] = useState<string | null>(null)
+
   // Initialize state after component mounts (client-side only)
   useEffect(() => {
     setIsDemoMode(TrainingAPI.isDemoMode())
@@ -59,6 +64,34 @@ export const DatasetSelector: React.FC<DatasetSelectorProps> = ({ config, onChan
     return () => clearInterval(interval)
   }, [isDemoMode])
 
+  // Profile the selected CSV (cached by the backend, so usually instant); poll while it's being computed
+  const datasetPath = config.dataset?.type === "csv" ? config.dataset.path : undefined
+  const datasetHash = config.dataset?.sha256
+  useEffect(() => {
+    setProfile(null)
+    setProfileError(null)
+    if (!datasetPath || isDemoMode) return
+
+    let cancelled = false
+    let timer: ReturnType<typeof setTimeout> | undefined
+    const fetchProfile = async () => {
+      try {
+        const result = await TrainingAPI.getDatasetProfile(datasetPath, datasetHash)
+        if (cancelled) return
+        setProfile(result)
+        if ("profiling" in result) timer = setTimeout(fetchProfile, PROFILE_POLL_MS)
+      } catch (error) {
+        if (!cancelled) setProfileError(error instanceof Error ? error.message : "Failed to profile dataset.")
+      }
+    }
+    fetchProfile()
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [datasetPath, datasetHash, isDemoMode])
+
   const toggleDemoMode = () => {
     TrainingAPI.toggleDemoMode(!isDemoMode)
   }
@@ -262,6 +295,56 @@ export const DatasetSelector: React.FC<DatasetSelectorProps> = ({ config, onChan
           </div>
         ) : null}
 
+        {profile && "profiling" in profile && (
+          <div className="flex items-center text-xs text-gray-500 dark:text-gray-400 mb-2">
+            <Loader2 size={12} className="mr-2 animate-spin" />
+            Profiling dataset{profile.approxRows !== null ? ` (~${profile.approxRows.toLocaleString()} rows)` : ""}...
+          </div>
+        )}
+
+        {profile && !("profiling" in profile) && (
+          <div className="p-3 border rounded-md dark:border-gray-700 mb-2 text-xs space-y-2">
+            <p className="text-gray-600 dark:text-gray-300">
+              {profile.rows.toLocaleString()} rows • {Math.max(profile.columns.length - 1, 0)} features
+              {profile.label ? ` • ${profile.label.distinct}${profile.label.truncated ? "+" : ""} classes` : ""}
+            </p>
+            {profile.label && profile.label.distinct > 0 && (
+              <div className="space-y-1">
+                {Object.entries(profile.label.classes)
+                  .slice(0, 5)
+                  .map(([name, count]) => (
+                    <div key={name} className="flex items-center">
+                      <span className="w-20 truncate text-gray-500 dark:text-gray-400" title={name}>
+                        {name}
+                      </span>
+                      <div className="flex-1 h-2 bg-gray-200 dark:bg-gray-700 rounded">
+                        <div
+                          className="h-2 bg-blue-500 rounded"
+                          style={{ width: `${(100 * count) / Math.max(profile.rows, 1)}%` }}
+                        />
+                      </div>
+                      <span className="w-12 text-right text-gray-500 dark:text-gray-400">
+                        {((100 * count) / Math.max(profile.rows, 1)).toFixed(1)}%
+                      </span>
+                    </div>
+                  ))}
+              </div>
+            )}
+            {profile.warnings.length > 0 && (
+              <ul className="space-y-1 text-amber-600 dark:text-amber-400">
+                {profile.warnings.map((warning) => (
+                  <li key={warning} className="flex items-start">
+                    <AlertTriangle size={12} className="mr-1 mt-0.5 flex-shrink-0" />
+                    {warning}
+                  </li>
+                ))}
+              </ul>
+            )}
+          </div>
+        )}
+
+        {profileError && <p className="text-xs text-red-600 dark:text-red-400 mb-2">{profileError}</p>}
+
         <div className="space-y-3">
           <div className="flex items-center">
             <input
@@ -5,6 +5,14 @@ import { useState } from "react"
 import { X, Download, Loader2, Check } from "lucide-react"
 import { useDashboard } from "../context/DashboardContext"
 import { TrainingAPI } from "../services/api"
+import type { ModelFormat } from "../types"
+
+const FORMAT_EXTENSIONS: Record<ModelFormat, string> = {
+  pytorch: "pt",
+  torchscript: "torchscript.pt",
+  onnx: "onnx",
+  quantized: "int8.torchscript.pt",
+}
 
 // Add type definitions for the File System Access API
 interface FileSystemFileHandle {
@@ -40,7 +48,7 @@ export const DownloadModelModal: React.FC<DownloadModelModalProps> = ({ isOpen,
   const { config } = useDashboard()
   const [isDownloading, setIsDownloading] = useState(false)
   const [downloadSuccess, setDownloadSuccess] = useState(false)
-  const [selectedFormat, setSelectedFormat] = useState<"pytorch" | "onnx" | "tensorflow">("pytorch")
+  const [selectedFormat, setSelectedFormat] = useState<ModelFormat>("pytorch")
   const [includeWeights, setIncludeWeights] = useState(true)
   const [includeOptimizer, setIncludeOptimizer] = useState(false)
   const [customFilename, setCustomFilename] = useState("")
@@ -51,7 +59,7 @@ export const DownloadModelModal: React.FC<DownloadModelModalProps> = ({ isOpen,
       setDownloadSuccess(false)
 
       // Get the model data as a blob
-      const blob = await TrainingAPI.downloadModel()
+      const blob = await TrainingAPI.downloadModel(selectedFormat)
 
       // Set the filename based on user input or defaults
       const modelName = config?.modelName || "model"
@@ -59,17 +67,7 @@ export const DownloadModelModal: React.FC<DownloadModelModalProps> = ({ isOpen,
       let filename = customFilename.trim() || (modelType === "custom" ? modelName : modelType)
 
       // Add file extension based on format
-      switch (selectedFormat) {
-        case "pytorch":
-          filename += ".pt"
-          break
-        case "onnx":
-          filename += ".onnx"
-          break
-        case "tensorflow":
-          filename += ".h5"
-          break
-      }
+      filename += `.${FORMAT_EXTENSIONS[selectedFormat]}`
 
       // Check if the File System Access API is available
       if (window.showSaveFilePicker) {
@@ -79,9 +77,7 @@ export const DownloadModelModal: React.FC<DownloadModelModalProps> = ({ isOpen,
             {
               description: "Model File",
               accept: {
-                "application/octet-stream": [
-                  `.${selectedFormat === "pytorch" ? "pt" : selectedFormat === "onnx" ? "onnx" : "h5"}`,
-                ],
+                "application/octet-stream": [`.${FORMAT_EXTENSIONS[selectedFormat]}`],
               },
             },
           ]
@@ -155,12 +151,13 @@ export const DownloadModelModal: React.FC<DownloadModelModalProps> = ({ isOpen,
               <label className="block text-sm font-medium text-gray-700 dark:text-gray-300 mb-1">Model Format</label>
               <select
                 value={selectedFormat}
-                onChange={(e) => setSelectedFormat(e.target.value as "pytorch" | "onnx" | "tensorflow")}
+                onChange={(e) => setSelectedFormat(e.target.value as ModelFormat)}
                 className="w-full px-3 py-2 border rounded-md dark:bg-gray-700 dark:border-gray-600 text-gray-900 dark:text-white"
               >
-                <option value="pytorch">PyTorch (.pt)</option>
+                <option value="pytorch">PyTorch state_dict (.pt)</option>
+                <option value="torchscript">TorchScript (.torchscript.pt)</option>
                 <option value="onnx">ONNX (.onnx)</option>
-                <option value="tensorflow">TensorFlow (.h5)</option>
+                <option value="quantized">TorchScript, int8 quantized (.int8.torchscript.pt)</option>
               </select>
             </div>
 
@@ -1,9 +1,9 @@
 import type React from "react"
 import { useDashboard } from "../context/DashboardContext"
-import { Activity, BarChart2, Clock, AlertCircle, Database } from "lucide-react"
+import { Activity, BarChart2, Clock, AlertCircle, Database, Gauge } from "lucide-react"
 
 export const MetricsCards: React.FC = () => {
-  const { metrics, config } = useDashboard()
+  const { metrics, config, profile, performanceReport, autotuneReport } = useDashboard()
 
   // Generate sample data if no metrics
   const displayMetrics = metrics || {
@@ -35,41 +35,86 @@ export const MetricsCards: React.FC = () => {
   }
 
   return (
-    <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-4 mb-8">
-      <MetricCard
-        title="Epochs"
-        value={displayMetrics.epoch.toString()}
-        icon={<Clock size={20} />}
-        color="bg-blue-500 dark:bg-blue-600"
-      />
+    <div className="mb-8">
+      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-4">
+        <MetricCard
+          title="Epochs"
+          value={displayMetrics.epoch.toString()}
+          icon={<Clock size={20} />}
+          color="bg-blue-500 dark:bg-blue-600"
+        />
 
-      <MetricCard
-        title="Accuracy"
-        value={(displayMetrics.accuracy * 100).toFixed(2) + "%"}
-        icon={<Activity size={20} />}
-        color="bg-green-500 dark:bg-green-600"
-      />
+        <MetricCard
+          title="Accuracy"
+          value={(displayMetrics.accuracy * 100).toFixed(2) + "%"}
+          icon={<Activity size={20} />}
+          color="bg-green-500 dark:bg-green-600"
+        />
 
-      <MetricCard
-        title="Loss"
-        value={displayMetrics.loss.toFixed(4)}
-        icon={<BarChart2 size={20} />}
-        color="bg-red-500 dark:bg-red-600"
-      />
+        <MetricCard
+          title="Loss"
+          value={displayMetrics.loss.toFixed(4)}
+          icon={<BarChart2 size={20} />}
+          color="bg-red-500 dark:bg-red-600"
+        />
 
-      <MetricCard
-        title="Status"
-        value={displayMetrics.status}
-        icon={<AlertCircle size={20} />}
-        color={getStatusColor()}
-      />
+        <MetricCard
+          title="Status"
+          value={displayMetrics.status}
+          icon={<AlertCircle size={20} />}
+          color={getStatusColor()}
+        />
 
-      <MetricCard
-        title="Dataset"
-        value={config?.dataset ? `${config.dataset.name} (${formatFileSize(config.dataset.size)})` : "Not selected"}
-        icon={<Database size={20} />}
-        color="bg-purple-500 dark:bg-purple-600"
-      />
+        <MetricCard
+          title="Dataset"
+          value={config?.dataset ? `${config.dataset.name} (${formatFileSize(config.dataset.size)})` : "Not selected"}
+          icon={<Database size={20} />}
+          color="bg-purple-500 dark:bg-purple-600"
+        />
+      </div>
+
+      {profile && displayMetrics.status === "Ongoing" && (
+        <div className="mt-3 flex flex-wrap items-center gap-x-4 gap-y-1 text-xs text-gray-500 dark:text-gray-400">
+          <span className="flex items-center font-medium text-gray-700 dark:text-gray-300">
+            <Gauge size={14} className="mr-1" />
+            {profile.stepsPerSec !== null ? `${profile.stepsPerSec.toFixed(1)} steps/s` : "-"}
+          </span>
+          {Object.entries(profile.phasesMs).map(([phase, ms]) => (
+            <span key={phase}>
+              {phase} {ms.toFixed(2)} ms
+            </span>
+          ))}
+          {performanceReport && performanceReport.runId === profile.runId && (
+            <span
+              className="font-medium text-gray-700 dark:text-gray-300"
+              title={Object.entries(performanceReport.fallbacks)
+                .map(([name, reason]) => `${name}: ${reason}`)
+                .join("\n")}
+            >
+              {performanceReport.speedup.toFixed(2)}x tuned ({performanceReport.active.join(", ") || "defaults"},{" "}
+              {performanceReport.threads} threads)
+            </span>
+          )}
+          {autotuneReport && autotuneReport.runId === profile.runId && (
+            <span
+              className="font-medium text-gray-700 dark:text-gray-300"
+              title={autotuneReport.trials
+                .map(
+                  (trial) =>
+                    `batch ${trial.batchSize}, ${trial.workers} workers: ` +
+                    (trial.error ?? `${trial.samplesPerSec?.toFixed(0)} samples/s, ${trial.memoryMb?.toFixed(0)} MB`),
+                )
+                .concat(Object.entries(autotuneReport.fallbacks).map(([name, reason]) => `${name}: ${reason}`))
+                .join("\n")}
+            >
+              batch {autotuneReport.batchSize}
+              {autotuneReport.accumulate > 1 ? ` x${autotuneReport.accumulate}` : ""}, {autotuneReport.workers} loader
+              workers, {autotuneReport.samplesPerSec.toFixed(0)} samples/s
+              {autotuneReport.speedup !== null ? ` (${autotuneReport.speedup.toFixed(2)}x)` : ""}
+            </span>
+          )}
+        </div>
+      )}
     </div>
   )
 }
@@ -2,13 +2,26 @@
 
 import type React from "react";
 import { createContext, useContext, useState, useEffect } from "react";
-import type { TrainingMetrics, AgentTip, ChatMessage, Config } from "../types";
+import type {
+  TrainingMetrics,
+  AgentTip,
+  ChatMessage,
+  Config,
+  StepProfile,
+  PerformanceReport,
+  AutotuneReport,
+  ValidationMetrics,
+} from "../types";
 import websocketService from "../services/websocket";
 import { TrainingAPI } from "../services/api";
 
 interface DashboardContextType {
   metrics: TrainingMetrics | null;
   metricsHistory: TrainingMetrics[];
+  profile: StepProfile | null;
+  performanceReport: PerformanceReport | null;
+  autotuneReport: AutotuneReport | null;
+  validationHistory: ValidationMetrics[];
   agentTips: AgentTip[];
   chatMessages: ChatMessage[];
   config: Config | null;
@@ -34,6 +47,10 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({
 }) => {
   const [metrics, setMetrics] = useState<TrainingMetrics | null>(null);
   const [metricsHistory, setMetricsHistory] = useState<TrainingMetrics[]>([]);
+  const [profile, setProfile] = useState<StepProfile | null>(null);
+  const [performanceReport, setPerformanceReport] = useState<PerformanceReport | null>(null);
+  const [autotuneReport, setAutotuneReport] = useState<AutotuneReport | null>(null);
+  const [validationHistory, setValidationHistory] = useState<ValidationMetrics[]>([]);
   const [agentTips, setAgentTips] = useState<AgentTip[]>([]);
   const [chatMessages, setChatMessages] = useState<ChatMessage[]>([]);
   const [config, setConfig] = useState<Config | null>({
@@ -87,6 +104,31 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({
       });
     }
 
+    // Replace the curve when the server resyncs us with a downsampled snapshot
+    const unsubscribeSnapshot = websocketService.onSnapshot((series) => {
+      const restored: TrainingMetrics[] = series.epoch.map((epoch, i) => ({
+        epoch,
+        step: series.step[i],
+        loss: series.loss[i],
+        accuracy: series.accuracy[i],
+        status: (series.status[i] ?? "Ongoing") as TrainingMetrics["status"],
+        timestamp: new Date(series.timestamp[i] * 1000).toISOString(),
+      }));
+      setMetricsHistory(restored.slice(-100));
+      if (restored.length > 0) setMetrics(restored[restored.length - 1]);
+    });
+
+    const unsubscribeProfile = websocketService.onProfile(setProfile);
+    const unsubscribePerformance = websocketService.onPerformance(setPerformanceReport);
+    const unsubscribeAutotune = websocketService.onAutotune(setAutotuneReport);
+    const unsubscribeValidation = websocketService.onValidation((data) => {
+      setValidationHistory((prev) => {
+        // A new run starts a new curve
+        const current = prev.length > 0 && prev[0].runId !== data.runId ? [] : prev;
+        return [...current, data].slice(-100);
+      });
+    });
+
     const unsubscribeTips = websocketService.onAgentTip((data) => {
       setAgentTips((prev) => [data, ...prev]);
     });
@@ -97,6 +139,11 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({
 
     return () => {
       unsubscribeMetrics();
+      unsubscribeSnapshot();
+      unsubscribeProfile();
+      unsubscribePerformance();
+      unsubscribeAutotune();
+      unsubscribeValidation();
       unsubscribeTips();
       unsubscribeChat();
     };
@@ -142,7 +189,8 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({
 
   const updateConfig = async (newConfig: Config) => {
     try {
-      await TrainingAPI.updateConfig(newConfig);
+      // While a run is going, hot-apply the change instead of requiring a restart
+      await TrainingAPI.updateConfig(newConfig, metrics?.status === "Ongoing");
       setConfig(newConfig);
       setIsConfigOpen(false);
     } catch (error) {
@@ -171,6 +219,10 @@ export const DashboardProvider: React.FC<{ children: React.ReactNode }> = ({
   const value = {
     metrics,
     metricsHistory,
+    profile,
+    performanceReport,
+    autotuneReport,
+    validationHistory,
     agentTips,
     chatMessages,
     config,
@@ -1,4 +1,4 @@
-import type { Config } from "../types"
+import type { Config, DatasetProfile, DatasetProfilePending, ModelFormat, RunMetrics, RunSummary } from "../types"
 
 // Check if we're in a browser environment
 const isBrowser = typeof window !== "undefined"
@@ -129,10 +129,11 @@ export const TrainingAPI = {
     }
   },
 
-  updateConfig: async (config: Config) => {
+  // apply=true also pushes live-editable fields (learning rate, batch size, ...) to the running job
+  updateConfig: async (config: Config, apply = false) => {
     console.log("Sending config to backend:", JSON.stringify(config, null, 2))
 
-    const response = await fetch(`${API_BASE_URL}/config`, {
+    const response = await fetch(`${API_BASE_URL}/config${apply ? "?apply=true" : ""}`, {
       method: "PUT",
       headers: {
         "Content-Type": "application/json",
@@ -141,7 +142,8 @@ export const TrainingAPI = {
     })
 
     if (!response.ok) {
-      throw new Error(`Failed to update config: ${response.statusText}`)
+      const body = await response.json().catch(() => null)
+      throw new Error(body?.error ?? `Failed to update config: ${response.statusText}`)
     }
 
     return await response.json()
@@ -170,7 +172,7 @@ export const TrainingAPI = {
 
     try {
       const formData = new FormData()
-      formData.append("dataset", file)
+      formData.append("file", file)
 
       const response = await fetch(`${API_BASE_URL}/upload-dataset`, {
         method: "POST",
@@ -263,9 +265,53 @@ export const TrainingAPI = {
     }
   },
 
-  downloadModel: async () => {
+  // Resolves to a pending answer (HTTP 202) until the backend has profiled the file; poll until it returns the profile
+  getDatasetProfile: async (path: string, sha256?: string): Promise<DatasetProfile | DatasetProfilePending> => {
+    const params = new URLSearchParams({ path })
+    if (sha256) params.set("sha256", sha256)
+
+    const response = await fetch(`${API_BASE_URL}/datasets/profile?${params}`)
+
+    if (!response.ok) {
+      const errorText = await response.text()
+      throw new Error(`Failed to profile dataset: ${errorText || response.statusText}`)
+    }
+
+    return await response.json()
+  },
+
+  getRuns: async (): Promise<RunSummary[]> => {
+    const response = await fetch(`${API_BASE_URL}/runs`)
+
+    if (!response.ok) {
+      throw new Error(`Failed to get runs: ${response.statusText}`)
+    }
+
+    return await response.json()
+  },
+
+  // Fetch a run's metric curve, downsampled by the backend to at most `points` samples
+  getRunMetrics: async (
+    runId: string,
+    options: { kind?: "step" | "epoch"; start?: number; end?: number; points?: number } = {},
+  ): Promise<RunMetrics> => {
+    const params = new URLSearchParams()
+    Object.entries(options).forEach(([key, value]) => {
+      if (value !== undefined) params.set(key, String(value))
+    })
+
+    const response = await fetch(`${API_BASE_URL}/runs/${encodeURIComponent(runId)}/metrics?${params}`)
+
+    if (!response.ok) {
+      throw new Error(`Failed to get run metrics: ${response.statusText}`)
+    }
+
+    return await response.json()
+  },
+
+  downloadModel: async (format: ModelFormat = "pytorch") => {
     try {
-      const response = await fetch(`${API_BASE_URL}/download-model`, {
+      const response = await fetch(`${API_BASE_URL}/download-model?format=${format}`, {
         method: "GET",
       })
 
@@ -1,4 +1,13 @@
-import type { TrainingMetrics, AgentTip, ChatMessage } from "../types"
+import type {
+  TrainingMetrics,
+  AgentTip,
+  ChatMessage,
+  RunSnapshot,
+  StepProfile,
+  PerformanceReport,
+  AutotuneReport,
+  ValidationMetrics,
+} from "../types"
 import { TrainingAPI } from "./api"
 
 type MessageHandler<T> = (data: T) => void
@@ -6,12 +15,88 @@ type MessageHandler<T> = (data: T) => void
 // Check if we're in a browser environment
 const isBrowser = typeof window !== "undefined"
 
+// Metric frame encoding requested from /ws/train. "binary" asks the backend to coalesce
+// metrics per tick into packed columnar frames; "json" keeps one JSON frame per metric.
+const getMetricsEncoding = (): "json" | "binary" => {
+  if (isBrowser && localStorage.getItem("ws_metrics_encoding") === "json") return "json"
+  return "binary"
+}
+
+const STATUS_CODES: Array<TrainingMetrics["status"] | null> = [null, "Idle", "Ongoing", "Completed"]
+
+interface MetricsBatchColumns {
+  timestamp: number[]
+  seq?: number[]
+  epoch: number[]
+  step: Array<number | null>
+  // null where the backend had NaN or an infinity, which JSON can't carry
+  loss: Array<number | null>
+  accuracy: Array<number | null>
+  status: Array<TrainingMetrics["status"] | null>
+}
+
+// Expand a columnar batch back into per-metric objects
+const expandBatch = (columns: MetricsBatchColumns): Array<TrainingMetrics & { seq?: number }> =>
+  columns.epoch.map((epoch, i) => ({
+    seq: columns.seq?.[i],
+    epoch,
+    step: columns.step[i],
+    loss: columns.loss[i] ?? NaN,
+    accuracy: columns.accuracy[i] ?? NaN,
+    status: columns.status[i] ?? "Ongoing",
+    timestamp: new Date(columns.timestamp[i] * 1000).toISOString(),
+  }))
+
+// Decode a packed batch frame; layout is documented in backend/metric_frames.py
+const decodeBinaryBatch = (buffer: ArrayBuffer): Array<TrainingMetrics & { seq?: number }> => {
+  const header = new DataView(buffer, 0, 8)
+  const magic = String.fromCharCode(
+    header.getUint8(0),
+    header.getUint8(1),
+    header.getUint8(2),
+    header.getUint8(3),
+  )
+  if (magic !== "TMB1") throw new Error(`Unknown metrics frame: ${magic}`)
+  const count = header.getUint32(4, true)
+  let offset = 8
+  const timestamp = new Float64Array(buffer, offset, count)
+  offset += count * 8
+  const seq = new Uint32Array(buffer, offset, count)
+  offset += count * 4
+  const epoch = new Int32Array(buffer, offset, count)
+  offset += count * 4
+  const step = new Int32Array(buffer, offset, count)
+  offset += count * 4
+  const loss = new Float32Array(buffer, offset, count)
+  offset += count * 4
+  const accuracy = new Float32Array(buffer, offset, count)
+  offset += count * 4
+  const status = new Uint8Array(buffer, offset, count)
+  return expandBatch({
+    timestamp: Array.from(timestamp),
+    seq: Array.from(seq),
+    epoch: Array.from(epoch),
+    step: Array.from(step, (s) => (s < 0 ? null : s)),
+    loss: Array.from(loss),
+    accuracy: Array.from(accuracy),
+    status: Array.from(status, (code) => STATUS_CODES[code] ?? null),
+  })
+}
+
 class WebSocketService {
   private trainingSocket: WebSocket | null = null
   private agentSocket: WebSocket | null = null
   private trainingMetricsHandlers: MessageHandler<TrainingMetrics>[] = []
   private agentTipHandlers: MessageHandler<AgentTip>[] = []
   private chatMessageHandlers: MessageHandler<ChatMessage>[] = []
+  private snapshotHandlers: MessageHandler<RunSnapshot>[] = []
+  private profileHandlers: MessageHandler<StepProfile>[] = []
+  private performanceHandlers: MessageHandler<PerformanceReport>[] = []
+  private autotuneHandlers: MessageHandler<AutotuneReport>[] = []
+  private validationHandlers: MessageHandler<ValidationMetrics>[] = []
+  // Resync state: the server session and the last broadcast sequence number we applied
+  private session: string | null = null
+  private lastSeq = 0
   private reconnectTimeout: NodeJS.Timeout | null = null
   private reconnectAttempts = 0
   private maxReconnectAttempts = 5
@@ -41,7 +126,14 @@ class WebSocketService {
 
     if (this.trainingSocket?.readyState === WebSocket.OPEN) return
 
-    this.trainingSocket = new WebSocket("ws://localhost:8000/ws/train")
+    const params = new URLSearchParams({ since: String(this.lastSeq) })
+    if (this.session) params.set("session", this.session)
+    if (getMetricsEncoding() === "binary") {
+      params.set("mode", "batch")
+      params.set("encoding", "binary")
+    }
+    this.trainingSocket = new WebSocket(`ws://localhost:8000/ws/train?${params}`)
+    this.trainingSocket.binaryType = "arraybuffer"
 
     this.trainingSocket.onopen = () => {
       console.log("Training WebSocket connected")
@@ -50,12 +142,45 @@ class WebSocketService {
 
     this.trainingSocket.onmessage = (event) => {
       try {
+        if (event.data instanceof ArrayBuffer) {
+          this.emitMetrics(decodeBinaryBatch(event.data))
+          return
+        }
+
         const data = JSON.parse(event.data)
 
+        if (data.type === "hello") {
+          this.session = data.session
+          return
+        }
+        if (data.type === "snapshot") {
+          this.lastSeq = data.seq
+          this.snapshotHandlers.forEach((handler) => handler(data.payload))
+          return
+        }
+        if (data.type === "metrics_batch") {
+          this.emitMetrics(expandBatch(data.payload))
+          return
+        }
+        // Drop anything already applied (e.g. replayed after a reconnect)
+        if (typeof data.seq === "number") {
+          if (data.seq <= this.lastSeq) return
+          this.lastSeq = data.seq
+        }
+
         if (data.type === "metrics") {
-          this.trainingMetricsHandlers.forEach((handler) => handler(data.payload))
+          const metric = { ...data.payload, loss: data.payload.loss ?? NaN, accuracy: data.payload.accuracy ?? NaN }
+          this.trainingMetricsHandlers.forEach((handler) => handler(metric))
         } else if (data.type === "tip") {
           this.agentTipHandlers.forEach((handler) => handler(data.payload))
+        } else if (data.type === "profile") {
+          this.profileHandlers.forEach((handler) => handler(data.payload))
+        } else if (data.type === "performance") {
+          this.performanceHandlers.forEach((handler) => handler(data.payload))
+        } else if (data.type === "autotune") {
+          this.autotuneHandlers.forEach((handler) => handler(data.payload))
+        } else if (data.type === "val_metrics") {
+          this.validationHandlers.forEach((handler) => handler(data.payload))
         }
       } catch (error) {
         console.error("Error parsing WebSocket message:", error)
@@ -72,6 +197,16 @@ class WebSocketService {
     }
   }
 
+  private emitMetrics(metrics: Array<TrainingMetrics & { seq?: number }>) {
+    metrics.forEach(({ seq, ...metric }) => {
+      if (seq !== undefined) {
+        if (seq <= this.lastSeq) return
+        this.lastSeq = seq
+      }
+      this.trainingMetricsHandlers.forEach((handler) => handler(metric))
+    })
+  }
+
   // Initialize agent WebSocket
   connectAgent() {
     if (!isBrowser) return
@@ -193,6 +328,46 @@ class WebSocketService {
     }
   }
 
+  // Subscribe to run snapshots, sent when a (re)connect gap is too old to replay
+  onSnapshot(handler: MessageHandler<RunSnapshot>) {
+    this.snapshotHandlers.push(handler)
+    return () => {
+      this.snapshotHandlers = this.snapshotHandlers.filter((h) => h !== handler)
+    }
+  }
+
+  // Subscribe to step timing summaries
+  onProfile(handler: MessageHandler<StepProfile>) {
+    this.profileHandlers.push(handler)
+    return () => {
+      this.profileHandlers = this.profileHandlers.filter((h) => h !== handler)
+    }
+  }
+
+  // Subscribe to performance tuning reports, sent once per run that enables tuning
+  onPerformance(handler: MessageHandler<PerformanceReport>) {
+    this.performanceHandlers.push(handler)
+    return () => {
+      this.performanceHandlers = this.performanceHandlers.filter((h) => h !== handler)
+    }
+  }
+
+  // Subscribe to autotune reports, sent once per run that enables autotuning
+  onAutotune(handler: MessageHandler<AutotuneReport>) {
+    this.autotuneHandlers.push(handler)
+    return () => {
+      this.autotuneHandlers = this.autotuneHandlers.filter((h) => h !== handler)
+    }
+  }
+
+  // Subscribe to held-out validation scores, sent for each snapshot the run's evaluator scores
+  onValidation(handler: MessageHandler<ValidationMetrics>) {
+    this.validationHandlers.push(handler)
+    return () => {
+      this.validationHandlers = this.validationHandlers.filter((h) => h !== handler)
+    }
+  }
+
   // Subscribe to agent tips
   onAgentTip(handler: MessageHandler<AgentTip>) {
     this.agentTipHandlers.push(handler)
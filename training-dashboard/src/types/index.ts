@@ -3,6 +3,7 @@ export interface TrainingMetrics {
   epoch: number
   accuracy: number
   loss: number
+  step?: number | null
   status: "Ongoing" | "Idle" | "Completed"
   timestamp: string
 }
@@ -28,11 +29,145 @@ export interface Config {
   optimizer: string
   modelType: string
   modelName: string
+  // true, or autopilot options such as { patience: 5, lrFactor: 0.5 }
+  autopilot?: boolean | Record<string, number | boolean>
+  // true, or performance options such as { compile: false, threads: 8 }
+  performance?: boolean | Record<string, number | boolean | null>
+  // Data-parallel process count, or options such as { processes: 8, nodes: 2, masterAddr: "10.0.0.1" }
+  distributed?: boolean | number | Record<string, number | string | boolean | null>
+  // true, or autotune options such as { batchSizes: [64, 128, 256], workers: [0, 2], memoryLimitMb: 4096 }
+  autotune?: boolean | Record<string, number | boolean | number[] | null>
+  // true, or validation options such as { split: 0.2, every: 500 }
+  validation?: boolean | Record<string, number | boolean>
   dataset?: {
     name: string
     path: string
     type: "csv" | "images" | "text" | "custom"
     size?: number
     format?: string
+    sha256?: string
   }
 }
+
+// GET /datasets/profile; the last column is the label
+export interface DatasetColumnProfile {
+  name: string
+  type: "integer" | "float" | "string" | "empty"
+  nulls: number
+  nonNumeric: number
+  min: number | null
+  max: number | null
+  mean: number | null
+}
+
+export interface DatasetProfile {
+  sha256: string
+  name: string
+  rows: number
+  columns: DatasetColumnProfile[]
+  // Class counts, most frequent first
+  label: { column: string; classes: Record<string, number>; distinct: number; truncated: boolean } | null
+  warnings: string[]
+}
+
+// Answer while the backend is still profiling
+export interface DatasetProfilePending {
+  profiling: true
+  sha256: string
+  approxRows: number | null
+}
+
+// Columnar metric series returned by GET /runs/{runId}/metrics
+export interface RunMetrics {
+  epoch: number[]
+  step: Array<number | null>
+  loss: number[]
+  accuracy: number[]
+  status: Array<string | null>
+  timestamp: number[]
+  total: number
+}
+
+export interface RunSummary {
+  runId: string
+  config: Partial<Config> | null
+  count: number
+  last: (Omit<TrainingMetrics, "timestamp"> & { timestamp: number }) | null
+}
+
+// Downsampled view of a run, sent over /ws/train to resync a client
+export interface RunSnapshot extends RunMetrics {
+  runId: string
+}
+
+// Export formats served by GET /download-model
+export type ModelFormat = "pytorch" | "torchscript" | "onnx" | "quantized"
+
+// What a run's performance tuner kept, and the step speedup it measured on the first batch
+export interface PerformanceReport {
+  runId: string
+  active: string[]
+  fallbacks: Record<string, string>
+  baselineStepMs: number
+  tunedStepMs: number
+  speedup: number
+  threads: number
+  interopThreads: number
+}
+
+// Scores of one model snapshot on the run's held-out rows, from the evaluator running beside training
+export interface ValidationMetrics {
+  runId: string
+  step: number
+  epoch: number
+  rows: number
+  loss: number
+  accuracy: number
+  macroF1: number
+  // Per class, in the order of classes
+  f1: number[]
+  // confusion[true class][predicted class]
+  confusion: number[][]
+  classes: string[]
+  seconds: number
+}
+
+// One batch size / loader setting the autotuner measured
+export interface AutotuneTrial {
+  batchSize: number
+  workers: number
+  prefetch: number | null
+  pinMemory: boolean
+  samplesPerSec?: number
+  memoryMb?: number
+  error?: string
+}
+
+// Batch size and DataLoader settings the autotuner picked before the run started
+export interface AutotuneReport {
+  runId: string
+  batchSize: number
+  // Batches accumulated into each optimizer step
+  accumulate: number
+  effectiveBatchSize: number
+  workers: number
+  prefetch: number | null
+  pinMemory: boolean
+  samplesPerSec: number
+  baselineSamplesPerSec: number | null
+  speedup: number | null
+  memoryMb: number
+  memoryLimitMb: number | null
+  trials: AutotuneTrial[]
+  fallbacks: Record<string, string>
+  seconds: number
+}
+
+// Step timing summary, broadcast over /ws/train about once a second while a run trains
+export interface StepProfile {
+  runId: string
+  steps: number
+  stepsPerSec: number | null
+  // Mean milliseconds per step in each phase (data, forward, backward, optimizer, emit)
+  phasesMs: Record<string, number>
+}